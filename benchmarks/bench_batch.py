@@ -0,0 +1,80 @@
+"""
+多语句脚本执行基准测试
+
+脚本由 N 条几乎不产生服务端开销的语句(DO 0)组成，测得的耗时基本就是每条语句的额外开销:
+    - per-statement: 旧方式，每条语句单独获取/归还连接(含 pool_pre_ping)并提交
+    - batch:         同一个连接上依次执行所有语句
+    - batch+tx:      同一个连接、同一个事务中执行，最后统一提交
+    - multi:         同一个连接，利用驱动的多语句支持一次请求发送(需要服务端允许)
+
+用法:
+    python benchmarks/bench_batch.py --envfile /path/to/.env -n 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dotenv import load_dotenv
+
+from mysql_mcp_server_pro.config import get_db_config, reload_db_config
+from mysql_mcp_server_pro.utils.execute_sql_util import ExecuteSqlUtil
+
+
+async def per_statement(exe: ExecuteSqlUtil, statements: list[str]) -> None:
+    for statement in statements:
+        await exe.execute_single_statement(statement)
+
+
+async def measure(name: str, coro_factory, n: int, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<16} 总耗时 {best * 1000:9.1f} ms   每条语句 {best * 1e6 / n:9.1f} us")
+
+
+async def run(n: int, repeat: int, multi: bool) -> None:
+    statements = ["DO 0"] * n
+    script = ";\n".join(statements)
+    exe = ExecuteSqlUtil()
+
+    # 预热连接池
+    await exe.execute_single_statement("SELECT 1")
+
+    if multi:
+        await measure("multi", lambda: exe.execute_multiple_statements(script), n, repeat)
+        return
+
+    print(f"语句数: {n}")
+    await measure("per-statement", lambda: per_statement(exe, statements), n, repeat)
+    await measure("batch", lambda: exe.execute_multiple_statements(script), n, repeat)
+    await measure("batch+tx", lambda: exe.execute_multiple_statements(script, transactional=True), n, repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--envfile", default=None, help="env file path")
+    parser.add_argument("-n", type=int, default=200, help="脚本中的语句数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数，取最好成绩")
+    parser.add_argument("--no-multi", action="store_true", help="跳过多语句方式")
+    args = parser.parse_args()
+
+    load_dotenv(args.envfile)
+    os.environ["MULTI_STATEMENTS"] = "false"
+    ExecuteSqlUtil.create_mysql_pool(db_config=get_db_config())
+    asyncio.run(run(args.n, args.repeat, multi=False))
+
+    if not args.no_multi:
+        os.environ["MULTI_STATEMENTS"] = "true"
+        ExecuteSqlUtil.create_mysql_pool(db_config=reload_db_config()[1])
+        asyncio.run(run(args.n, args.repeat, multi=True))
+
+
+if __name__ == "__main__":
+    main()
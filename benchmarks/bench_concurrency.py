@@ -0,0 +1,69 @@
+"""
+并发执行基准测试
+
+同时发起 N 个 execute_sql 调用(每个调用执行 SELECT SLEEP(x))，对比总耗时与各调用耗时之和。
+若执行不阻塞事件循环，总耗时应接近最慢的一个调用，而不是所有调用耗时之和。
+
+用法:
+    python benchmarks/bench_concurrency.py --envfile /path/to/.env --backend async -n 10 --sleep 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dotenv import load_dotenv
+
+from mysql_mcp_server_pro.config import get_db_config
+from mysql_mcp_server_pro.handles import ExecuteSQL
+from mysql_mcp_server_pro.utils.execute_sql_util import ExecuteSqlUtil
+
+
+async def timed_call(tool: ExecuteSQL, sleep: float) -> float:
+    start = time.perf_counter()
+    await tool.run_tool({"query": f"SELECT SLEEP({sleep})"})
+    return time.perf_counter() - start
+
+
+async def run(n: int, sleep: float) -> None:
+    tool = ExecuteSQL()
+    # 预热连接池，避免把建连耗时计入结果
+    await asyncio.gather(*(timed_call(tool, 0) for _ in range(n)))
+
+    # 每个调用的睡眠时间略有不同，最慢的一个为 sleep
+    sleeps = [sleep * (i + 1) / n for i in range(n)]
+    start = time.perf_counter()
+    durations = await asyncio.gather(*(timed_call(tool, s) for s in sleeps))
+    wall = time.perf_counter() - start
+
+    print(f"并发数:       {n}")
+    print(f"最慢调用:     {max(durations):.3f}s")
+    print(f"调用耗时之和: {sum(durations):.3f}s")
+    print(f"总耗时:       {wall:.3f}s")
+    print(f"总耗时/最慢调用: {wall / max(durations):.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--envfile", default=None, help="env file path")
+    parser.add_argument("--backend", default=None, choices=["sync", "async"], help="连接池后端，默认取 POOL_BACKEND")
+    parser.add_argument("-n", type=int, default=10, help="并发调用数")
+    parser.add_argument("--sleep", type=float, default=0.5, help="最慢调用的 SLEEP 秒数")
+    args = parser.parse_args()
+
+    load_dotenv(args.envfile)
+    if args.backend:
+        os.environ["POOL_BACKEND"] = args.backend
+
+    config = get_db_config()
+    ExecuteSqlUtil.create_mysql_pool(db_config=config)
+    print(f"连接池后端:   {config['pool_backend']}")
+    asyncio.run(run(args.n, args.sleep))
+
+
+if __name__ == "__main__":
+    main()
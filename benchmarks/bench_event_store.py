@@ -0,0 +1,97 @@
+"""
+事件存储内存占用基准测试(无需数据库)
+
+模拟长时间运行的 streamable http 服务: 会话不断建立和结束，每个会话的流写入若干事件后不再使用，
+共写入 N 个事件，每写入 N/10 个事件记录一次 Python 分配的内存(tracemalloc，不含 SQLite 自身
+有上限的页缓存)和写入速度:
+    - legacy:  旧的 InMemoryEventStore 配置(每个流保留最近100个事件，流不删除)
+    - memory:  InMemoryEventStore，所有流合计最多保存 --max-events 个事件
+    - sqlite:  SqliteEventStore，事件批量写入本地文件(--path，默认临时目录)
+
+最后对每种存储从一个较早的事件断点续传，确认续传仍可用
+
+用法:
+    python benchmarks/bench_event_store.py -n 1000000 --events-per-stream 50
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from mcp.types import JSONRPCMessage, JSONRPCNotification
+
+from mysql_mcp_server_pro.config.event_store import InMemoryEventStore, SqliteEventStore
+
+
+def make_message(i: int) -> JSONRPCMessage:
+    return JSONRPCMessage(JSONRPCNotification(
+        jsonrpc="2.0",
+        method="notifications/progress",
+        params={"progressToken": i, "progress": i % 100, "total": 100},
+    ))
+
+
+async def soak(name: str, store, n: int, events_per_stream: int) -> None:
+    message = make_message(0)
+    checkpoint = max(1, n // 10)
+    resume_from = None
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(n):
+        event_id = await store.store_event(f"stream-{i // events_per_stream}", message)
+        # 续传点: 倒数第10个事件
+        if i == n - 10:
+            resume_from = event_id
+        if (i + 1) % checkpoint == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<8} 事件数 {i + 1:>9}   内存 {current / 1024 / 1024:8.1f} MB   "
+                  f"峰值 {peak / 1024 / 1024:8.1f} MB   写入 {(i + 1) / elapsed:10.0f} 个/秒")
+    tracemalloc.stop()
+
+    replayed = []
+
+    async def collect(event):
+        replayed.append(event.event_id)
+
+    stream_id = await store.replay_events_after(resume_from, collect)
+    print(f"{name:<8} 从 {stream_id} 续传 {len(replayed)} 个事件")
+    await store.close()
+
+
+async def run(args) -> None:
+    stores = args.store.split(",")
+    if "legacy" in stores:
+        await soak("legacy", InMemoryEventStore(), args.n, args.events_per_stream)
+    if "memory" in stores:
+        await soak("memory", InMemoryEventStore(stream_ttl=args.ttl, max_total_events=args.max_events),
+                   args.n, args.events_per_stream)
+    if "sqlite" in stores:
+        with tempfile.TemporaryDirectory() as directory:
+            path = args.path or os.path.join(directory, "events.db")
+            await soak("sqlite", SqliteEventStore(path, stream_ttl=args.ttl, max_total_events=args.max_events),
+                       args.n, args.events_per_stream)
+            print(f"sqlite   文件大小 {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=1000000, help="写入的事件总数")
+    parser.add_argument("--events-per-stream", type=int, default=50, help="每个流写入的事件数")
+    parser.add_argument("--max-events", type=int, default=100000, help="所有流合计最多保存的事件数")
+    parser.add_argument("--ttl", type=float, default=3600, help="流的过期时间(秒)")
+    parser.add_argument("--store", default="legacy,memory,sqlite", help="要测试的存储，逗号分隔")
+    parser.add_argument("--path", default=None, help="sqlite 数据库文件路径")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+内存事件存储写入与续传基准测试(无需数据库)
+
+对比旧实现(uuid4 事件ID + deque，续传时逐个扫描流中的事件查找断点)与 InMemoryEventStore
+(流编号+偏移量的序号ID + 环形缓冲区，续传时直接定位到断点):
+    - store:  向 --streams 个流轮流写入 N 个事件
+    - replay: 在写满的流(每个流保留 --per-stream 个事件)中，从不同位置续传，
+              统计每次续传的耗时(含回调，回调本身不做任何事)
+
+用法:
+    python benchmarks/bench_event_store_replay.py -n 200000 --per-stream 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from uuid import uuid4
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from mcp.server.streamable_http import EventMessage
+from mcp.types import JSONRPCMessage, JSONRPCNotification
+
+from mysql_mcp_server_pro.config.event_store import InMemoryEventStore
+
+
+@dataclass
+class LegacyEventEntry:
+    event_id: str
+    stream_id: str
+    message: JSONRPCMessage
+
+
+class LegacyEventStore:
+    """旧实现"""
+
+    def __init__(self, max_events_per_stream: int = 100):
+        self.max_events_per_stream = max_events_per_stream
+        self.streams: dict[str, deque[LegacyEventEntry]] = {}
+        self.event_index: dict[str, LegacyEventEntry] = {}
+
+    async def store_event(self, stream_id, message):
+        event_id = str(uuid4())
+        event_entry = LegacyEventEntry(event_id=event_id, stream_id=stream_id, message=message)
+        if stream_id not in self.streams:
+            self.streams[stream_id] = deque(maxlen=self.max_events_per_stream)
+        if len(self.streams[stream_id]) == self.max_events_per_stream:
+            oldest_event = self.streams[stream_id][0]
+            self.event_index.pop(oldest_event.event_id, None)
+        self.streams[stream_id].append(event_entry)
+        self.event_index[event_id] = event_entry
+        return event_id
+
+    async def replay_events_after(self, last_event_id, send_callback):
+        if last_event_id not in self.event_index:
+            return None
+        last_event = self.event_index[last_event_id]
+        stream_events = self.streams.get(last_event.stream_id, deque())
+        found_last = False
+        for event in stream_events:
+            if found_last:
+                await send_callback(EventMessage(event.message, event.event_id))
+            elif event.event_id == last_event_id:
+                found_last = True
+        return last_event.stream_id
+
+
+async def noop(event) -> None:
+    pass
+
+
+async def bench(name: str, store, n: int, streams: int, per_stream: int, repeat: int) -> None:
+    message = JSONRPCMessage(JSONRPCNotification(
+        jsonrpc="2.0", method="notifications/progress", params={"progressToken": 1, "progress": 1}
+    ))
+    stream_ids = [f"stream-{i}" for i in range(streams)]
+
+    start = time.perf_counter()
+    for i in range(n):
+        await store.store_event(stream_ids[i % streams], message)
+    store_seconds = time.perf_counter() - start
+
+    # 写满一个流，记录保留的事件ID
+    event_ids = [await store.store_event("replay", message) for _ in range(per_stream * 2)][-per_stream:]
+    for label, position in (("最新", per_stream - 2), ("中间", per_stream // 2), ("最早", 0)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await store.replay_events_after(event_ids[position], noop)
+            best = min(best, time.perf_counter() - start)
+        replayed = per_stream - 1 - position
+        print(f"{name:<8} 续传({label}，{replayed:>4} 个事件) {best * 1e6:9.1f} us")
+
+    print(f"{name:<8} 写入 {n / store_seconds:12.0f} 个/秒")
+
+
+async def run(args) -> None:
+    logging.disable(logging.WARNING)
+    await bench("legacy", LegacyEventStore(args.per_stream), args.n, args.streams, args.per_stream, args.repeat)
+    await bench("ring", InMemoryEventStore(args.per_stream), args.n, args.streams, args.per_stream, args.repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200000, help="写入的事件数")
+    parser.add_argument("--streams", type=int, default=1000, help="写入的流数")
+    parser.add_argument("--per-stream", type=int, default=100, help="每个流保留的事件数")
+    parser.add_argument("--repeat", type=int, default=20, help="每种续传重复次数，取最好成绩")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+OAuth 认证中间件基准测试(无需数据库和网络)
+
+在进程内直接以ASGI方式调用 Starlette 应用，对比旧实现(BaseHTTPMiddleware，认证逻辑相同)
+与纯ASGI的 OAuthMiddleware，请求均携带有效的访问令牌:
+    - throughput: 并发 --concurrency 个请求访问返回 "ok" 的接口，统计每秒完成的请求数
+    - streaming:  访问逐块返回 --chunks 块数据的流式接口，统计首字节时间(TTFB)和完整响应时间
+    - none:       不加中间件，作为基线
+
+用法:
+    python benchmarks/bench_oauth_middleware.py -n 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from mysql_mcp_server_pro.oauth import OAuthMiddleware, TokenHandler
+
+
+class LegacyOAuthMiddleware(BaseHTTPMiddleware):
+    """旧实现: BaseHTTPMiddleware 包装请求和响应"""
+
+    def __init__(self, app, exclude_paths=None):
+        super().__init__(app)
+        self.auth = OAuthMiddleware(app, exclude_paths)
+
+    async def dispatch(self, request, call_next):
+        if self.auth._is_excluded_path(request.url.path):
+            return await call_next(request)
+        error_response = self.auth._authenticate(request.scope)
+        if error_response is not None:
+            return error_response
+        return await call_next(request)
+
+
+def create_app(middleware_class, chunks: int) -> Starlette:
+    async def ping(request):
+        return PlainTextResponse("ok")
+
+    async def stream(request):
+        async def body():
+            for i in range(chunks):
+                yield b"data: %d\n\n" % i
+                await asyncio.sleep(0)
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    middleware = [Middleware(middleware_class, exclude_paths=["/login"])] if middleware_class else []
+    return Starlette(routes=[Route("/ping", ping), Route("/stream", stream)], middleware=middleware)
+
+
+async def call(app, path: str, token: str) -> tuple[float, float]:
+    """发送一个GET请求
+
+    Returns:
+        (首字节时间, 完整响应时间)，单位秒
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("127.0.0.1", 9000),
+    }
+    done = asyncio.Event()
+    received = False
+    first_byte = None
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal first_byte
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message["status"]
+        elif message["type"] == "http.response.body":
+            if first_byte is None and message.get("body"):
+                first_byte = time.perf_counter() - start
+            if not message.get("more_body", False):
+                done.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return first_byte, time.perf_counter() - start
+
+
+async def bench(name: str, app, token: str, n: int, concurrency: int, streams: int) -> None:
+    # 预热
+    await call(app, "/ping", token)
+
+    start = time.perf_counter()
+    for i in range(0, n, concurrency):
+        await asyncio.gather(*(call(app, "/ping", token) for _ in range(min(concurrency, n - i))))
+    elapsed = time.perf_counter() - start
+
+    results = [await call(app, "/stream", token) for _ in range(streams)]
+    ttfb = statistics.median(first for first, _ in results)
+    total = statistics.median(total for _, total in results)
+    print(f"{name:<8} 吞吐 {n / elapsed:9.0f} 请求/秒   流式响应 TTFB {ttfb * 1e6:8.1f} us   "
+          f"完整响应 {total * 1e3:8.2f} ms")
+
+
+async def run(args) -> None:
+    token = TokenHandler.create_tokens("1", "admin")[0]
+    for name, middleware_class in (("none", None), ("legacy", LegacyOAuthMiddleware), ("asgi", OAuthMiddleware)):
+        await bench(name, create_app(middleware_class, args.chunks), token, args.n, args.concurrency, args.streams)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=5000, help="吞吐测试的请求数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发请求数")
+    parser.add_argument("--streams", type=int, default=200, help="流式响应测试的请求数")
+    parser.add_argument("--chunks", type=int, default=100, help="每个流式响应的数据块数")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
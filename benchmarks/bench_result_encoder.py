@@ -0,0 +1,120 @@
+"""
+查询结果编码基准测试(无需数据库)
+
+生成 N 行 × 20 列的结果，对比逐行编码(csv 为旧实现: 逐个单元格 str() + 生成器 join，不加引号；
+jsonl/json 为逐行 json.dumps)与按列编码的各输出格式的耗时:
+    - mixed: 整数、小数、浮点、字符串、时间戳、可空列混合，浮点和时间戳的格式化本身占大部分耗时
+    - oltp:  业务表常见的主键、外键、状态、日期、可空列，重复值较多
+
+用法:
+    python benchmarks/bench_result_encoder.py --rows 100000 --dataset oltp
+"""
+
+import argparse
+import datetime
+import decimal
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from mysql_mcp_server_pro.utils.result_encoder import RESULT_FORMATS, ResultEncoder
+
+COLUMN_COUNT = 20
+
+
+def legacy_format(columns, rows) -> str:
+    """旧实现"""
+    formatted_rows = [
+        ",".join("NULL" if v is None else str(v) for v in row)
+        for row in rows
+    ]
+    return "\n".join([",".join(columns)] + formatted_rows)
+
+
+def naive_jsonl(columns, rows) -> str:
+    """逐行 json.dumps"""
+    return "\n".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) for row in rows)
+
+
+def naive_json(columns, rows) -> str:
+    return json.dumps({"columns": columns, "rows": rows}, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+# 输出格式 -> 逐行编码的对照实现
+BASELINES = {
+    "csv": legacy_format,
+    "jsonl": naive_jsonl,
+    "json": naive_json,
+}
+
+
+OLTP_GENERATORS = [
+    lambda i: i,
+    lambda i: random.randint(1, 10 ** 6),
+    lambda i: random.choice(["NEW", "PAID", "SHIPPED", "CLOSED"]),
+    lambda i: datetime.date(2024, 1 + i % 12, 1 + i % 28),
+    lambda i: None if i % 4 else f"remark {i}",
+    lambda i: random.randint(0, 1),
+    lambda i: f"user_{i % 5000}",
+    lambda i: random.choice([10, 20, 50, 100]),
+    lambda i: None if i % 2 else random.randint(1, 100),
+    lambda i: random.choice(["cn", "us", "jp"]),
+]
+
+
+def make_rows(row_count: int, dataset: str = "mixed"):
+    base = datetime.datetime(2024, 1, 1)
+    generators = OLTP_GENERATORS if dataset == "oltp" else [
+        lambda i: i,
+        lambda i: random.randint(0, 10 ** 9),
+        lambda i: decimal.Decimal(random.randint(0, 10 ** 6)) / 100,
+        lambda i: random.random(),
+        lambda i: f"name_{i}",
+        lambda i: "comment, with \"quotes\"" if i % 50 == 0 else f"comment {i}",
+        lambda i: base + datetime.timedelta(seconds=i),
+        lambda i: None if i % 3 == 0 else i,
+        lambda i: random.choice(["NEW", "PAID", "SHIPPED"]),
+        lambda i: datetime.date(2024, 1, 1 + i % 28),
+    ]
+    columns = [f"col_{n}" for n in range(COLUMN_COUNT)]
+    rows = [tuple(generators[n % len(generators)](i) for n in range(COLUMN_COUNT)) for i in range(row_count)]
+    return columns, rows
+
+
+def measure(name: str, fn, repeat: int) -> float:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<14} {best * 1000:9.1f} ms   {size / 1024 / 1024:7.1f} MB")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="结果行数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最好成绩")
+    parser.add_argument("--dataset", default="mixed", choices=["mixed", "oltp"], help="测试数据")
+    args = parser.parse_args()
+
+    columns, rows = make_rows(args.rows, args.dataset)
+    print(f"结果: {args.rows} 行 × {COLUMN_COUNT} 列 ({args.dataset})")
+
+    for result_format in RESULT_FORMATS:
+        baseline = BASELINES.get(result_format)
+        if baseline:
+            before = measure(f"{result_format} 逐行", lambda: baseline(columns, rows), args.repeat)
+        encoder = ResultEncoder(result_format)
+        elapsed = measure(f"{result_format} 按列", lambda: encoder.encode(columns, rows), args.repeat)
+        if baseline:
+            print(f"{'':<14} 加速 {before / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
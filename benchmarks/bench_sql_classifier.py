@@ -0,0 +1,71 @@
+"""
+SQL语句分类微基准测试(无需数据库)
+
+对比旧实现(大写 + 去注释 + 每种操作一次正则搜索)与新实现(单次扫描 + 指纹缓存)
+在不同语句上的耗时:
+    - 短查询
+    - 批量 INSERT(N 行)，每次值都不同，模拟生成的导入脚本
+    - 字符串中包含关键字的语句(检查误判)
+
+用法:
+    python benchmarks/bench_sql_classifier.py --rows 5000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from mysql_mcp_server_pro.utils.sql_classifier import SQLOperation, classify, classify_cache_info
+
+SQL_COMMENT_PATTERN = re.compile(r'--.*$|/\*.*?\*/', re.MULTILINE | re.DOTALL)
+
+
+def legacy_extract_operations(sql: str):
+    """旧实现"""
+    sql = ' '.join(SQL_COMMENT_PATTERN.sub('', sql.upper()).split())
+    return {op for op in SQLOperation if re.search(rf'\b{op.value}\b', sql)}
+
+
+def insert_batch(rows: int) -> str:
+    values = ",".join(
+        f"({random.randint(1, 10 ** 9)}, 'name_{random.random()}', {random.random():.6f}, '2024-01-01 00:00:00')"
+        for _ in range(rows)
+    )
+    return f"INSERT INTO t_order (id, name, amount, created_at) VALUES {values}"
+
+
+def bench(name: str, statements: list[str], number: int) -> None:
+    legacy = timeit.timeit(lambda: [legacy_extract_operations(s) for s in statements], number=number)
+    new = timeit.timeit(lambda: [classify(s) for s in statements], number=number)
+    per_call = number * len(statements)
+    print(f"{name:<22} 旧实现 {legacy * 1e6 / per_call:10.1f} us/条   新实现 {new * 1e6 / per_call:10.1f} us/条"
+          f"   加速 {legacy / new:5.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="批量 INSERT 的行数")
+    parser.add_argument("--number", type=int, default=20, help="每组重复次数")
+    args = parser.parse_args()
+
+    short = ["SELECT id, name FROM t_user WHERE id = 1", "UPDATE t_user SET name = 'a' WHERE id = 2"]
+    batches = [insert_batch(args.rows) for _ in range(5)]
+    tricky = "SELECT * FROM t_log WHERE message = 'DROP TABLE t_user; DELETE FROM x' -- TRUNCATE"
+
+    bench("短查询", short, args.number * 100)
+    bench(f"批量INSERT({args.rows}行)", batches, args.number)
+
+    print()
+    print(f"误判检查: {tricky}")
+    print(f"  旧实现: {sorted(op.value for op in legacy_extract_operations(tricky))}")
+    print(f"  新实现: {sorted(op.value for op in classify(tricky))}")
+    print(f"  缓存: {classify_cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
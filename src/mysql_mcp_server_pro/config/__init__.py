@@ -1,6 +1,11 @@
-from .dbconfig import get_db_config,get_role_permissions
+from .dbconfig import (get_db_config, get_role_permissions, get_role_query_timeout, load_env_file,
+                       reload_db_config, connection_changed)
 
 __all__ = [
     "get_db_config",
     "get_role_permissions",
-]
\ No newline at end of file
+    "get_role_query_timeout",
+    "load_env_file",
+    "reload_db_config",
+    "connection_changed",
+]
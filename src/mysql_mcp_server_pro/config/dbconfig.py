@@ -1,11 +1,141 @@
 import os
-from dotenv import load_dotenv
+import threading
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
 
-def get_db_config():
+from dotenv import load_dotenv, dotenv_values
+
+# 影响数据库连接的配置项，变化时需要重建连接池
+CONNECTION_KEYS = (
+    "host", "port", "user", "password", "database",
+    "pool_size", "max_overflow", "pool_recycle", "pool_timeout", "pool_backend", "multi_statements",
+    "bulk_load_local_infile", "pool_pre_ping", "pool_idle_validation", "replicas",
+)
+
+# 当前生效的配置快照，只读，整体替换
+_config: Optional[Mapping[str, Any]] = None
+_config_lock = threading.Lock()
+
+# 启动时加载的env文件，以及加载前进程中已存在的环境变量(优先级高于env文件)
+_env_file: Optional[str] = None
+_process_env_keys: frozenset = frozenset()
+# 从env文件设置到环境变量中的配置项，重新加载时env文件中已删除的配置项需要移除
+_env_file_keys: frozenset = frozenset()
+
+
+def load_env_file(env_file: Optional[str]) -> None:
+    """加载env文件，并记录路径以便重新加载配置时再次读取
+
+    参数:
+        env_file (str): env文件路径
+    """
+    global _env_file, _process_env_keys, _env_file_keys
+    _process_env_keys = frozenset(os.environ)
+    _env_file = env_file
+    load_dotenv(env_file)
+    _env_file_keys = frozenset(os.environ) - _process_env_keys
+
+
+def _refresh_env_file() -> None:
+    """重新读取env文件，进程环境变量中原有的配置项保持不变，env文件中已删除的配置项恢复为默认值"""
+    global _env_file_keys
+    if not _env_file:
+        return
+    values = {key: value for key, value in dotenv_values(_env_file).items()
+              if key not in _process_env_keys and value is not None}
+    for key in _env_file_keys - values.keys():
+        os.environ.pop(key, None)
+    os.environ.update(values)
+    _env_file_keys = frozenset(values)
+
+
+def get_db_config() -> Mapping[str, Any]:
+    """获取当前生效的数据库配置
+
+    配置在首次调用(或 server.main 启动)时从环境变量加载一次，之后直接返回只读快照，
+    可以在热路径中频繁调用。重新加载请使用 reload_db_config
+
+    返回:
+        Mapping: 只读的配置快照，详见 load_db_config
+    """
+    config = _config
+    if config is None:
+        with _config_lock:
+            if _config is None:
+                _set_config(load_db_config())
+            config = _config
+    return config
+
+
+def _set_config(config: Mapping[str, Any]) -> None:
+    global _config
+    _config = config
+
+
+def reload_db_config() -> Tuple[Mapping[str, Any], Mapping[str, Any]]:
+    """重新读取env文件和环境变量，原子地替换配置快照
+
+    返回:
+        (旧配置, 新配置)
+
+    异常:
+        ValueError: 新配置不合法时抛出，此时仍保留旧配置
+    """
+    with _config_lock:
+        _refresh_env_file()
+        new_config = load_db_config()
+        old_config = _config
+        _set_config(new_config)
+    return old_config, new_config
+
+
+def connection_changed(old_config: Optional[Mapping[str, Any]], new_config: Mapping[str, Any]) -> bool:
+    """判断两份配置的数据库连接参数是否不同"""
+    if old_config is None:
+        return True
+    return any(old_config.get(key) != new_config.get(key) for key in CONNECTION_KEYS)
+
+
+def _parse_endpoints(value: str, default_port: int) -> Tuple[Tuple[str, int], ...]:
+    """解析以逗号分隔的 host[:port] 列表
+
+    参数:
+        value (str): 如 "10.0.0.2:3306,10.0.0.3"
+        default_port (int): 未指定端口时使用的端口
+
+    返回:
+        tuple: ((host, port), ...)
+    """
+    endpoints = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        endpoints.append((host.strip(), int(port) if port else default_port))
+    return tuple(endpoints)
+
+
+def _parse_query_timeout(value: str) -> Optional[float]:
+    """解析 QUERY_TIMEOUT
+
+    参数:
+        value (str): 超时秒数，为空表示不限制，"role" 表示按角色取默认值
+
+    返回:
+        float: 超时时间，0表示不限制；None表示按角色取默认值
+    """
+    value = value.strip()
+    if value.lower() == "role":
+        return None
+    return float(value) if value else 0.0
+
+
+def load_db_config() -> Mapping[str, Any]:
     """从环境变量获取数据库配置信息
 
     返回:
-        dict: 包含数据库连接所需的配置信息
+        Mapping: 只读的配置快照，包含数据库连接所需的配置信息
         - host: 数据库主机地址
         - port: 数据库端口
         - user: 数据库用户名
@@ -16,9 +146,6 @@ def get_db_config():
     异常:
         ValueError: 当必需的配置信息缺失时抛出
     """
-    # 加载.env文件
-    ##load_dotenv()
-
     config = {
         "host": os.getenv("MYSQL_HOST", "localhost"),
         "port": int(os.getenv("MYSQL_PORT", "3306")),
@@ -29,13 +156,66 @@ def get_db_config():
         "pool_size": int(os.getenv("POOL_SIZE", 10)),
         "max_overflow": int(os.getenv("POOL_MAX_OVERFLOW", 20)),
         "pool_recycle": int(os.getenv("POOL_RECYCLE", 3600)),
-        "pool_timeout": int(os.getenv("POOL_TIMEOUT", 30))
+        "pool_timeout": int(os.getenv("POOL_TIMEOUT", 30)),
+        "pool_backend": os.getenv("POOL_BACKEND", "sync"),  # sync: pymysql+工作线程, async: aiomysql+AsyncEngine
+        "multi_statements": os.getenv("MULTI_STATEMENTS", "false").lower() == "true",
+        "pool_pre_ping": os.getenv("POOL_PRE_PING", "true").lower() == "true",
+        "pool_idle_validation": float(os.getenv("POOL_IDLE_VALIDATION", 30)),  # 0表示不检测
+        "pool_warmup": os.getenv("POOL_WARMUP", "false").lower() == "true",
+        "pool_keepalive_interval": float(os.getenv("POOL_KEEPALIVE_INTERVAL", 0)),  # 0表示不检测
+        "stream_results": os.getenv("STREAM_RESULTS", "false").lower() == "true",
+        "max_result_rows": int(os.getenv("MAX_RESULT_ROWS", 5000)),
+        "max_result_bytes": int(os.getenv("MAX_RESULT_BYTES", 8 * 1024 * 1024)),
+        "result_page_size": int(os.getenv("RESULT_PAGE_SIZE", 0)),  # 0表示不分页
+        "result_format": os.getenv("RESULT_FORMAT", "csv"),  # csv / jsonl / markdown / json
+        # 语句执行超时(秒)，未设置或0表示不限制，role表示按角色取默认值
+        "query_timeout": _parse_query_timeout(os.getenv("QUERY_TIMEOUT", "")),
+        "response_max_bytes": int(os.getenv("RESPONSE_MAX_BYTES", 0)),  # 0表示不限制
+        "result_handle_max_bytes": int(os.getenv("RESULT_HANDLE_MAX_BYTES", 4 * 1024 * 1024)),
+        "result_handle_max_per_session": int(os.getenv("RESULT_HANDLE_MAX_PER_SESSION", 32)),
+        "result_handle_idle_ttl": int(os.getenv("RESULT_HANDLE_IDLE_TTL", 600)),
+        "health_probe_timeout": float(os.getenv("HEALTH_PROBE_TIMEOUT", 5)),
+        "metadata_cache_ttl": float(os.getenv("METADATA_CACHE_TTL", 300)),  # 0表示不缓存
+        "metadata_cache_max_entries": int(os.getenv("METADATA_CACHE_MAX_ENTRIES", 10000)),
+        "schema_catalog_enabled": os.getenv("SCHEMA_CATALOG_ENABLED", "true").lower() == "true",
+        "schema_catalog_dir": os.getenv("SCHEMA_CATALOG_DIR", "~/.cache/mysql_mcp_server_pro"),
+        "schema_catalog_revalidate_interval": float(os.getenv("SCHEMA_CATALOG_REVALIDATE_INTERVAL", 60)),
+        "query_cache_enabled": os.getenv("QUERY_CACHE_ENABLED", "false").lower() == "true",
+        "query_cache_ttl": float(os.getenv("QUERY_CACHE_TTL", 60)),
+        "query_cache_stale_ttl": float(os.getenv("QUERY_CACHE_STALE_TTL", 0)),
+        "query_cache_max_bytes": int(os.getenv("QUERY_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        "bulk_insert_chunk_size": int(os.getenv("BULK_INSERT_CHUNK_SIZE", 1000)),
+        "bulk_load_local_infile": os.getenv("BULK_LOAD_LOCAL_INFILE", "false").lower() == "true",
+        "export_dir": os.getenv("EXPORT_DIR", "~/.cache/mysql_mcp_server_pro/exports"),
+        "export_parallelism": int(os.getenv("EXPORT_PARALLELISM", 4)),
+        "export_chunk_rows": int(os.getenv("EXPORT_CHUNK_ROWS", 100000)),
+        "slow_call_threshold": float(os.getenv("SLOW_CALL_THRESHOLD", 1)),  # 0表示不记录
+        "slow_call_log_file": os.getenv("SLOW_CALL_LOG_FILE", ""),
+        # 从库列表，只读语句在从库执行
+        "replicas": _parse_endpoints(os.getenv("MYSQL_REPLICAS", ""), int(os.getenv("MYSQL_PORT", "3306"))),
+        "replica_max_lag": float(os.getenv("REPLICA_MAX_LAG", 30)),  # 0表示不限制
+        "replica_check_interval": float(os.getenv("REPLICA_CHECK_INTERVAL", 5)),
+        # 工具通过 database 参数访问其他库时使用的连接池
+        "allowed_databases": tuple(name.strip() for name in os.getenv("ALLOWED_DATABASES", "").split(",")
+                                   if name.strip()),  # 为空表示不限制
+        "tenant_pool_size": int(os.getenv("TENANT_POOL_SIZE", 2)),
+        "tenant_pool_max_overflow": int(os.getenv("TENANT_POOL_MAX_OVERFLOW", 3)),
+        "tenant_engine_idle_ttl": float(os.getenv("TENANT_ENGINE_IDLE_TTL", 300)),  # 0表示不关闭
+        "max_total_connections": int(os.getenv("MAX_TOTAL_CONNECTIONS", 200)),
+        # streamable http 模式下用于断线续传的事件存储
+        "event_store": os.getenv("EVENT_STORE", "memory"),  # memory / sqlite
+        "event_store_path": os.getenv("EVENT_STORE_PATH", "~/.cache/mysql_mcp_server_pro/events.db"),
+        "event_store_ttl": float(os.getenv("EVENT_STORE_TTL", 3600)),  # 0表示不过期
+        "event_store_max_events": int(os.getenv("EVENT_STORE_MAX_EVENTS", 100000)),  # 0表示不限制
+        "event_store_flush_interval": float(os.getenv("EVENT_STORE_FLUSH_INTERVAL", 0.05)),
+        # POST /admin/reload 的访问令牌，为空时关闭该接口
+        "admin_token": os.getenv("ADMIN_TOKEN", ""),
     }
 
     if not all([config["user"], config["password"], config["database"]]):
         raise ValueError("缺少必需的数据库配置")
 
-    return config
+    return MappingProxyType(config)
 
 # 定义角色权限
 ROLE_PERMISSIONS = {
@@ -45,6 +225,24 @@ ROLE_PERMISSIONS = {
              "CREATE", "ALTER", "DROP", "TRUNCATE"]  # 管理员权限
 }
 
+# 各角色的默认语句执行超时(秒)，QUERY_TIMEOUT=role 时使用，写入和DDL语句可能需要更长时间
+ROLE_QUERY_TIMEOUTS = {
+    "readonly": 30,
+    "writer": 60,
+    "admin": 300
+}
+
+def get_role_query_timeout(role: str) -> float:
+    """获取指定角色的默认语句执行超时(秒)
+
+    参数:
+        role (str): 角色名称
+
+    返回:
+        float: 超时时间，0表示不限制
+    """
+    return ROLE_QUERY_TIMEOUTS.get(role, ROLE_QUERY_TIMEOUTS["readonly"])
+
 def get_role_permissions(role: str) -> list:
     """获取指定角色的权限列表
     
@@ -1,14 +1,21 @@
 """
-In-memory event store for demonstrating resumability functionality.
+Event stores for streamable HTTP resumability.
 
-This is a simple implementation intended for examples and testing,
-not for production use where a persistent storage solution would be more appropriate.
+InMemoryEventStore keeps recent events in process memory. SqliteEventStore
+persists events to a local SQLite file so that clients can resume streams
+across server restarts. The store used by the server is selected with the
+EVENT_STORE setting, see create_event_store.
 """
 
+import asyncio
 import logging
-from collections import deque
-from dataclasses import dataclass
-from uuid import uuid4
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Mapping
 
 from mcp.server.streamable_http import (
     EventCallback,
@@ -22,84 +29,395 @@ from mcp.types import JSONRPCMessage
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class EventEntry:
+class StreamBuffer:
     """
-    Represents an event entry in the event store.
+    Ring buffer holding the most recent events of one stream.
+
+    Events are numbered by their offset in the stream. The event with offset
+    o is kept in slot o % capacity, so appending to a full buffer overwrites
+    the oldest event in O(1).
     """
 
-    event_id: EventId
-    stream_id: StreamId
-    message: JSONRPCMessage
+    __slots__ = ("stream_id", "prefix", "events", "event_ids", "capacity", "first", "next", "updated")
+
+    def __init__(self, stream_id: StreamId, prefix: str, capacity: int):
+        self.stream_id = stream_id
+        # event IDs of this stream are prefix + offset
+        self.prefix = prefix
+        # grows up to capacity, then used as a ring
+        self.events: list[JSONRPCMessage | None] = []
+        # event IDs in the same slots as events, built once when stored
+        self.event_ids: list[EventId] = []
+        self.capacity = capacity
+        # offset of the oldest kept event
+        self.first = 0
+        # offset of the next event
+        self.next = 0
+        self.updated = 0.0
+
+    def __len__(self) -> int:
+        return self.next - self.first
+
+    def append(self, message: JSONRPCMessage | None) -> EventId:
+        """Appends an event and returns its ID, overwriting the oldest event when full."""
+        offset = self.next
+        event_id = self.prefix + str(offset)
+        if len(self.events) < self.capacity:
+            self.events.append(message)
+            self.event_ids.append(event_id)
+        else:
+            slot = offset % self.capacity
+            self.events[slot] = message
+            self.event_ids[slot] = event_id
+            if offset - self.first == self.capacity:
+                self.first += 1
+        self.next = offset + 1
+        return event_id
+
+    def drop_oldest(self) -> None:
+        self.events[self.first % self.capacity] = None
+        self.first += 1
 
 
 class InMemoryEventStore(EventStore):
     """
-    Simple in-memory implementation of the EventStore interface for resumability.
-    This is primarily intended for examples and testing, not for production use
-    where a persistent storage solution would be more appropriate.
+    In-memory implementation of the EventStore interface for resumability.
+
+    This implementation keeps only the last N events per stream in a ring
+    buffer. Event IDs have the form "<stream token>-<offset>": the token is
+    drawn from secrets once per stream, so IDs are never reused and an ID of
+    one stream cannot be guessed from another, and replay jumps straight to
+    the slot after the resume offset instead of scanning the stream.
 
-    This implementation keeps only the last N events per stream for memory efficiency.
+    Streams that have not received an event for stream_ttl seconds are
+    dropped, and once max_total_events is exceeded the oldest events of the
+    least recently written streams are dropped, so memory stays bounded as
+    sessions come and go. Events do not survive a restart.
     """
 
-    def __init__(self, max_events_per_stream: int = 100):
+    def __init__(
+        self,
+        max_events_per_stream: int = 100,
+        stream_ttl: float = 0,
+        max_total_events: int = 0,
+    ):
         """Initialize the event store.
 
         Args:
             max_events_per_stream: Maximum number of events to keep per stream
+            stream_ttl: Seconds after the last event before a stream is dropped, 0 to keep streams
+            max_total_events: Maximum number of events to keep across all streams, 0 for no limit
         """
         self.max_events_per_stream = max_events_per_stream
-        # for maintaining last N events per stream
-        self.streams: dict[StreamId, deque[EventEntry]] = {}
-        # event_id -> EventEntry for quick lookup
-        self.event_index: dict[EventId, EventEntry] = {}
+        self.stream_ttl = stream_ttl
+        self.max_total_events = max_total_events
+        # last N events per stream, least recently written stream first
+        self.streams: OrderedDict[StreamId, StreamBuffer] = OrderedDict()
+        # event ID prefix -> stream, for resolving event IDs
+        self.prefixes: dict[str, StreamBuffer] = {}
+        self.total_events = 0
 
     async def store_event(
-        self, stream_id: StreamId, message: JSONRPCMessage
+        self, stream_id: StreamId, message: JSONRPCMessage | None
     ) -> EventId:
-        """Stores an event with a generated event ID."""
-        event_id = str(uuid4())
-        event_entry = EventEntry(
-            event_id=event_id, stream_id=stream_id, message=message
-        )
+        """Stores an event and returns its sequence ID."""
+        now = time.monotonic()
+        self._expire_streams(now)
 
-        # Get or create deque for this stream
-        if stream_id not in self.streams:
-            self.streams[stream_id] = deque(maxlen=self.max_events_per_stream)
+        # Get or create the buffer for this stream
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            stream = StreamBuffer(stream_id, f"{secrets.token_hex(16)}-", self.max_events_per_stream)
+            self.streams[stream_id] = stream
+            self.prefixes[stream.prefix] = stream
+        else:
+            self.streams.move_to_end(stream_id)
+        stream.updated = now
 
-        # If deque is full, the oldest event will be automatically removed
-        # We need to remove it from the event_index as well
-        if len(self.streams[stream_id]) == self.max_events_per_stream:
-            oldest_event = self.streams[stream_id][0]
-            self.event_index.pop(oldest_event.event_id, None)
+        # If the buffer is full, the oldest event is overwritten
+        size = len(stream)
+        event_id = stream.append(message)
+        self.total_events += len(stream) - size
 
-        # Add new event
-        self.streams[stream_id].append(event_entry)
-        self.event_index[event_id] = event_entry
+        if self.max_total_events > 0:
+            while self.total_events > self.max_total_events:
+                self._drop_oldest_event()
 
         return event_id
 
+    def _expire_streams(self, now: float) -> None:
+        """Drops streams whose last event is older than stream_ttl."""
+        if self.stream_ttl <= 0:
+            return
+        deadline = now - self.stream_ttl
+        while self.streams:
+            stream = next(iter(self.streams.values()))
+            if stream.updated > deadline:
+                break
+            self._drop_stream(stream)
+
+    def _drop_oldest_event(self) -> None:
+        """Drops the oldest event of the least recently written stream."""
+        stream = next(iter(self.streams.values()))
+        stream.drop_oldest()
+        self.total_events -= 1
+        if not len(stream):
+            self._drop_stream(stream)
+
+    def _drop_stream(self, stream: StreamBuffer) -> None:
+        del self.streams[stream.stream_id]
+        del self.prefixes[stream.prefix]
+        self.total_events -= len(stream)
+
     async def replay_events_after(
         self,
         last_event_id: EventId,
         send_callback: EventCallback,
     ) -> StreamId | None:
         """Replays events that occurred after the specified event ID."""
-        if last_event_id not in self.event_index:
+        # Resolve the stream and offset encoded in the event ID
+        prefix, _, offset = last_event_id.rpartition("-")
+        stream = self.prefixes.get(prefix + "-")
+        if stream is None or not offset.isdigit() or not stream.first <= int(offset) < stream.next:
+            logger.warning(f"Event ID {last_event_id} not found in store")
+            return None
+
+        # Events after the resume offset, oldest first
+        events, event_ids, capacity = stream.events, stream.event_ids, stream.capacity
+        for offset in range(int(offset) + 1, stream.next):
+            # Overwritten by events stored while replaying
+            if offset < stream.first:
+                continue
+            slot = offset % capacity
+            # Priming events carry no message and are not replayed
+            if events[slot] is not None:
+                await send_callback(EventMessage(events[slot], event_ids[slot]))
+
+        return stream.stream_id
+
+    async def close(self) -> None:
+        """Nothing to release for the in-memory store."""
+
+
+class SqliteEventStore(EventStore):
+    """
+    SQLite implementation of the EventStore interface for resumability.
+
+    Events are appended to a local SQLite file, so streams can be resumed
+    after a server restart. Event IDs have the form "<stream token>-<seq>":
+    the token is drawn from secrets per stream and stored with each event, so
+    an ID of one stream cannot be used to replay another, and seq is a
+    counter kept in the meta table, so IDs are not reused after a restart
+    even when all events have expired.
+
+    - Writes are buffered and committed in batches every flush_interval
+      seconds, so one fsync covers many events. Events stored less than
+      flush_interval before a crash may be lost.
+    - The write buffer is flushed early once it holds max_pending_bytes, and
+      replay reads events page by page, so memory does not grow with the
+      number of stored events.
+    - Events older than stream_ttl are deleted, which removes a stream
+      entirely once it has been idle for stream_ttl. Once more than
+      max_total_events are stored, the oldest events are deleted.
+    """
+
+    # number of events fetched per query during replay
+    REPLAY_PAGE_SIZE = 500
+
+    def __init__(
+        self,
+        path: str,
+        stream_ttl: float = 3600,
+        max_total_events: int = 0,
+        flush_interval: float = 0.05,
+        max_pending_bytes: int = 1024 * 1024,
+    ):
+        """Initialize the event store, creating the database file if needed.
+
+        Args:
+            path: Path of the SQLite database file
+            stream_ttl: Seconds after which events are deleted, 0 to keep events
+            max_total_events: Maximum number of events to keep, 0 for no limit
+            flush_interval: Seconds to buffer events before committing them
+            max_pending_bytes: Size of buffered events that triggers an early commit
+        """
+        self.path = os.path.expanduser(path)
+        self.stream_ttl = stream_ttl
+        self.max_total_events = max_total_events
+        self.flush_interval = flush_interval
+        self.max_pending_bytes = max_pending_bytes
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # WAL with synchronous=FULL fsyncs once per committed batch
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(events)")}
+        if columns and "token" not in columns:
+            # events of older versions have guessable IDs and cannot be resumed
+            self._conn.execute("DROP TABLE events")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "seq INTEGER PRIMARY KEY, stream_id TEXT NOT NULL, token TEXT NOT NULL, "
+            "created REAL NOT NULL, message TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_stream ON events (stream_id, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_created ON events (created)")
+        # the connection is used from worker threads, one at a time
+        self._db_lock = threading.Lock()
+
+        self._seq = self._conn.execute(
+            "SELECT MAX(COALESCE((SELECT value FROM meta WHERE key = 'seq'), 0), "
+            "COALESCE((SELECT MAX(seq) FROM events), 0))"
+        ).fetchone()[0]
+        # token of each stream, least recently written stream first
+        self._tokens: OrderedDict[StreamId, tuple[str, float]] = OrderedDict()
+        self._pending: list[tuple[int, StreamId, str, float, str | None]] = []
+        self._pending_bytes = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self._expired_at = 0.0
+
+    async def store_event(
+        self, stream_id: StreamId, message: JSONRPCMessage | None
+    ) -> EventId:
+        """Buffers an event and returns its stream token and sequence number as the event ID."""
+        now = time.time()
+        token = self._stream_token(stream_id, now)
+        self._seq += 1
+        data = None if message is None else message.model_dump_json(by_alias=True, exclude_none=True)
+        self._pending.append((self._seq, stream_id, token, now, data))
+        self._pending_bytes += len(data or "") + len(stream_id) + len(token)
+
+        if self._pending_bytes >= self.max_pending_bytes:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return f"{token}-{self._seq}"
+
+    def _stream_token(self, stream_id: StreamId, now: float) -> str:
+        """Returns the token of a stream, drawing a new one for streams not seen within stream_ttl."""
+        entry = self._tokens.pop(stream_id, None)
+        token = secrets.token_hex(16) if entry is None else entry[0]
+        self._tokens[stream_id] = (token, now)
+        # streams idle for stream_ttl have no events left, so their tokens are dropped
+        if self.stream_ttl > 0:
+            deadline = now - self.stream_ttl
+            while next(iter(self._tokens.values()))[1] < deadline:
+                self._tokens.popitem(last=False)
+        return token
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Failed to write events to {self.path}: {e}")
+        finally:
+            self._flush_task = None
+
+    async def flush(self) -> None:
+        """Commits buffered events."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending, self._pending_bytes = self._pending, [], 0
+            await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch: list[tuple[int, StreamId, str, float, str | None]]) -> None:
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO events (seq, stream_id, token, created, message) VALUES (?, ?, ?, ?, ?)", batch
+                )
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seq', ?)", (batch[-1][0],))
+                self._expire(batch[-1][0])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _expire(self, last_seq: int) -> None:
+        # deleting by age scans the created index, so it runs at most once a minute
+        now = time.time()
+        if self.stream_ttl > 0 and now - self._expired_at >= min(60.0, self.stream_ttl):
+            self._expired_at = now
+            self._conn.execute("DELETE FROM events WHERE created < ?", (now - self.stream_ttl,))
+        # a primary key range, cheap enough for every batch
+        if self.max_total_events > 0:
+            self._conn.execute("DELETE FROM events WHERE seq <= ?", (last_seq - self.max_total_events,))
+
+    async def replay_events_after(
+        self,
+        last_event_id: EventId,
+        send_callback: EventCallback,
+    ) -> StreamId | None:
+        """Replays events of the same stream stored after the specified event ID."""
+        token, _, seq = last_event_id.rpartition("-")
+        last_seq = int(seq) if seq.isdigit() and token else None
+        if last_seq is not None:
+            await self.flush()
+            stream_id = await asyncio.to_thread(self._fetch_stream_id, token, last_seq)
+        if last_seq is None or stream_id is None:
             logger.warning(f"Event ID {last_event_id} not found in store")
             return None
 
-        # Get the stream and find events after the last one
-        last_event = self.event_index[last_event_id]
-        stream_id = last_event.stream_id
-        stream_events = self.streams.get(last_event.stream_id, deque())
+        while True:
+            rows = await asyncio.to_thread(self._fetch_after, stream_id, last_seq)
+            for last_seq, token, data in rows:
+                # Priming events carry no message and are not replayed
+                if data is not None:
+                    await send_callback(EventMessage(JSONRPCMessage.model_validate_json(data), f"{token}-{last_seq}"))
+            if len(rows) < self.REPLAY_PAGE_SIZE:
+                return stream_id
+
+    def _fetch_stream_id(self, token: str, seq: int) -> StreamId | None:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT stream_id FROM events WHERE seq = ? AND token = ?", (seq, token)
+            ).fetchone()
+        return None if row is None else row[0]
 
-        # Events in deque are already in chronological order
-        found_last = False
-        for event in stream_events:
-            if found_last:
-                await send_callback(EventMessage(event.message, event.event_id))
-            elif event.event_id == last_event_id:
-                found_last = True
+    def _fetch_after(self, stream_id: StreamId, seq: int) -> list[tuple[int, str, str | None]]:
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT seq, token, message FROM events WHERE stream_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (stream_id, seq, self.REPLAY_PAGE_SIZE),
+            ).fetchall()
 
-        return stream_id
+    async def close(self) -> None:
+        """Commits buffered events and closes the database."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        await self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+def create_event_store(config: Mapping[str, Any]) -> EventStore:
+    """Creates the event store selected by the EVENT_STORE setting.
+
+    Args:
+        config: Server configuration, see load_db_config
+
+    Returns:
+        InMemoryEventStore for "memory", SqliteEventStore for "sqlite"
+    """
+    kind = config.get("event_store", "memory")
+    if kind == "sqlite":
+        return SqliteEventStore(
+            config.get("event_store_path", "~/.cache/mysql_mcp_server_pro/events.db"),
+            stream_ttl=config.get("event_store_ttl", 3600),
+            max_total_events=config.get("event_store_max_events", 100000),
+            flush_interval=config.get("event_store_flush_interval", 0.05),
+        )
+    if kind != "memory":
+        raise ValueError(f"Unsupported EVENT_STORE: {kind}")
+    return InMemoryEventStore(
+        stream_ttl=config.get("event_store_ttl", 3600),
+        max_total_events=config.get("event_store_max_events", 100000),
+    )
@@ -4,4 +4,11 @@ class SQLPermissionError(Exception):
 
 class SQLExecutionError(Exception):
     """SQL 执行错误"""
-    pass 
\ No newline at end of file
+    pass 
+class QueryTimeoutError(Exception):
+    """SQL 执行超时"""
+    pass
+
+class EngineLimitError(Exception):
+    """连接数达到上限"""
+    pass
@@ -8,6 +8,10 @@ from .get_db_health_running import GetDBHealthRunning
 from .get_db_health_index_usage import GetDBHealthIndexUsage
 from .use_prompt_queryTableData import UsePromptQueryTableData
 from .optimize_sql import OptimizeSql
+from .fetch_result_page import FetchResultPage
+from .bulk_insert import BulkInsert
+from .export_table import ExportTable
+from .get_server_stats import GetServerStats
 
 __all__ = [
     "ExecuteSQL",
@@ -19,5 +23,9 @@ __all__ = [
     "GetDBHealthRunning",
     "GetDBHealthIndexUsage",
     "UsePromptQueryTableData",
-    "OptimizeSql"
+    "OptimizeSql",
+    "FetchResultPage",
+    "BulkInsert",
+    "ExportTable",
+    "GetServerStats"
 ]
\ No newline at end of file
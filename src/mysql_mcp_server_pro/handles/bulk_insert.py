@@ -0,0 +1,90 @@
+from typing import Dict, Any, Sequence
+
+from mcp import Tool
+from mcp.types import TextContent
+
+from .base import BaseHandler
+from ..utils.bulk_loader import BULK_FORMATS, BulkLoader, parse_rows
+from ..utils.execute_sql_util import ExecuteSqlUtil
+
+
+class BulkInsert(BaseHandler):
+    name = "bulk_insert"
+    description = (
+        "将CSV或JSON数据按批写入表中，每批提交一次，适合导入大量数据(需要INSERT权限)"
+        "(Bulk load CSV or JSON rows into a table in committed chunks)"
+    )
+
+    def get_tool_description(self) -> Tool:
+        return Tool(
+            name=self.name,
+            description=self.description,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "table": {
+                        "type": "string",
+                        "description": "目标表名，可使用 库名.表名"
+                    },
+                    "database": {
+                        "type": "string",
+                        "description": "要访问的库名(可选，默认为服务端配置的库)"
+                    },
+                    "data": {
+                        "type": "string",
+                        "description": "待导入的数据。csv: 首行为列名，NULL 表示空值；json: 对象数组或数组的数组；"
+                                       "jsonl: 每行一个对象或数组"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": list(BULK_FORMATS),
+                        "description": "数据格式(可选，默认csv)"
+                    },
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "列名(可选，默认从数据中读取；指定时csv的首行即为数据)"
+                    },
+                    "chunk_size": {
+                        "type": "integer",
+                        "description": "每批写入的行数(可选，默认取服务端配置)"
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "每批的执行超时时间(秒)(可选，默认且最大取当前角色的超时时间)"
+                    }
+                },
+                "required": ["table", "data"]
+            }
+        )
+
+    async def run_tool(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
+        """批量导入数据
+
+        参数:
+            table (str): 目标表名
+            data (str): 待导入的数据
+            format (str): 数据格式，可选
+            columns (list[str]): 列名，可选
+            chunk_size (int): 每批行数，可选
+            timeout (float): 每批的超时时间，可选
+            database (str): 库名，可选
+
+        返回:
+            list[TextContent]: 导入结果，包含已提交的行数和导入速度
+        """
+        try:
+            if "table" not in arguments or "data" not in arguments:
+                raise ValueError("缺少表名或数据")
+
+            columns, rows = parse_rows(arguments["data"], arguments.get("format", "csv"), arguments.get("columns"))
+            if not rows:
+                return [TextContent(type="text", text="没有需要导入的数据")]
+
+            exe = ExecuteSqlUtil(timeout=arguments.get("timeout"), database=arguments.get("database"))
+            loader = BulkLoader(exe, arguments.get("chunk_size"))
+            result = await loader.load(arguments["table"], columns, rows)
+            return [TextContent(type="text", text=result.summary())]
+
+        except Exception as e:
+            return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
@@ -1,4 +1,4 @@
-from typing import Dict, Any, Sequence
+from typing import Dict, Any, Optional, Sequence, Union
 import logging
 
 from mcp import Tool
@@ -6,11 +6,37 @@ from mcp.types import TextContent
 
 from .base import BaseHandler
 from mysql_mcp_server_pro.exception.exceptions import SQLExecutionError
+from ..config import get_db_config
 from ..utils.execute_sql_util import ExecuteSqlUtil
+from ..utils.engine_registry import validate_database
+from ..utils.result_handle import ResultPager
+from ..utils.result_encoder import RESULT_FORMATS, validate_result_format
+from ..utils.response_budget import ResponseBudget
+from ..utils.sql_params import is_executemany, validate_params
 
 
 logger = logging.getLogger(__name__)
 
+# 多条语句结果之间的分隔符
+RESULT_SEPARATOR = "\n---\n"
+
+
+def _validate_number(arguments: Dict[str, Any], name: str, minimum: int = 0,
+                     integer: bool = True) -> Optional[Union[int, float]]:
+    """校验数值参数，未传入时返回None
+
+    Raises:
+        ValueError: 参数不是数值或小于 minimum
+    """
+    value = arguments.get(name)
+    if value is None:
+        return None
+    number_types = int if integer else (int, float)
+    if isinstance(value, bool) or not isinstance(value, number_types) or value < minimum:
+        kind = "整数" if integer else "数值"
+        raise ValueError(f"{name} 必须是不小于{minimum}的{kind}: {value!r}")
+    return value
+
 class ExecuteSQL(BaseHandler):
     """SQL 执行处理器"""
     
@@ -28,6 +54,48 @@ class ExecuteSQL(BaseHandler):
                     "query": {
                         "type": "string",
                         "description": "要执行的SQL语句"
+                    },
+                    "params": {
+                        "type": ["object", "array"],
+                        "items": {"type": "object"},
+                        "description": "SQL中 :name 形式命名参数的值，如 {\"id\": 1}，值为数组时展开为 IN 列表；"
+                                       "为对象数组时按每组参数批量执行同一条非查询语句(executemany)。"
+                                       "使用参数时只能执行一条SQL语句(可选)"
+                    },
+                    "max_rows": {
+                        "type": "integer",
+                        "description": "每条查询最多返回的行数，超出部分截断(可选，默认取服务端配置)"
+                    },
+                    "page_size": {
+                        "type": "integer",
+                        "description": "单条SELECT语句分页返回时每页的行数，结果超过一页时返回结果句柄，"
+                                       "可通过 fetch_result_page 读取后续页(可选，默认取服务端配置，0表示不分页)"
+                    },
+                    "transaction": {
+                        "type": "boolean",
+                        "description": "是否在同一个事务中执行所有语句，任一语句失败则全部回滚(可选，默认false)"
+                    },
+                    "database": {
+                        "type": "string",
+                        "description": "执行SQL时的当前库(可选，默认为服务端配置的库)"
+                    },
+                    "use_primary": {
+                        "type": "boolean",
+                        "description": "配置了从库时，只读语句也在主库执行，用于读取刚写入的数据(可选，默认false)"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": list(RESULT_FORMATS),
+                        "description": "查询结果的输出格式: csv、jsonl(每行一个JSON对象)、markdown(表格)、"
+                                       "json(紧凑的带类型JSON)(可选，默认取服务端配置)"
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "执行超时时间(秒)，超时后终止服务端正在执行的语句(可选，默认且最大取服务端配置的超时时间)"
+                    },
+                    "max_response_bytes": {
+                        "type": "integer",
+                        "description": "本次响应的大小上限(字节)，超出时只返回前面的行和各列统计(可选，默认且最大取服务端配置)"
                     }
                 },
                 "required": ["query"]
@@ -49,16 +117,50 @@ class ExecuteSQL(BaseHandler):
         query = arguments["query"]
         
         try:
-            exe = ExecuteSqlUtil()
-            sql_results = exe.execute_multiple_statements(query)
+            params = validate_params(arguments.get("params"))
+            database = validate_database(arguments["database"]) if arguments.get("database") else None
+            result_format = validate_result_format(arguments["format"]) if arguments.get("format") else None
+            max_rows = _validate_number(arguments, "max_rows", minimum=1)
+            page_size = _validate_number(arguments, "page_size")
+            timeout = _validate_number(arguments, "timeout", integer=False)
+            max_response_bytes = _validate_number(arguments, "max_response_bytes")
+        except ValueError as e:
+            return [TextContent(type="text", text=f"错误: {str(e)}")]
+
+        try:
+            exe = ExecuteSqlUtil(max_rows=max_rows, result_format=result_format,
+                                 timeout=timeout, use_replicas=not arguments.get("use_primary", False),
+                                 database=database)
+            # 所有语句的结果共享同一个响应大小预算
+            budget = ResponseBudget.for_call(max_response_bytes)
+
+            # 单条SELECT语句按页返回，超过一页时返回结果句柄
+            if page_size is None:
+                page_size = get_db_config().get("result_page_size", 0)
+            statements = exe.split_statements(query)
+            if params is not None and len(statements) != 1:
+                return [TextContent(type="text", text="错误: 使用 params 时只能执行一条SQL语句")]
+            if page_size and len(statements) == 1 and not is_executemany(params):
+                pager = ResultPager(exe)
+                if pager.is_pageable(statements[0]):
+                    result, handle_id = await pager.open(statements[0], page_size, params)
+                    return [TextContent(type="text", text=pager.format_page(result, handle_id, budget))]
+
+            if params is not None:
+                sql_results = [await exe.execute_single_statement(statements[0], params)]
+            else:
+                sql_results = await exe.execute_multiple_statements(statements,
+                                                                    transactional=arguments.get("transaction", False))
             
-            # 格式化结果
+            # 格式化结果，按顺序消耗预算，靠后的查询结果在预算用尽后只保留列统计
             results = []
             for result in sql_results:
-                formatted_result = exe.format_result(result)
+                if results:
+                    budget.consume(RESULT_SEPARATOR)
+                formatted_result = exe.format_result(result, budget)
                 results.append(formatted_result)
             
-            return [TextContent(type="text", text="\n---\n".join(results))]
+            return [TextContent(type="text", text=RESULT_SEPARATOR.join(results))]
             
         except SQLExecutionError as e:
             return [TextContent(type="text", text=str(e))]
\ No newline at end of file
@@ -0,0 +1,79 @@
+from typing import Dict, Any, Sequence
+
+from mcp import Tool
+from mcp.types import TextContent
+
+from .base import BaseHandler
+from ..utils.execute_sql_util import ExecuteSqlUtil
+from ..utils.table_exporter import EXPORT_FORMATS, TableExporter
+
+
+class ExportTable(BaseHandler):
+    name = "export_table"
+    description = (
+        "将整张表按主键区间并发导出为服务端本地目录中的CSV或Parquet文件，只返回导出摘要"
+        "(Export a table to local CSV/Parquet files in parallel primary-key ranges)"
+    )
+
+    def get_tool_description(self) -> Tool:
+        return Tool(
+            name=self.name,
+            description=self.description,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "table": {
+                        "type": "string",
+                        "description": "要导出的表名，可使用 库名.表名"
+                    },
+                    "database": {
+                        "type": "string",
+                        "description": "要访问的库名(可选，默认为服务端配置的库)"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": list(EXPORT_FORMATS),
+                        "description": "文件格式(可选，默认csv；parquet需要安装pyarrow)"
+                    },
+                    "parallelism": {
+                        "type": "integer",
+                        "description": "并发导出的连接数(可选，默认取服务端配置，不超过连接池大小)"
+                    },
+                    "chunk_rows": {
+                        "type": "integer",
+                        "description": "每个文件的大致行数(可选，默认取服务端配置)"
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "每个文件的导出超时时间(秒)(可选，默认且最大取当前角色的超时时间)"
+                    }
+                },
+                "required": ["table"]
+            }
+        )
+
+    async def run_tool(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
+        """导出表数据
+
+        参数:
+            table (str): 表名
+            format (str): 文件格式，可选
+            parallelism (int): 并发连接数，可选
+            chunk_rows (int): 每个文件的大致行数，可选
+            timeout (float): 每个文件的超时时间，可选
+            database (str): 库名，可选
+
+        返回:
+            list[TextContent]: 导出摘要，包含文件数、行数、字节数、耗时和清单文件路径
+        """
+        try:
+            if "table" not in arguments:
+                raise ValueError("缺少表名")
+
+            exe = ExecuteSqlUtil(timeout=arguments.get("timeout"), database=arguments.get("database"))
+            exporter = TableExporter(exe, arguments.get("parallelism"), arguments.get("chunk_rows"))
+            result = await exporter.export(arguments["table"], arguments.get("format", "csv"))
+            return [TextContent(type="text", text=result.summary())]
+
+        except Exception as e:
+            return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
@@ -0,0 +1,71 @@
+from typing import Dict, Any, Sequence
+
+from mcp import Tool
+from mcp.types import TextContent
+
+from .base import BaseHandler
+from ..utils.execute_sql_util import ExecuteSqlUtil
+from ..utils.result_handle import ResultPager
+from ..utils.result_encoder import RESULT_FORMATS
+from ..utils.response_budget import ResponseBudget
+
+
+class FetchResultPage(BaseHandler):
+    name = "fetch_result_page"
+    description = (
+        "根据execute_sql返回的结果句柄读取查询结果的下一页"
+        "(Fetch the next page of a large query result by the handle returned from execute_sql)"
+    )
+
+    def get_tool_description(self) -> Tool:
+        return Tool(
+            name=self.name,
+            description=self.description,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "handle": {
+                        "type": "string",
+                        "description": "execute_sql返回的结果句柄"
+                    },
+                    "page_size": {
+                        "type": "integer",
+                        "description": "本页的行数(可选，默认沿用execute_sql的分页大小)"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": list(RESULT_FORMATS),
+                        "description": "查询结果的输出格式: csv、jsonl、markdown、json(可选，默认取服务端配置)"
+                    },
+                    "max_response_bytes": {
+                        "type": "integer",
+                        "description": "本次响应的大小上限(字节)，超出时本页只返回前面的行，其余行在下一页中读取(可选，默认且最大取服务端配置)"
+                    }
+                },
+                "required": ["handle"]
+            }
+        )
+
+    async def run_tool(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
+        """读取结果句柄的下一页
+
+        参数:
+            handle (str): 结果句柄
+            page_size (int): 本页的行数，可选
+            format (str): 输出格式，可选
+            max_response_bytes (int): 响应大小上限，可选
+
+        返回:
+            list[TextContent]: 本页结果，还有下一页时结尾附上句柄
+        """
+        try:
+            if "handle" not in arguments:
+                raise ValueError("缺少结果句柄")
+
+            pager = ResultPager(ExecuteSqlUtil(result_format=arguments.get("format")))
+            result, handle_id = await pager.next_page(arguments["handle"], arguments.get("page_size"))
+            budget = ResponseBudget.for_call(arguments.get("max_response_bytes"))
+            return [TextContent(type="text", text=pager.format_page(result, handle_id, budget))]
+
+        except Exception as e:
+            return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
@@ -5,6 +5,7 @@ from mcp.types import TextContent
 
 from .base import BaseHandler
 from mysql_mcp_server_pro.config import get_db_config
+from mysql_mcp_server_pro.utils.response_budget import ResponseBudget
 from mysql_mcp_server_pro.handles import (
     ExecuteSQL
 )
@@ -33,6 +34,8 @@ class GetDBHealthIndexUsage(BaseHandler):
 
     async def run_tool(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
         config = get_db_config()
+        # 三项查询平分响应大小预算
+        arguments = {**arguments, "max_response_bytes": ResponseBudget.for_call().split(3)}
 
         count_zero_result = await self.get_count_zero(arguments,config)
         max_time_result = await self.get_max_timer(arguments,config)
@@ -54,9 +57,10 @@ class GetDBHealthIndexUsage(BaseHandler):
     async def get_count_zero(self, arguments: Dict[str, Any], config) -> Sequence[TextContent]:
         try:
             sql = "SELECT object_name,index_name,count_star from performance_schema.table_io_waits_summary_by_index_usage "
-            sql += f"WHERE object_schema = '{config['database']}' and count_star = 0 AND sum_timer_wait = 0 ;"
+            sql += "WHERE object_schema = :schema and count_star = 0 AND sum_timer_wait = 0 ;"
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "params": {"schema": config['database']},
+                                               "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
 
@@ -67,10 +71,11 @@ class GetDBHealthIndexUsage(BaseHandler):
     async def get_max_timer(self, arguments: Dict[str, Any], config) -> Sequence[TextContent]:
         try:
             sql = "SELECT object_schema,object_name,index_name,(max_timer_wait / 1000000000000) max_timer_wait "
-            sql += f"FROM performance_schema.table_io_waits_summary_by_index_usage where object_schema = '{config['database']}' "
+            sql += "FROM performance_schema.table_io_waits_summary_by_index_usage where object_schema = :schema "
             sql += "and index_name is not null ORDER BY  max_timer_wait DESC;"
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "params": {"schema": config['database']},
+                                               "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
 
@@ -80,9 +85,10 @@ class GetDBHealthIndexUsage(BaseHandler):
     async def get_not_used_index(self, arguments: Dict[str, Any], config) -> Sequence[TextContent]:
         try:
             sql = "SELECT object_schema,object_name, (max_timer_wait / 1000000000000) max_timer_wait "
-            sql += f"FROM performance_schema.table_io_waits_summary_by_index_usage where object_schema = '{config['database']}' "
+            sql += "FROM performance_schema.table_io_waits_summary_by_index_usage where object_schema = :schema "
             sql += "and index_name IS null and max_timer_wait > 30000000000000 ORDER BY max_timer_wait DESC limit 5;"
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "params": {"schema": config['database']},
+                                               "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
\ No newline at end of file
@@ -1,9 +1,14 @@
-from typing import Dict, Any, Sequence
+import asyncio
+import time
+from typing import Dict, Any, Sequence, Callable, Awaitable, Tuple
 
 from mcp import Tool
 from mcp.types import TextContent
 
 from .base import BaseHandler
+from mysql_mcp_server_pro.config import get_db_config
+from mysql_mcp_server_pro.utils.execute_sql_util import ExecuteSqlUtil
+from mysql_mcp_server_pro.utils.response_budget import ResponseBudget
 
 from mysql_mcp_server_pro.handles import (
     ExecuteSQL
@@ -24,26 +29,61 @@ class GetDBHealthRunning(BaseHandler):
             inputSchema={
                 "type": "object",
                 "properties": {
-
+                    "timeout": {
+                        "type": "number",
+                        "description": "每项检查的超时时间(秒)，默认取配置 HEALTH_PROBE_TIMEOUT"
+                    },
+                    "max_response_bytes": {
+                        "type": "integer",
+                        "description": "响应的大小上限(字节)，由各检查项平分(可选，默认且最大取服务端配置)"
+                    }
                 }
             }
         )
 
     async def run_tool(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
-        lock_result = await self.get_lock(arguments)
-        processlist_result = await self.get_processlist(arguments)
-        status_result = await self.get_status(arguments)
-        trx_result = await self.get_trx(arguments)
+        timeout = float(arguments.get("timeout") or get_db_config().get("health_probe_timeout", 5))
+
+        # 各检查项并发执行，每项使用独立的连接池连接，互不阻塞
+        probes = [
+            ("processlist", self.get_processlist),
+            ("lock", self.get_lock),
+            ("trx", self.get_trx),
+            ("status", self.get_status),
+        ]
+        # 各检查项并发输出结果，平分响应大小预算
+        budget = ResponseBudget.for_call(arguments.get("max_response_bytes"))
+        probe_arguments = {**arguments, "max_response_bytes": budget.split(len(probes))}
+        results = await asyncio.gather(*(
+            self.run_probe(name, probe, probe_arguments, timeout) for name, probe in probes
+        ))
+
+        # 合并结果，先给出每项检查的状态
+        summary = "\n".join(f"-- [{name}] {status}" for name, status, _ in results)
+        combined_result = [TextContent(type="text", text=f"健康检查状态:\n{summary}")]
+        for _, _, contents in results:
+            combined_result.extend(contents)
 
+        return combined_result
 
-        # 合并结果
-        combined_result = []
-        combined_result.extend(processlist_result)
-        combined_result.extend(lock_result)
-        combined_result.extend(trx_result)
-        combined_result.extend(status_result)
+    async def run_probe(self, name: str,
+                        probe: Callable[[Dict[str, Any]], Awaitable[Sequence[TextContent]]],
+                        arguments: Dict[str, Any], timeout: float) -> Tuple[str, str, Sequence[TextContent]]:
+        """执行单项检查，超时后不再等待，返回 (检查项, 状态, 结果)
 
-        return combined_result
+        超时的检查项被取消后不等待其结束(正在执行的语句在后台终止)，报告在 timeout 后立即返回
+        """
+        start = time.perf_counter()
+        task = asyncio.ensure_future(probe(arguments))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+        finally:
+            if not task.done():
+                task.cancel()
+        if not done:
+            return name, f"超时(timeout after {timeout:g}s)", []
+        elapsed = (time.perf_counter() - start) * 1000
+        return name, f"完成(ok, {elapsed:.0f}ms)", task.result()
 
     """
         获取连接情况
@@ -52,7 +92,7 @@ class GetDBHealthRunning(BaseHandler):
         try:
             sql = "SHOW FULL PROCESSLIST;SHOW VARIABLES LIKE 'max_connections';"
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "use_primary": True, "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
 
@@ -63,7 +103,7 @@ class GetDBHealthRunning(BaseHandler):
         try:
             sql = "SHOW ENGINE INNODB STATUS;"
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "use_primary": True, "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
 
@@ -73,7 +113,7 @@ class GetDBHealthRunning(BaseHandler):
     async def get_trx(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
         try:
             sql = "SELECT * FROM INFORMATION_SCHEMA.INNODB_TRX;"
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "use_primary": True, "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
 
@@ -83,11 +123,17 @@ class GetDBHealthRunning(BaseHandler):
     """
     async def get_lock(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
         try:
-            sql = "SHOW OPEN TABLES WHERE In_use > 0;select * from information_schema.innodb_locks;select * from information_schema.innodb_lock_waits;"
-            sql += "select * from performance_schema.data_lock_waits;"
-            sql += "select * from performance_schema.data_locks;"
+            sql = "SHOW OPEN TABLES WHERE In_use > 0;"
+
+            # 按服务端能力只执行可用的行级锁查询，探测失败时两种查询都执行
+            capabilities = await ExecuteSqlUtil.get_capabilities()
+            if capabilities is None or capabilities.supports_innodb_locks:
+                sql += "select * from information_schema.innodb_locks;select * from information_schema.innodb_lock_waits;"
+            if capabilities is None or capabilities.supports_data_locks:
+                sql += "select * from performance_schema.data_lock_waits;"
+                sql += "select * from performance_schema.data_locks;"
 
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "use_primary": True, "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
\ No newline at end of file
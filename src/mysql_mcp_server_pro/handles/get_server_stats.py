@@ -0,0 +1,37 @@
+from typing import Dict, Any, Sequence
+
+from mcp import Tool
+from mcp.types import TextContent
+
+from .base import BaseHandler
+from ..utils.metrics import render_metrics
+
+
+class GetServerStats(BaseHandler):
+    name = "get_server_stats"
+    description = (
+        "获取本服务的运行指标: 连接池使用情况、借出连接的等待时间、各工具的耗时、返回行数、字节数和错误次数"
+        "(Get server metrics in Prometheus text format)"
+    )
+
+    def get_tool_description(self) -> Tool:
+        return Tool(
+            name=self.name,
+            description=self.description,
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        )
+
+    async def run_tool(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
+        """获取运行指标，与 HTTP 模式的 /metrics 接口内容相同
+
+        返回:
+            list[TextContent]: Prometheus 文本格式的指标
+        """
+        try:
+            return [TextContent(type="text", text=render_metrics())]
+
+        except Exception as e:
+            return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
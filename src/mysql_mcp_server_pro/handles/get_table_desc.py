@@ -4,10 +4,8 @@ from mcp import Tool
 from mcp.types import TextContent
 
 from .base import BaseHandler
-from mysql_mcp_server_pro.config import get_db_config
-from mysql_mcp_server_pro.handles import (
-    ExecuteSQL
-)
+from mysql_mcp_server_pro.utils.execute_sql_util import ExecuteSqlUtil
+from mysql_mcp_server_pro.utils.table_metadata import TableMetadata
 
 
 class GetTableDesc(BaseHandler):
@@ -26,6 +24,10 @@ class GetTableDesc(BaseHandler):
                     "text": {
                         "type": "string",
                         "description": "要搜索的表名"
+                    },
+                    "database": {
+                        "type": "string",
+                        "description": "要访问的库名(可选，默认为服务端配置的库)"
                     }
                 },
                 "required": ["text"]
@@ -37,6 +39,7 @@ class GetTableDesc(BaseHandler):
 
             参数:
                 text (str): 要查询的表名，多个表名以逗号分隔
+                database (str): 库名，可选
 
             返回:
                 list[TextContent]: 包含查询结果的TextContent列表
@@ -50,17 +53,13 @@ class GetTableDesc(BaseHandler):
 
                 text = arguments["text"]
 
-                config = get_db_config()
-                execute_sql = ExecuteSQL()
+                exe = ExecuteSqlUtil(database=arguments.get("database"))
+                metadata = TableMetadata(exe)
 
-                # 将输入的表名按逗号分割成列表
+                # 将输入的表名按逗号分割成列表，优先从元数据缓存中读取
                 table_names = [name.strip() for name in text.split(',')]
-                # 构建IN条件
-                table_condition = "','".join(table_names)
-                sql = "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_COMMENT "
-                sql += f"FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = '{config['database']}' "
-                sql += f"AND TABLE_NAME IN ('{table_condition}') ORDER BY TABLE_NAME, ORDINAL_POSITION;"
-                return await execute_sql.run_tool({"query":sql})
+                result = await metadata.get_columns(exe.database, table_names)
+                return [TextContent(type="text", text=metadata.exe.format_result(result))]
 
             except Exception as e:
                 return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
\ No newline at end of file
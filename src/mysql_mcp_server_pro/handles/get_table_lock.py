@@ -4,6 +4,8 @@ from mcp import Tool
 from mcp.types import TextContent
 
 from .base import BaseHandler
+from ..utils.execute_sql_util import ExecuteSqlUtil
+from ..utils.response_budget import ResponseBudget
 
 from mysql_mcp_server_pro.handles import (
     ExecuteSQL
@@ -30,16 +32,24 @@ class GetTableLock(BaseHandler):
         )
 
     async def run_tool(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
+        # 表级锁和两种行级锁查询平分响应大小预算
+        arguments = {**arguments, "max_response_bytes": ResponseBudget.for_call().split(3)}
         use_result = await self.get_table_use(arguments)
-        lock_result_5 = await self.get_table_lock_for_mysql5(arguments)
-        lock_result_8 = await self.get_table_lock_for_mysql8(arguments)
-        
-        # 合并两个结果
+
         combined_result = []
         combined_result.extend(use_result)
-        combined_result.extend(lock_result_5)
-        combined_result.extend(lock_result_8)
-        
+
+        # 按服务端能力只执行可用的行级锁查询，探测失败时两种查询都执行
+        capabilities = await ExecuteSqlUtil.get_capabilities()
+        if capabilities is None or capabilities.supports_innodb_locks:
+            combined_result.extend(await self.get_table_lock_for_mysql5(arguments))
+        if capabilities is None or capabilities.supports_data_locks:
+            combined_result.extend(await self.get_table_lock_for_mysql8(arguments))
+        if capabilities is not None and not capabilities.supports_innodb_locks \
+                and not capabilities.supports_data_locks:
+            combined_result.append(TextContent(
+                type="text", text="当前服务端未开启performance_schema，无法查询行级锁情况"))
+
         return combined_result
 
     """
@@ -49,7 +59,7 @@ class GetTableLock(BaseHandler):
         try:
             sql = "SHOW OPEN TABLES WHERE In_use > 0;"
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "use_primary": True, "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
 
@@ -78,7 +88,7 @@ class GetTableLock(BaseHandler):
             sql += "INNER JOIN information_schema.PROCESSLIST p2 ON p2.ID = r.trx_mysql_thread_id "
             sql += "ORDER BY 等待时间 DESC;"
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "use_primary": True, "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
 
@@ -104,6 +114,6 @@ class GetTableLock(BaseHandler):
             sql += "JOIN information_schema.processlist p2 ON r.trx_mysql_thread_id = p2.ID "
             sql += "ORDER BY '等待时间' DESC;"
 
-            return await execute_sql.run_tool({"query": sql})
+            return await execute_sql.run_tool({"query": sql, "use_primary": True, "max_response_bytes": arguments.get("max_response_bytes")})
         except Exception as e:
             return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
\ No newline at end of file
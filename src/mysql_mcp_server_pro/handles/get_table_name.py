@@ -4,10 +4,8 @@ from mcp import Tool
 from mcp.types import TextContent
 
 from .base import BaseHandler
-from mysql_mcp_server_pro.config import get_db_config
-from mysql_mcp_server_pro.handles import (
-    ExecuteSQL
-)
+from mysql_mcp_server_pro.utils.execute_sql_util import ExecuteSqlUtil
+from mysql_mcp_server_pro.utils.table_metadata import TableMetadata
 
 
 class GetTableName(BaseHandler):
@@ -27,6 +25,10 @@ class GetTableName(BaseHandler):
                     "text": {
                         "type": "string",
                         "description": "要搜索的表中文名、表描述，仅支持单个查询"
+                    },
+                    "database": {
+                        "type": "string",
+                        "description": "要访问的库名(可选，默认为服务端配置的库)"
                     }
                 },
                 "required": ["text"]
@@ -38,6 +40,7 @@ class GetTableName(BaseHandler):
 
             参数:
                 text (str): 要搜索的表中文注释关键词
+                database (str): 库名，可选
 
             返回:
                 list[TextContent]: 包含查询结果的TextContent列表
@@ -50,12 +53,11 @@ class GetTableName(BaseHandler):
 
                 text = arguments["text"]
 
-                config = get_db_config()
-                execute_sql = ExecuteSQL()
+                exe = ExecuteSqlUtil(database=arguments.get("database"))
+                metadata = TableMetadata(exe)
 
-                sql = "SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_COMMENT "
-                sql += f"FROM information_schema.TABLES WHERE TABLE_SCHEMA = '{config['database']}' AND TABLE_COMMENT LIKE '%{text}%';"
-                return await execute_sql.run_tool({"query":sql})
+                result = await metadata.search_tables(exe.database, text)
+                return [TextContent(type="text", text=metadata.exe.format_result(result))]
 
             except Exception as e:
                 return [TextContent(type="text", text=f"执行查询时出错: {str(e)}")]
\ No newline at end of file
@@ -9,8 +9,10 @@ from mysql_mcp_server_pro.config import get_db_config
 
 from mysql_mcp_server_pro.exception.exceptions import SQLExecutionError
 from ..utils.execute_sql_util import ExecuteSqlUtil
+from ..utils.table_metadata import TableMetadata
 
 execute_sql = ExecuteSqlUtil()
+metadata = TableMetadata(execute_sql)
 
 class OptimizeSql(BaseHandler):
     name = "optimize_sql"
@@ -48,16 +50,16 @@ class OptimizeSql(BaseHandler):
             tables = self.get_sql_all_tables(text)
 
             # 查询表的数据量
-            table_count = self.get_tables_count(tables, config)
+            table_count = await self.get_tables_count(tables, config)
 
             # 查询表的索引情况
-            table_index = self.get_tables_index(tables, config)
+            table_index = await self.get_tables_index(tables, config)
 
             # 获取sql的执行过程
-            sql_explain = self.get_sql_execution_process(text, config)
+            sql_explain = await self.get_sql_execution_process(text, config)
 
             # 获取表的结构信息
-            table_schemas = self.get_tables_schemas(tables, config)
+            table_schemas = await self.get_tables_schemas(tables, config)
 
             result = f"""
                         # 角色
@@ -248,44 +250,17 @@ class OptimizeSql(BaseHandler):
 
         return list(table_names)
 
-    def get_tables_index(self,tables,config) -> str:
+    async def get_tables_index(self,tables,config) -> str:
+        return execute_sql.format_result(await metadata.get_indexes(config['database'], tables))
 
-        table_condition = "','".join(tables)
+    async def get_tables_count(self, tables,config) -> str:
+        return execute_sql.format_result(await metadata.get_sizes(config['database'], tables))
 
-        sql = "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, SEQ_IN_INDEX, NON_UNIQUE, INDEX_TYPE "
-        sql += f"FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = '{config['database']}' "
-        sql += f"AND TABLE_NAME IN ('{table_condition}') ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX;"
-
-        return execute_sql.format_result(execute_sql.execute_single_statement(sql))
-
-    def get_tables_count(self, tables,config) -> str:
-        table_condition = "','".join(tables)
-
-        sql = f"""
-            SELECT 
-                table_name AS `Table`, 
-                round(((data_length + index_length) / 1024 / 1024), 2) AS `Size (MB)`
-            FROM 
-                information_schema.tables
-            WHERE 
-                table_schema = '{config['database']}'
-                AND table_name in ('{table_condition}')  
-            ORDER BY 
-                (data_length + index_length) DESC;
-
-        """
-
-        return execute_sql.format_result(execute_sql.execute_single_statement(sql))
-
-    def get_sql_execution_process(self, text, config) -> str:
+    async def get_sql_execution_process(self, text, config) -> str:
         sql = "EXPLAIN " + text
 
-        return execute_sql.format_result(execute_sql.execute_single_statement(sql))
+        return execute_sql.format_result(await execute_sql.execute_single_statement(sql))
 
-    def get_tables_schemas(self, tables,config) -> str:
-        table_condition = "','".join(tables)
-        sql = "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_COMMENT "
-        sql += f"FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = '{config['database']}' "
-        sql += f"AND TABLE_NAME IN ('{table_condition}') ORDER BY TABLE_NAME, ORDINAL_POSITION;"
-        return execute_sql.format_result(execute_sql.execute_single_statement(sql))
+    async def get_tables_schemas(self, tables,config) -> str:
+        return execute_sql.format_result(await metadata.get_columns(config['database'], tables))
 
@@ -1,7 +1,7 @@
 import webbrowser
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from typing import Optional, Dict, Set
 import os
 import time
@@ -9,14 +9,18 @@ import time
 from .token_handler import TokenHandler
 
 
-class OAuthMiddleware(BaseHTTPMiddleware):
-    """OAuth认证中间件"""
+class OAuthMiddleware:
+    """OAuth认证中间件
+
+    纯ASGI中间件：只读取请求头做认证，认证失败时直接返回401，通过时原样调用下游应用，
+    不包装请求和响应(流式响应不经过中间件转发)
+    """
     
     # 类级别的弹窗记录，确保所有实例共享
     _global_popup_time: float = 0
     _popup_cooldown: float = 5  # 冷却时间（秒）
     
-    def __init__(self, app, exclude_paths: Optional[list[str]] = None):
+    def __init__(self, app: ASGIApp, exclude_paths: Optional[list[str]] = None):
         """
         初始化中间件
         
@@ -24,7 +28,7 @@ class OAuthMiddleware(BaseHTTPMiddleware):
             app: Starlette应用实例
             exclude_paths: 不需要认证的路径列表
         """
-        super().__init__(app)
+        self.app = app
         # 默认排除路径：登录相关页面和资源
         default_exclude_paths = [
             "/login",                    # 登录页面
@@ -66,24 +70,45 @@ class OAuthMiddleware(BaseHTTPMiddleware):
             return True
         return False
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         处理请求
         
         Args:
-            request: 请求对象
-            call_next: 下一个处理函数
+            scope: ASGI连接信息
+            receive: 接收消息的函数
+            send: 发送消息的函数
+        """
+        # 只认证HTTP请求，检查是否需要跳过认证
+        if scope["type"] != "http" or self._is_excluded_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        error_response = self._authenticate(scope)
+        if error_response is not None:
+            await error_response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    def _authenticate(self, scope: Scope) -> Optional[JSONResponse]:
         """
-        # 检查是否需要跳过认证
-        if self._is_excluded_path(request.url.path):
-            return await call_next(request)
+        验证请求的访问令牌，通过时将用户信息写入 request.state.user
+        
+        Args:
+            scope: ASGI连接信息
             
+        Returns:
+            Optional[JSONResponse]: 认证失败时的401响应，通过时返回None
+        """
+        headers = Headers(scope=scope)
+
         # 获取认证头
-        auth_header = request.headers.get("Authorization")
+        auth_header = headers.get("Authorization")
         if not auth_header:
             # 只在需要时弹出登录框，并且不是API请求时
-            if (not request.url.path.startswith("/api/") and 
-                not request.headers.get("accept", "").startswith("application/json") and
+            if (not scope["path"].startswith("/api/") and 
+                not headers.get("accept", "").startswith("application/json") and
                 self._should_show_popup()):
                 webbrowser.open(self.login_url)
             
@@ -117,10 +142,10 @@ class OAuthMiddleware(BaseHTTPMiddleware):
                 status_code=401
             )
             
-        # 将用户信息添加到请求对象
-        request.state.user = {
+        # 将用户信息添加到请求对象(request.state 读取的是 scope["state"])
+        scope.setdefault("state", {})["user"] = {
             "id": payload["sub"],
             "username": payload["username"]
         }
         
-        return await call_next(request) 
\ No newline at end of file
+        return None
@@ -1,9 +1,12 @@
 import asyncio
 import contextlib
+import hmac
+import logging
 import os
+import signal
 
 from collections.abc import AsyncIterator
-from starlette.responses import Response, HTMLResponse
+from starlette.responses import Response, HTMLResponse, JSONResponse
 
 import click
 import uvicorn
@@ -20,15 +23,17 @@ from starlette.routing import Route, Mount
 from starlette.types import Scope, Receive, Send
 from starlette.middleware import Middleware
 
-from .config import get_db_config
+from .config import get_db_config, load_env_file
 from .utils.execute_sql_util import ExecuteSqlUtil
-from .config.event_store import InMemoryEventStore
+from .utils.schema_catalog import preload_schema_catalog
+from .utils.metrics import finish_call, render_metrics, start_call
+from .config.event_store import create_event_store
 from .handles.base import ToolRegistry
 from .prompts.BasePrompt import PromptRegistry
 from .oauth import OAuthMiddleware, login, login_page
 
 
-
+logger = logging.getLogger(__name__)
 
 
 # 初始化服务器
@@ -87,7 +92,101 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> Sequence[TextConten
     """
     tool = ToolRegistry.get_tool(name)
 
-    return await tool.run_tool(arguments)
+    call = start_call(name, arguments)
+    try:
+        result = await tool.run_tool(arguments)
+    except Exception:
+        finish_call(call, failed=True)
+        raise
+    finish_call(call, [content.text for content in result if isinstance(content, TextContent)])
+    return result
+
+
+async def reload_config() -> bool:
+    """重新加载配置，返回是否重建了连接池"""
+    return await ExecuteSqlUtil.reload_config()
+
+
+def install_reload_signal_handler():
+    """注册SIGHUP信号处理，收到信号时重新加载配置(需在事件循环中调用，Windows不支持)"""
+    if not hasattr(signal, "SIGHUP"):
+        return
+
+    async def handle_reload():
+        try:
+            await reload_config()
+        except Exception as e:
+            logger.error(f"重新加载配置失败: {e}")
+
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGHUP, lambda: loop.create_task(handle_reload()))
+
+
+# 后台任务的引用，避免任务在执行完成前被回收
+background_tasks = set()
+
+
+async def keep_alive_pool(interval: float):
+    """定期检测连接池中的空闲连接"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            invalidated = await ExecuteSqlUtil.keep_alive_pool()
+            if invalidated:
+                logger.info(f"空闲连接检测: 移除了 {invalidated} 个失效连接")
+        except Exception as e:
+            logger.warning(f"空闲连接检测失败: {e}")
+
+
+async def evict_idle_engines(interval: float):
+    """定期关闭其他库中空闲的连接池"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await ExecuteSqlUtil.evict_idle_engines()
+        except Exception as e:
+            logger.warning(f"关闭空闲的连接池失败: {e}")
+
+
+async def start_background_tasks():
+    """启动后台任务(需在事件循环中调用)：预热连接池、预加载库结构快照、定期检测空闲连接、关闭其他库的空闲连接池"""
+    # 连接池预热在开始处理请求前完成，异步连接池的连接需在服务所在的事件循环中建立
+    await ExecuteSqlUtil.warm_up_pool()
+
+    loop = asyncio.get_running_loop()
+    tasks = [loop.create_task(preload_schema_catalog())]
+    interval = get_db_config().get("pool_keepalive_interval", 0)
+    if interval > 0:
+        tasks.append(loop.create_task(keep_alive_pool(interval)))
+    idle_ttl = get_db_config().get("tenant_engine_idle_ttl", 300)
+    if idle_ttl > 0:
+        tasks.append(loop.create_task(evict_idle_engines(max(1.0, idle_ttl / 2))))
+    for task in tasks:
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+
+async def handle_reload_config(request):
+    """管理接口：重新加载配置，需在请求头 X-Admin-Token 中携带 ADMIN_TOKEN，未配置 ADMIN_TOKEN 时关闭
+
+    Returns:
+        JSONResponse: {"reloaded": 是否成功, "pool_rebuilt": 是否重建了连接池}
+    """
+    admin_token = get_db_config().get("admin_token")
+    if not admin_token:
+        return JSONResponse({"reloaded": False, "error": "未配置 ADMIN_TOKEN，管理接口已关闭"}, status_code=403)
+    if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), admin_token.encode()):
+        return JSONResponse({"reloaded": False, "error": "无效的管理令牌"}, status_code=401)
+    try:
+        pool_rebuilt = await reload_config()
+    except Exception as e:
+        return JSONResponse({"reloaded": False, "error": str(e)}, status_code=500)
+    return JSONResponse({"reloaded": True, "pool_rebuilt": pool_rebuilt})
+
+
+async def handle_metrics(request):
+    """监控接口：Prometheus 文本格式的连接池、工具调用和缓存指标"""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 async def run_stdio():
@@ -100,6 +199,9 @@ async def run_stdio():
     """
     from mcp.server.stdio import stdio_server
 
+    install_reload_signal_handler()
+    await start_background_tasks()
+
     async with stdio_server() as (read_stream, write_stream):
         try:
             await app.run(
@@ -131,17 +233,26 @@ def run_sse():
             await app.run(streams[0], streams[1], app.create_initialization_options())
         return Response(status_code=204)  
 
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        install_reload_signal_handler()
+        await start_background_tasks()
+        yield
+
     starlette_app = Starlette(
         debug=True,
         routes=[
             Route("/sse", endpoint=handle_sse),
+            Route("/admin/reload", endpoint=handle_reload_config, methods=["POST"]),
+            Route("/metrics", endpoint=handle_metrics),
             Mount("/messages/", app=sse.handle_post_message)
         ],
+        lifespan=lifespan
     )
     uvicorn.run(starlette_app, host="0.0.0.0", port=9000)
 
 def run_streamable_http(json_response: bool, oauth: bool):
-    event_store = InMemoryEventStore()
+    event_store = create_event_store(get_db_config())
 
     session_manager = StreamableHTTPSessionManager(
         app=app,
@@ -165,8 +276,13 @@ def run_streamable_http(json_response: bool, oauth: bool):
 
     @contextlib.asynccontextmanager
     async def lifespan(app: Starlette) -> AsyncIterator[None]:
-        async with session_manager.run():
-            yield
+        install_reload_signal_handler()
+        await start_background_tasks()
+        try:
+            async with session_manager.run():
+                yield
+        finally:
+            await event_store.close()
 
     routes = []
 
@@ -179,6 +295,8 @@ def run_streamable_http(json_response: bool, oauth: bool):
         routes.append(Route("/login", endpoint=login_page, methods=["GET"]))
         routes.append(Route("/mcp/auth/login", endpoint=login, methods=["POST"]))
 
+    routes.append(Route("/admin/reload", endpoint=handle_reload_config, methods=["POST"]))
+    routes.append(Route("/metrics", endpoint=handle_metrics))
     routes.append(Mount("/mcp", app=handle_streamable_http))
 
     # 创建应用实例
@@ -214,18 +332,17 @@ def main(mode, envfile, oauth):
     Args:
         mode (str): 运行模式，可选值为 "sse" 或 "stdio"
     """
-    from dotenv import load_dotenv
-
     # 优先加载指定的env文件
     if envfile:
-        load_dotenv(envfile)
+        load_env_file(envfile)
     else:
         # 获取当前文件（server.py）所在目录的绝对路径
         BASE_DIR = os.path.dirname(os.path.abspath(__file__))
         # 拼接出 config/.env 的绝对路径
         env_path = os.path.join(BASE_DIR, "config", ".env")
-        load_dotenv(env_path)
+        load_env_file(env_path)
 
+    # 配置只在启动时加载一次，之后可通过 SIGHUP 或 POST /admin/reload 重新加载
     ExecuteSqlUtil.create_mysql_pool(db_config=get_db_config())
 
     #from .config.dbconfig import get_db_config
@@ -3,10 +3,11 @@ Utils package for mysql_mcp_server_pro
 """
 
 # 导出数据库连接池工具
-from .database_pool import SQLAlchemyConnectionPool, create_mysql_pool
+from .database_pool import SQLAlchemyConnectionPool, AsyncSQLAlchemyConnectionPool, create_mysql_pool
 
 __all__ = [
     "SQLAlchemyConnectionPool",
+    "AsyncSQLAlchemyConnectionPool",
     "create_mysql_pool"
 
 ]
\ No newline at end of file
@@ -0,0 +1,331 @@
+"""
+批量导入
+
+将 CSV / JSON / JSONL 数据按批写入表中，每批一次连接借用、一次提交:
+    - INSERT: 驱动的 executemany 把一批数据合并为多行 INSERT ... VALUES (...), (...)，值由驱动转义
+    - LOAD DATA: 配置 BULK_LOAD_LOCAL_INFILE 开启时，每批写入临时文件后以 LOAD DATA LOCAL INFILE 导入，
+      服务端或驱动拒绝 LOCAL INFILE 时自动改用 INSERT；LOCAL 导入时重复键、类型转换错误只产生警告，
+      对应的行被跳过或写入转换后的值
+已提交的批次不受后续批次失败的影响，结果中报告服务端实际写入的行数和警告。
+"""
+
+import csv
+import datetime
+import decimal
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .engine_registry import validate_database
+from .execute_sql_util import ExecuteSqlUtil
+from .sql_classifier import SQLOperation
+
+logger = logging.getLogger(__name__)
+
+BULK_FORMATS = ("csv", "json", "jsonl")
+
+# CSV 中表示 NULL 的值，与 csv 输出格式一致
+NULL_TEXTS = {"NULL", "\\N"}
+
+# LOAD DATA 的临时文件中需要转义的字符
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+
+METHOD_INSERT = "INSERT"
+METHOD_LOAD_DATA = "LOAD DATA"
+
+# LOCAL INFILE 被拒绝的错误码，只有这些错误才改用 INSERT:
+# 1148 服务端不允许(local_infile=OFF)、3948 服务端禁用了本地文件导入、2068 客户端拒绝读取本地文件
+LOCAL_INFILE_REJECTED_CODES = frozenset({1148, 2068, 3948})
+
+# 结果中最多列出的警告条数
+MAX_REPORTED_WARNINGS = 5
+
+
+def quote_identifier(name: str) -> str:
+    """转义为反引号标识符"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def quote_table(table: str) -> str:
+    """转义表名，支持 库名.表名，库名需通过 validate_database 检查(受 ALLOWED_DATABASES 限制)"""
+    parts = [part.strip() for part in table.replace("`", "").split(".")]
+    if not 1 <= len(parts) <= 2 or not all(parts):
+        raise ValueError(f"表名不合法: {table}")
+    if len(parts) == 2:
+        validate_database(parts[0])
+    return ".".join(quote_identifier(part) for part in parts)
+
+
+def is_local_infile_rejected(e: Exception) -> bool:
+    """是否为 LOCAL INFILE 本身被服务端或驱动拒绝(数据、约束错误不算)"""
+    args = getattr(getattr(e, "orig", e), "args", ())
+    return bool(args) and args[0] in LOCAL_INFILE_REJECTED_CODES
+
+
+def _tsv_value(value: Any) -> str:
+    """LOAD DATA 临时文件中的值，按类型显式编码(如布尔值写为 1/0，而不是 True/False)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value.isoformat()
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    elif isinstance(value, (bytes, bytearray)):
+        try:
+            value = bytes(value).decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValueError("LOAD DATA 不支持非UTF-8的二进制值，请关闭 BULK_LOAD_LOCAL_INFILE")
+    elif not isinstance(value, str):
+        raise ValueError(f"不支持的值类型: {type(value).__name__}")
+    return value.translate(TSV_ESCAPES)
+
+
+def _fetch_warnings(conn) -> Tuple[int, List[str]]:
+    """上一条语句产生的警告数和前几条警告"""
+    count = int(conn.exec_driver_sql("SHOW COUNT(*) WARNINGS").scalar() or 0)
+    if not count:
+        return 0, []
+    rows = conn.exec_driver_sql(f"SHOW WARNINGS LIMIT {MAX_REPORTED_WARNINGS}").fetchall()
+    return count, [f"{row[0]} {row[1]}: {row[2]}" for row in rows]
+
+
+def parse_rows(data: str, data_format: str = "csv",
+               columns: Optional[Sequence[str]] = None) -> Tuple[List[str], List[Tuple]]:
+    """解析待导入的数据
+
+    Args:
+        data: 数据文本。csv 首行为列名(指定 columns 时首行即为数据)，NULL 或 \\N 表示 NULL；
+              json 为对象数组、数组的数组(需指定 columns)，或 json 输出格式的 {"columns": ..., "rows": ...}；
+              jsonl 每行一个对象或数组
+        data_format: csv / json / jsonl
+        columns: 列名，不指定时从数据中读取
+
+    Returns:
+        (列名, 行)
+
+    Raises:
+        ValueError: 数据格式不正确
+    """
+    if data_format not in BULK_FORMATS:
+        raise ValueError(f"不支持的数据格式: {data_format}，可选: {', '.join(BULK_FORMATS)}")
+
+    columns = list(columns) if columns else None
+    if data_format == "csv":
+        records: List[Any] = list(csv.reader(io.StringIO(data)))
+        if columns is None:
+            if not records:
+                raise ValueError("CSV数据缺少列名行")
+            columns, records = records[0], records[1:]
+        records = [[None if value in NULL_TEXTS else value for value in record] for record in records if record]
+    elif data_format == "json":
+        try:
+            records = json.loads(data)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON数据格式不正确: {e}")
+        if isinstance(records, dict) and "rows" in records:
+            if columns is None and records.get("columns"):
+                columns = [column["name"] if isinstance(column, dict) else column for column in records["columns"]]
+            records = records["rows"]
+        if not isinstance(records, list):
+            raise ValueError("JSON数据必须是数组")
+    else:
+        try:
+            records = [json.loads(line) for line in data.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSONL数据格式不正确: {e}")
+
+    if columns is None:
+        columns = _record_columns(records)
+    if not columns:
+        raise ValueError("无法确定列名，请通过 columns 指定")
+
+    rows = []
+    for number, record in enumerate(records, 1):
+        if isinstance(record, dict):
+            values = [record.get(column) for column in columns]
+        elif isinstance(record, (list, tuple)):
+            if len(record) != len(columns):
+                raise ValueError(f"第{number}行有{len(record)}列，应为{len(columns)}列")
+            values = record
+        else:
+            raise ValueError(f"第{number}行必须是对象或数组")
+        rows.append(tuple(_to_value(value) for value in values))
+    return [str(column) for column in columns], rows
+
+
+def _record_columns(records: List[Any]) -> Optional[List[str]]:
+    """对象数组按出现顺序合并所有对象的键"""
+    if not records or not all(isinstance(record, dict) for record in records):
+        return None
+    columns: Dict[str, None] = {}
+    for record in records:
+        columns.update(dict.fromkeys(record))
+    return list(columns)
+
+
+def _to_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+@dataclass
+class BulkLoadResult:
+    """批量导入结果"""
+    table: str
+    total_rows: int
+    chunk_size: int
+    method: str
+    # 已提交批次中服务端实际写入的行数
+    loaded_rows: int = 0
+    # 已提交批次发送的行数，多于 loaded_rows 时有行被跳过(如 LOCAL 导入遇到重复键)
+    sent_rows: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    warning_count: int = 0
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.loaded_rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        stats = (f"已提交 {self.loaded_rows} 行({self.chunks} 批，每批最多 {self.chunk_size} 行)，"
+                 f"方式: {self.method}，耗时 {self.elapsed:.2f} 秒，约 {self.rows_per_second:.0f} 行/秒")
+        if self.sent_rows > self.loaded_rows:
+            stats += f"；{self.sent_rows - self.loaded_rows} 行未写入(被服务端跳过)"
+        if self.warning_count:
+            stats += f"；警告 {self.warning_count} 条(部分值可能被截断或转换):\n" + "\n".join(self.warnings)
+        if self.error is None:
+            return f"导入完成: 表 {self.table} 共 {self.total_rows} 行，{stats}"
+        start = self.chunks * self.chunk_size + 1
+        end = min(start + self.chunk_size - 1, self.total_rows)
+        return (f"导入中断: 第 {self.chunks + 1} 批(第 {start}-{end} 行)失败: {self.error}\n"
+                f"{stats}；失败批次及之后的数据未写入")
+
+
+class BulkLoader:
+    """按批写入数据，每批提交一次"""
+
+    def __init__(self, exe: Optional[ExecuteSqlUtil] = None, chunk_size: Optional[int] = None,
+                 local_infile: Optional[bool] = None):
+        """
+        Args:
+            exe: SQL执行工具，用于权限检查、超时控制和连接借用
+            chunk_size: 每批的行数，默认取配置 BULK_INSERT_CHUNK_SIZE
+            local_infile: 是否使用 LOAD DATA LOCAL INFILE，默认取配置 BULK_LOAD_LOCAL_INFILE
+        """
+        from ..config import get_db_config
+        config = get_db_config()
+        self.exe = exe or ExecuteSqlUtil()
+        self.chunk_size = max(1, int(chunk_size or config.get("bulk_insert_chunk_size", 1000)))
+        self.local_infile = config.get("bulk_load_local_infile", False) if local_infile is None else local_infile
+
+    async def load(self, table: str, columns: Sequence[str], rows: Sequence[Tuple]) -> BulkLoadResult:
+        """导入数据
+
+        Raises:
+            SQLPermissionError: 当前角色没有 INSERT 权限
+            ValueError: 表名或列名不合法
+        """
+        self.exe.check_permissions({SQLOperation.INSERT})
+        table_sql = quote_table(table)
+        columns_sql = ", ".join(quote_identifier(column) for column in columns)
+        # 带参数执行时驱动按 % 格式化，标识符中的 % 需要转义
+        insert_sql = (f"INSERT INTO {table_sql} ({columns_sql}) ".replace("%", "%%")
+                      + f"VALUES ({', '.join(['%s'] * len(columns))})")
+
+        result = BulkLoadResult(table=table, total_rows=len(rows), chunk_size=self.chunk_size,
+                                method=METHOD_LOAD_DATA if self.local_infile else METHOD_INSERT)
+        start = time.perf_counter()
+        try:
+            for offset in range(0, len(rows), self.chunk_size):
+                chunk = rows[offset:offset + self.chunk_size]
+                try:
+                    written, warning_count, warnings = await self._load_chunk(
+                        result, table_sql, columns_sql, insert_sql, chunk)
+                except Exception as e:
+                    result.error = str(e)
+                    break
+                result.loaded_rows += written
+                result.sent_rows += len(chunk)
+                result.warning_count += warning_count
+                result.warnings.extend(warnings[:MAX_REPORTED_WARNINGS - len(result.warnings)])
+                result.chunks += 1
+        finally:
+            result.elapsed = time.perf_counter() - start
+            # 写入使引用了该表的查询结果缓存失效
+            self.exe.invalidate_for([insert_sql])
+
+        logger.info(f"批量导入 {table}: {result.loaded_rows}/{result.total_rows} 行，"
+                    f"{result.elapsed:.2f} 秒，约 {result.rows_per_second:.0f} 行/秒")
+        return result
+
+    async def _load_chunk(self, result: BulkLoadResult, table_sql: str, columns_sql: str,
+                          insert_sql: str, chunk: Sequence[Tuple]) -> Tuple[int, int, List[str]]:
+        """写入一批数据
+
+        Returns:
+            (服务端写入的行数, 警告数, 前几条警告)
+        """
+        if result.method == METHOD_LOAD_DATA:
+            try:
+                return await self.exe.run_guarded(self._load_data, table_sql, columns_sql, chunk)
+            except Exception as e:
+                if not is_local_infile_rejected(e):
+                    raise
+                logger.warning(f"LOAD DATA LOCAL INFILE 被拒绝，改用多行INSERT: {e}")
+                result.method = METHOD_INSERT
+        return await self.exe.run_guarded(self._insert, insert_sql, chunk)
+
+    @staticmethod
+    def _insert(conn, insert_sql: str, chunk: Sequence[Tuple]) -> Tuple[int, int, List[str]]:
+        try:
+            written = conn.exec_driver_sql(insert_sql, list(chunk)).rowcount
+            warning_count, warnings = _fetch_warnings(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return written, warning_count, warnings
+
+    @staticmethod
+    def _load_data(conn, table_sql: str, columns_sql: str, chunk: Sequence[Tuple]) -> Tuple[int, int, List[str]]:
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="", suffix=".tsv", delete=False) as f:
+            try:
+                for row in chunk:
+                    f.write("\t".join(map(_tsv_value, row)))
+                    f.write("\n")
+            except Exception:
+                f.close()
+                os.unlink(f.name)
+                raise
+        # 文件由驱动在本地打开，使用 / 分隔的路径避免反斜杠转义问题
+        path = Path(f.name).as_posix().replace("'", "''")
+        try:
+            # LOCAL 导入遇到重复键时跳过该行，类型转换错误只产生警告，实际写入的行数以 rowcount 为准
+            written = conn.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table_sql} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({columns_sql})"
+            ).rowcount
+            warning_count, warnings = _fetch_warnings(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            os.unlink(f.name)
+        return written, warning_count, warnings
@@ -3,19 +3,57 @@ SQLAlchemy数据库连接池工具类
 支持多种数据库类型，提供统一的连接池管理接口
 """
 
+import asyncio
 import logging
-from contextlib import contextmanager
-from typing import Dict, Any, Optional
+import time
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional, Callable, TypeVar
 from urllib.parse import quote_plus
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
-from sqlalchemy.pool import QueuePool, SingletonThreadPool, NullPool
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, Connection, make_url
+from sqlalchemy.pool import QueuePool, SingletonThreadPool, NullPool, AsyncAdaptedQueuePool
+from sqlalchemy.exc import DisconnectionError, SQLAlchemyError
+
+from .metrics import observe_checkout
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def install_idle_validation(engine: Engine, idle_seconds: float) -> None:
+    """不在每次借出连接时 ping，只检测空闲超过 idle_seconds 的连接
+
+    检测失败时抛出 DisconnectionError，连接池丢弃该连接并重新建立；
+    执行中遇到连接断开的错误时，SQLAlchemy 会使该连接(及更早建立的连接)失效，下次借出时重新建立
+    """
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        last_checkin = connection_record.info.get("last_checkin")
+        if last_checkin is None or time.monotonic() - last_checkin < idle_seconds:
+            return
+        try:
+            dbapi_connection.ping(False)
+        except Exception as e:
+            raise DisconnectionError(f"空闲连接已失效: {e}")
+
+
+def ping_connection(conn: Connection) -> bool:
+    """检测连接是否可用，不可用时使其失效(归还时从连接池中移除)"""
+    try:
+        conn.connection.dbapi_connection.ping(False)
+        return True
+    except Exception as e:
+        logger.info(f"空闲连接已失效，从连接池中移除: {e}")
+        conn.invalidate()
+        return False
+
 
 class SQLAlchemyConnectionPool:
     """
@@ -29,6 +67,7 @@ class SQLAlchemyConnectionPool:
                  pool_recycle: int = 3600,
                  pool_pre_ping: bool = True,
                  pool_timeout: int = 30,
+                 idle_validation: float = 0,
                  **kwargs):
         """
         初始化连接池
@@ -41,6 +80,7 @@ class SQLAlchemyConnectionPool:
             pool_recycle: 连接回收时间(秒)，-1表示不回收
             pool_pre_ping: 是否在使用前ping数据库以检查连接有效性
             pool_timeout: 获取连接的超时时间(秒)
+            idle_validation: 不使用pool_pre_ping时，借出空闲超过该时间(秒)的连接前检测连接，0表示不检测
             **kwargs: 其他传递给create_engine的参数
         """
         self.database_url = database_url
@@ -50,11 +90,16 @@ class SQLAlchemyConnectionPool:
         self.pool_recycle = pool_recycle
         self.pool_pre_ping = pool_pre_ping
         self.pool_timeout = pool_timeout
+        self.idle_validation = idle_validation
         
         # 创建引擎
         self.engine = self._create_engine(**kwargs)
+        if not pool_pre_ping and idle_validation > 0:
+            install_idle_validation(self.engine, idle_validation)
         
-        logger.info(f"SQLAlchemy connection pool initialized for {database_url}")
+        # 日志中不输出密码
+        safe_url = make_url(database_url).render_as_string(hide_password=True)
+        logger.info(f"SQLAlchemy connection pool initialized for {safe_url}")
         logger.info(f"Pool type: {pool_type}, Pool size: {pool_size}, Max overflow: {max_overflow}")
 
     def _create_engine(self, **kwargs) -> Engine:
@@ -131,6 +176,64 @@ class SQLAlchemyConnectionPool:
         finally:
             self.return_connection(conn)
 
+    async def run_in_connection(self, fn: Callable[..., T], *args) -> T:
+        """
+        在工作线程中获取连接并执行同步函数，避免阻塞事件循环
+
+        Args:
+            fn: 接收连接对象作为第一个参数的同步函数
+            *args: 传递给fn的其他参数
+
+        Returns:
+            fn的返回值
+        """
+        return await asyncio.to_thread(self._run_in_connection, fn, *args)
+
+    def _run_in_connection(self, fn: Callable[..., T], *args) -> T:
+        start = time.perf_counter()
+        conn = self.get_connection()
+        observe_checkout(time.perf_counter() - start)
+        try:
+            return fn(conn, *args)
+        finally:
+            self.return_connection(conn)
+
+    async def warm_up(self, count: Optional[int] = None) -> int:
+        """
+        并发建立连接后归还连接池，避免启动后的前几个请求承担建立连接的开销
+
+        Args:
+            count: 建立的连接数，默认为pool_size
+
+        Returns:
+            成功建立的连接数
+        """
+        count = self.pool_size if count is None else count
+        results = await asyncio.gather(*(asyncio.to_thread(self.engine.connect) for _ in range(count)),
+                                       return_exceptions=True)
+        connections = [result for result in results if not isinstance(result, BaseException)]
+        for conn in connections:
+            conn.close()
+        if not connections and results:
+            raise results[0]
+        return len(connections)
+
+    async def keepalive(self) -> int:
+        """
+        依次检测连接池中的空闲连接，保持连接活跃并移除已失效的连接
+
+        Returns:
+            移除的连接数
+        """
+        return await asyncio.to_thread(self._keepalive)
+
+    def _keepalive(self) -> int:
+        invalidated = 0
+        for _ in range(getattr(self.engine.pool, "checkedin", lambda: 0)()):
+            with self.connection() as conn:
+                invalidated += not ping_connection(conn)
+        return invalidated
+
     def execute_query(self, query: str, params: Optional[Dict] = None):
         """
         执行查询语句
@@ -185,8 +288,10 @@ class SQLAlchemyConnectionPool:
             "max_overflow": self.max_overflow,
             "checked_out_connections": pool.checkedout(),
             "available_connections": pool.checkedin(),
-            "overflow_connections": getattr(pool, 'overflow', 0),
-            "recycle_time": self.pool_recycle
+            "overflow_connections": getattr(pool, 'overflow', lambda: 0)(),
+            "recycle_time": self.pool_recycle,
+            "pre_ping": self.pool_pre_ping,
+            "idle_validation": self.idle_validation
         }
 
     def close_all_connections(self):
@@ -200,13 +305,191 @@ class SQLAlchemyConnectionPool:
             logger.error(f"Error closing all connections: {e}")
 
 
+class AsyncSQLAlchemyConnectionPool:
+    """
+    基于SQLAlchemy AsyncEngine的异步数据库连接池实现
+
+    SQL在异步驱动(aiomysql)上执行，等待数据库返回时不占用事件循环，也不占用工作线程
+    """
+
+    def __init__(self, database_url: str,
+                 pool_type: str = "queue",
+                 pool_size: int = 10,
+                 max_overflow: int = 20,
+                 pool_recycle: int = 3600,
+                 pool_pre_ping: bool = True,
+                 pool_timeout: int = 30,
+                 idle_validation: float = 0,
+                 **kwargs):
+        """
+        初始化异步连接池
+
+        Args:
+            database_url: 数据库连接URL(需使用异步驱动，如 mysql+aiomysql)
+            pool_type: 连接池类型 ('queue', 'null')
+            pool_size: 连接池大小
+            max_overflow: 超出pool_size后最多可创建的连接数
+            pool_recycle: 连接回收时间(秒)，-1表示不回收
+            pool_pre_ping: 是否在使用前ping数据库以检查连接有效性
+            pool_timeout: 获取连接的超时时间(秒)
+            idle_validation: 不使用pool_pre_ping时，借出空闲超过该时间(秒)的连接前检测连接，0表示不检测
+            **kwargs: 其他传递给create_async_engine的参数
+        """
+        self.database_url = database_url
+        self.pool_type = pool_type
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+        self.pool_timeout = pool_timeout
+        self.idle_validation = idle_validation
+
+        self.engine = self._create_engine(**kwargs)
+        if not pool_pre_ping and idle_validation > 0:
+            install_idle_validation(self.engine.sync_engine, idle_validation)
+
+        # 日志中不输出密码
+        safe_url = make_url(database_url).render_as_string(hide_password=True)
+        logger.info(f"SQLAlchemy async connection pool initialized for {safe_url}")
+        logger.info(f"Pool type: {pool_type}, Pool size: {pool_size}, Max overflow: {max_overflow}")
+
+    def _create_engine(self, **kwargs):
+        """
+        创建SQLAlchemy异步引擎
+
+        Returns:
+            AsyncEngine: SQLAlchemy异步引擎实例
+        """
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        if self.pool_type == 'null':
+            return create_async_engine(self.database_url, poolclass=NullPool, **kwargs)
+
+        return create_async_engine(
+            self.database_url,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_recycle=self.pool_recycle,
+            pool_pre_ping=self.pool_pre_ping,
+            pool_timeout=self.pool_timeout,
+            **kwargs
+        )
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        异步上下文管理器方式使用连接
+
+        Usage:
+            async with pool.connection() as conn:
+                result = await conn.execute(text("SELECT 1"))
+        """
+        async with self.engine.connect() as conn:
+            logger.debug("Database connection acquired from async pool")
+            yield conn
+        logger.debug("Database connection returned to async pool")
+
+    async def run_in_connection(self, fn: Callable[[Connection], T], *args) -> T:
+        """
+        获取异步连接并执行同步风格的函数
+
+        fn 收到的是同步外观的 Connection，底层IO由异步驱动完成，
+        因此同一份执行逻辑可同时用于同步与异步两种连接池
+
+        Args:
+            fn: 接收连接对象作为第一个参数的同步函数
+            *args: 传递给fn的其他参数
+
+        Returns:
+            fn的返回值
+        """
+        start = time.perf_counter()
+        async with self.engine.connect() as conn:
+            observe_checkout(time.perf_counter() - start)
+            return await conn.run_sync(fn, *args)
+
+    async def warm_up(self, count: Optional[int] = None) -> int:
+        """
+        并发建立连接后归还连接池，避免启动后的前几个请求承担建立连接的开销
+
+        Args:
+            count: 建立的连接数，默认为pool_size
+
+        Returns:
+            成功建立的连接数
+        """
+        count = self.pool_size if count is None else count
+        results = await asyncio.gather(*(self.engine.connect().start() for _ in range(count)),
+                                       return_exceptions=True)
+        connections = [result for result in results if not isinstance(result, BaseException)]
+        for conn in connections:
+            await conn.close()
+        if not connections and results:
+            raise results[0]
+        return len(connections)
+
+    async def keepalive(self) -> int:
+        """
+        依次检测连接池中的空闲连接，保持连接活跃并移除已失效的连接
+
+        Returns:
+            移除的连接数
+        """
+        invalidated = 0
+        for _ in range(getattr(self.engine.pool, "checkedin", lambda: 0)()):
+            async with self.connection() as conn:
+                invalidated += not await conn.run_sync(ping_connection)
+        return invalidated
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            包含连接池统计信息的字典
+        """
+        pool = self.engine.pool
+        return {
+            "pool_type": self.pool_type,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "checked_out_connections": pool.checkedout() if hasattr(pool, 'checkedout') else 0,
+            "available_connections": pool.checkedin() if hasattr(pool, 'checkedin') else 0,
+            "overflow_connections": getattr(pool, 'overflow', lambda: 0)(),
+            "recycle_time": self.pool_recycle,
+            "pre_ping": self.pool_pre_ping,
+            "idle_validation": self.idle_validation
+        }
+
+    async def close_all_connections(self):
+        """
+        关闭所有连接
+        """
+        try:
+            await self.engine.dispose()
+            logger.info("All database connections closed")
+        except Exception as e:
+            logger.error(f"Error closing all connections: {e}")
+
+
+# 连接池后端 -> (连接池类, SQLAlchemy驱动)
+POOL_BACKENDS = {
+    "sync": (SQLAlchemyConnectionPool, "pymysql"),
+    "async": (AsyncSQLAlchemyConnectionPool, "aiomysql"),
+}
+
+
 def create_mysql_pool(host: str, port: int = 3306, user: str = "root", 
                       password: str = "", database: str = "",
                       pool_type: str = "queue",
                       pool_size: int = 10,
                       max_overflow: int = 20,
                       pool_recycle: int = 3600,
-                      **kwargs) -> SQLAlchemyConnectionPool:
+                      backend: str = "sync",
+                      multi_statements: bool = False,
+                      local_infile: bool = False,
+                      **kwargs):
     """
     创建MySQL连接池
     
@@ -220,18 +503,33 @@ def create_mysql_pool(host: str, port: int = 3306, user: str = "root",
         pool_size: 连接池大小
         max_overflow: 最大溢出连接数
         pool_recycle: 连接回收时间
+        backend: 连接池后端 ('sync' 使用pymysql + 工作线程, 'async' 使用aiomysql + AsyncEngine)
+        multi_statements: 是否开启驱动的多语句支持(CLIENT.MULTI_STATEMENTS)，允许一次请求执行多条语句
+        local_infile: 是否允许 LOAD DATA LOCAL INFILE(驱动会读取服务端请求的本地文件，仅用于可信的服务端)
         **kwargs: 其他参数
         
     Returns:
-        SQLAlchemyConnectionPool: MySQL连接池实例
+        SQLAlchemyConnectionPool | AsyncSQLAlchemyConnectionPool: MySQL连接池实例
     """
+    if backend not in POOL_BACKENDS:
+        raise ValueError(f"不支持的连接池后端: {backend}")
+    pool_class, driver = POOL_BACKENDS[backend]
+
     # 构建MySQL连接URL
     quote_plus_user = quote_plus(user)
     quote_plus_password = quote_plus(password)
 
-    database_url = f"mysql+pymysql://{quote_plus_user}:{quote_plus_password}@{host}:{port}/{database}"
+    database_url = f"mysql+{driver}://{quote_plus_user}:{quote_plus_password}@{host}:{port}/{database}"
+    query = []
+    if multi_statements:
+        from pymysql.constants import CLIENT
+        query.append(f"client_flag={CLIENT.MULTI_STATEMENTS}")
+    if local_infile:
+        query.append("local_infile=1")
+    if query:
+        database_url += "?" + "&".join(query)
     
-    return SQLAlchemyConnectionPool(
+    return pool_class(
         database_url=database_url,
         pool_type=pool_type,
         pool_size=pool_size,
@@ -0,0 +1,173 @@
+"""
+多库连接池注册表
+
+工具通过 database 参数访问 MYSQL_DATABASE 以外的库时，按 DSN(账号@主机:端口/库名)使用各自的连接池:
+    - 连接池在首次访问该库时创建，大小为 TENANT_POOL_SIZE + TENANT_POOL_MAX_OVERFLOW
+    - 所有连接池(含默认库的连接池)可建立的连接数之和不超过 MAX_TOTAL_CONNECTIONS，
+      新建连接池超出上限时按最近最少使用的顺序关闭空闲的连接池，仍不足时拒绝本次访问
+    - 超过 TENANT_ENGINE_IDLE_TTL 秒未使用的连接池被关闭，不再占用数据库连接
+"""
+
+import asyncio
+import inspect
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .database_pool import create_mysql_pool
+from ..config import get_db_config
+from ..exception.exceptions import EngineLimitError
+
+logger = logging.getLogger(__name__)
+
+# 允许的库名(不需要转义的标识符)
+DATABASE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_$-]{1,64}$')
+
+
+def validate_database(database: str) -> str:
+    """检查库名是否合法且在 ALLOWED_DATABASES 中
+
+    Raises:
+        ValueError: 库名不合法或不允许访问
+    """
+    if not isinstance(database, str) or not DATABASE_NAME_PATTERN.match(database):
+        raise ValueError(f"库名不合法: {database}")
+    allowed = get_db_config().get("allowed_databases") or ()
+    if allowed and database.lower() not in {name.lower() for name in allowed}:
+        raise ValueError(f"不允许访问库: {database}")
+    return database
+
+
+@dataclass
+class EngineEntry:
+    """一个库的连接池"""
+    dsn: str
+    database: str
+    pool: Any
+    # 可建立的连接数(pool_size + max_overflow)
+    capacity: int
+    # 正在使用该连接池的请求数
+    leases: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class EngineRegistry:
+    """按 DSN 缓存各库的连接池，限制连接总数并关闭空闲的连接池"""
+
+    def __init__(self):
+        # 按最近使用排序，最久未使用的在前
+        self._entries: "OrderedDict[str, EngineEntry]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def lease(self, database: str) -> AsyncIterator[Any]:
+        """使用指定库的连接池，使用期间不会被关闭
+
+        Raises:
+            ValueError: 库名不合法或不允许访问
+            EngineLimitError: 连接数已达 MAX_TOTAL_CONNECTIONS，且没有可关闭的空闲连接池
+        """
+        entry = await self._acquire(validate_database(database))
+        try:
+            yield entry.pool
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+
+    async def _acquire(self, database: str) -> EngineEntry:
+        config = get_db_config()
+        dsn = f"{config.get('user')}@{config.get('host')}:{config.get('port')}/{database}"
+        async with self._lock:
+            entry = self._entries.get(dsn)
+            if entry is None:
+                await self._evict_idle_locked(config.get("tenant_engine_idle_ttl", 300))
+                entry = await self._create_locked(dsn, database, config)
+            self._entries.move_to_end(dsn)
+            entry.leases += 1
+            return entry
+
+    async def _create_locked(self, dsn: str, database: str, config) -> EngineEntry:
+        from .execute_sql_util import ExecuteSqlUtil
+        pool_config = dict(ExecuteSqlUtil.pool_config(config), database=database,
+                           pool_size=config.get("tenant_pool_size", 2),
+                           max_overflow=config.get("tenant_pool_max_overflow", 3))
+        capacity = pool_config["pool_size"] + pool_config["max_overflow"]
+
+        # 默认库的连接池占用的连接数也计入上限
+        limit = config.get("max_total_connections", 200) - config.get("pool_size", 10) - config.get("max_overflow", 20)
+        for victim in [entry for entry in self._entries.values() if entry.leases == 0]:
+            if self._used_capacity() + capacity <= limit:
+                break
+            await self._close_locked(victim, "连接数达到上限")
+        if self._used_capacity() + capacity > limit:
+            raise EngineLimitError(f"连接数已达上限(MAX_TOTAL_CONNECTIONS={config.get('max_total_connections', 200)})，"
+                                   f"无法访问库 {database}，请稍后重试")
+
+        pool = create_mysql_pool(host=config.get("host", "localhost"), port=config.get("port", 3306), **pool_config)
+        entry = EngineEntry(dsn=dsn, database=database, pool=pool, capacity=capacity)
+        self._entries[dsn] = entry
+        logger.info(f"已创建库 {database} 的连接池，当前共 {len(self._entries)} 个")
+        return entry
+
+    def _used_capacity(self) -> int:
+        return sum(entry.capacity for entry in self._entries.values())
+
+    async def evict_idle(self, idle_ttl: Optional[float] = None) -> int:
+        """关闭超过 idle_ttl 秒未使用的连接池
+
+        Returns:
+            关闭的连接池数
+        """
+        if idle_ttl is None:
+            idle_ttl = get_db_config().get("tenant_engine_idle_ttl", 300)
+        async with self._lock:
+            return await self._evict_idle_locked(idle_ttl)
+
+    async def _evict_idle_locked(self, idle_ttl: float) -> int:
+        if idle_ttl <= 0:
+            return 0
+        deadline = time.monotonic() - idle_ttl
+        idle = [entry for entry in self._entries.values() if entry.leases == 0 and entry.last_used <= deadline]
+        for entry in idle:
+            await self._close_locked(entry, "空闲超时")
+        return len(idle)
+
+    async def _close_locked(self, entry: EngineEntry, reason: str) -> None:
+        self._entries.pop(entry.dsn, None)
+        try:
+            closed = entry.pool.close_all_connections()
+            if inspect.isawaitable(closed):
+                await closed
+        except Exception as e:
+            logger.warning(f"关闭库 {entry.database} 的连接池失败: {e}")
+        logger.info(f"已关闭库 {entry.database} 的连接池({reason})")
+
+    async def close_all_connections(self) -> None:
+        async with self._lock:
+            for entry in list(self._entries.values()):
+                await self._close_locked(entry, "重建连接池")
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [{
+            "database": entry.database,
+            "capacity": entry.capacity,
+            "leases": entry.leases,
+            "idle_seconds": round(now - entry.last_used, 1),
+            **{key: value for key, value in entry.pool.get_stats().items()
+               if key in ("checked_out_connections", "available_connections")},
+        } for entry in self._entries.values()]
+
+
+_registry: Optional[EngineRegistry] = None
+
+
+def get_engine_registry() -> EngineRegistry:
+    global _registry
+    if _registry is None:
+        _registry = EngineRegistry()
+    return _registry
@@ -2,52 +2,42 @@
 SQL执行工具类，使用数据库连接池执行SQL语句
 """
 
+import asyncio
+import copy
+import inspect
 import logging
 import re
-from enum import Enum
-from typing import List, Tuple, Optional, Dict, Any, Set
+from typing import List, Tuple, Optional, Dict, Any, Set, Union
 from dataclasses import dataclass
 from contextlib import contextmanager
 
 from mysql.connector import Error as MySQLError
 
 from .database_pool import create_mysql_pool
-from ..config import get_db_config, get_role_permissions
-from ..exception.exceptions import SQLPermissionError
+from .sql_lexer import split_statements, split_statements_strict
+from .sql_classifier import SQLOperation, classify, allowed_operations
+from .server_capabilities import ServerCapabilities, probe_capabilities
+from .metadata_cache import get_metadata_cache, reload_metadata_cache
+from .query_cache import get_query_cache, is_cacheable, reload_query_cache, is_write, referenced_tables
+from .result_encoder import ResultEncoder
+from .response_budget import ResponseBudget
+from .query_timeout import QueryGuard, current_guard
+from .sql_params import Params, is_executemany, prepare, validate_params
+from .metrics import (ENDPOINT_REQUESTS, PHASE_ENCODE, PHASE_EXECUTE, PHASE_FETCH, PHASE_PARSE, PHASE_PERMISSION,
+                      current_call, phase, record_error, record_rows)
+from .replica_router import (PRIMARY_ENDPOINT, ReplicaEndpoint, ReplicaRouter, is_connection_error,
+                             is_replica_safe)
+from .engine_registry import get_engine_registry, validate_database
+from ..config import get_db_config, get_role_permissions, get_role_query_timeout, reload_db_config, connection_changed
+from ..exception.exceptions import SQLPermissionError, SQLExecutionError, QueryTimeoutError
 
 logger = logging.getLogger(__name__)
 
-class SQLOperation(str, Enum):
-    """SQL 操作类型枚举"""
-    SELECT = 'SELECT'
-    INSERT = 'INSERT'
-    UPDATE = 'UPDATE'
-    DELETE = 'DELETE'
-    CREATE = 'CREATE'
-    ALTER = 'ALTER'
-    DROP = 'DROP'
-    TRUNCATE = 'TRUNCATE'
-    SHOW = 'SHOW'
-    DESCRIBE = 'DESCRIBE'
-    EXPLAIN = 'EXPLAIN'
+# 后台刷新过期查询缓存的任务，保留引用避免被回收
+_refresh_tasks: Set[asyncio.Task] = set()
 
-    @classmethod
-    def from_str(cls, value: str) -> 'SQLOperation':
-        """从字符串创建 SQLOperation 枚举值
-
-        Args:
-            value: SQL 操作字符串
-
-        Returns:
-            SQLOperation: 对应的枚举值
-
-        Raises:
-            ValueError: 当操作类型不支持时
-        """
-        try:
-            return cls(value.upper())
-        except ValueError:
-            raise ValueError(f"不支持的SQL操作类型: {value}")
+# 调用被取消后在后台终止语句的任务
+_kill_tasks: Set[asyncio.Task] = set()
 
 @dataclass
 class SQLResult:
@@ -57,6 +47,25 @@ class SQLResult:
     columns: Optional[List[str]] = None
     rows: Optional[List[Tuple]] = None
     affected_rows: int = 0
+    truncated: bool = False
+    # 因响应大小预算未返回给调用方的行数
+    omitted_rows: int = 0
+    # 各列来源的 (表名, 列名)，取自驱动返回的字段元数据，无法获取时为None
+    column_origins: Optional[List[Tuple[str, str]]] = None
+
+
+def column_origins(result) -> Optional[List[Tuple[str, str]]]:
+    """查询结果各列来源的 (表名, 列名)，列为表达式时为空字符串
+
+    pymysql 的游标和 aiomysql 的游标(被 SQLAlchemy 适配器包装在 _cursor 中)都在 _result.fields
+    中保存字段元数据，其他驱动返回None
+    """
+    cursor = getattr(result, "cursor", None)
+    for driver_cursor in (cursor, getattr(cursor, "_cursor", None)):
+        fields = getattr(getattr(driver_cursor, "_result", None), "fields", None)
+        if fields is not None:
+            return [(getattr(f, "org_table", "") or "", getattr(f, "org_name", "") or "") for f in fields]
+    return None
 
 
 class ExecuteSqlUtil:
@@ -68,53 +77,387 @@ class ExecuteSqlUtil:
     # 类级别的连接池，确保单例
     _connection_pool = None
 
+    # 从库连接池，未配置 MYSQL_REPLICAS 时为None
+    _replica_router: Optional[ReplicaRouter] = None
+
+    # 当前连接池对应的服务端能力，重建连接池时重新探测
+    _capabilities: Optional[ServerCapabilities] = None
+
+    # 流式读取时每批从服务端拉取的行数
+    STREAM_BATCH_SIZE = 500
+
+    # 终止语句后等待其返回、连接归还连接池的最长时间(秒)
+    KILL_WAIT_TIMEOUT = 10
+
+    def __init__(self, stream_results: Optional[bool] = None,
+                 max_rows: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 result_format: Optional[str] = None,
+                 timeout: Optional[float] = None,
+                 use_replicas: bool = True,
+                 database: Optional[str] = None):
+        """
+        Args:
+            stream_results: 是否使用服务端游标流式读取查询结果，默认取配置 STREAM_RESULTS，
+                传入 max_rows 或 max_bytes 时默认开启
+            max_rows: 流式读取时最多返回的行数，默认且最大取配置 MAX_RESULT_ROWS
+            max_bytes: 流式读取时最多返回的数据量(字节，估算值)，默认且最大取配置 MAX_RESULT_BYTES
+            result_format: 查询结果的输出格式(csv/jsonl/markdown/json)，默认取配置 RESULT_FORMAT
+            timeout: 本次执行的超时时间(秒)，不能超过当前角色的超时时间
+            use_replicas: 只读语句是否可以在从库执行，为False时所有语句都在主库执行
+            database: 访问的库名，默认为配置 MYSQL_DATABASE；其他库使用多库连接池注册表中该库的连接池
+
+        Raises:
+            ValueError: 库名不合法或不允许访问
+        """
+        self._stream_results = stream_results
+        self._max_rows = max_rows
+        self._max_bytes = max_bytes
+        self._timeout = timeout
+        self._use_replicas = use_replicas
+        self._database = validate_database(database) if database else None
+        self._limits = None
+        # 格式在构造时校验，编码器在首次格式化时创建(避免模块级实例在加载配置前读取配置)
+        self._encoder = None if result_format is None else ResultEncoder(result_format)
+
+    def _get_stream_limits(self) -> Tuple[bool, int, int]:
+        """获取本次执行的流式读取开关及行数、字节数上限
+
+        调用方传入的上限不能超过服务端配置，保证内存占用始终受配置约束
+        """
+        if self._limits is None:
+            config = get_db_config()
+            max_rows = config.get("max_result_rows", 5000)
+            max_bytes = config.get("max_result_bytes", 8 * 1024 * 1024)
+            stream_results = self._stream_results
+            if stream_results is None:
+                stream_results = (config.get("stream_results", False)
+                                  or self._max_rows is not None or self._max_bytes is not None)
+            self._limits = (
+                stream_results,
+                max_rows if self._max_rows is None else min(self._max_rows, max_rows),
+                max_bytes if self._max_bytes is None else min(self._max_bytes, max_bytes),
+            )
+        return self._limits
+
+    def _get_timeout(self) -> Optional[float]:
+        """获取本次执行的超时时间(秒)，为None时不限制
+
+        配置 QUERY_TIMEOUT=role 时按角色取默认值；调用方传入的超时时间不能超过该值
+        """
+        config = get_db_config()
+        timeout = config.get("query_timeout")
+        if timeout is None:
+            timeout = get_role_query_timeout(config.get("role", "readonly"))
+        if self._timeout:
+            timeout = min(self._timeout, timeout) if timeout else self._timeout
+        return timeout or None
+
+    @property
+    def database(self) -> Optional[str]:
+        """本次执行访问的库名"""
+        return self._database or get_db_config().get("database")
+
+    @property
+    def database_override(self) -> Optional[str]:
+        """调用方指定的库名，未指定(访问默认库)时为None"""
+        return self._database
+
+    @property
+    def result_format(self) -> str:
+        """查询结果的输出格式"""
+        if self._encoder is not None:
+            return self._encoder.result_format
+        return get_db_config().get("result_format", "csv")
+
+    @property
+    def max_rows(self) -> int:
+        """单条查询最多返回的行数"""
+        return self._get_stream_limits()[1]
+
+    def with_database(self, database: Optional[str]) -> "ExecuteSqlUtil":
+        """执行配置相同、访问指定库的执行工具"""
+        exe = copy.copy(self)
+        exe._database = validate_database(database) if database else None
+        return exe
+
+    def is_default_database(self) -> bool:
+        """本次执行是否访问配置的默认库(MYSQL_DATABASE)"""
+        return self._database is None or self._database == get_db_config().get("database")
+
+    async def _run_routed(self, read_only: bool, fn, *args):
+        """只读语句在可用的从库上执行，其他语句及没有可用从库时在主库执行
+
+        从库连接失败时(语句未执行)暂停使用该从库，改在主库执行。访问其他库时只在主库执行
+        """
+        router = (ExecuteSqlUtil.get_replica_router()
+                  if read_only and self._use_replicas and self.is_default_database() else None)
+        endpoint = await router.acquire() if router is not None else None
+        if endpoint is None:
+            return await self._run_guarded(fn, *args)
+        try:
+            return await self._run_guarded(fn, *args, endpoint=endpoint)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            router.mark_failed(endpoint, e)
+        finally:
+            router.release(endpoint)
+        return await self._run_guarded(fn, *args)
+
+    async def run_guarded(self, fn, *args):
+        """在本次访问的库(主库)的连接上执行 fn(conn, *args)，超时或调用被取消时终止正在执行的语句
+
+        供批量导入、导出等需要直接使用连接的工具调用，不做权限检查，也不使缓存失效
+
+        Raises:
+            QueryTimeoutError: 执行超时
+            EngineLimitError: 访问其他库时连接数已达上限
+        """
+        return await self._run_guarded(fn, *args)
+
+    async def _run_guarded(self, fn, *args, endpoint: Optional[ReplicaEndpoint] = None):
+        """在连接池的连接上执行 fn(conn, *args)，超时或调用被取消时终止正在执行的语句
+
+        语句被 KILL QUERY 终止后会很快返回错误，等待其返回后连接正常归还连接池，不会被长时间占用
+
+        Args:
+            endpoint: 执行语句的从库，为None时在主库执行
+
+        Raises:
+            QueryTimeoutError: 执行超时
+            EngineLimitError: 访问其他库时连接数已达上限
+        """
+        if endpoint is not None:
+            return await self._run_on_pool(endpoint.pool, endpoint.name, fn, *args)
+        if self.is_default_database():
+            return await self._run_on_pool(ExecuteSqlUtil.get_connection_pool(), PRIMARY_ENDPOINT, fn, *args)
+        async with get_engine_registry().lease(self._database) as pool:
+            return await self._run_on_pool(pool, PRIMARY_ENDPOINT, fn, *args)
+
+    async def _run_on_pool(self, pool, endpoint_name: str, fn, *args):
+        timeout = self._get_timeout()
+        guard = QueryGuard(timeout, await ExecuteSqlUtil.get_capabilities() if timeout else None)
+        ENDPOINT_REQUESTS.inc(endpoint_name)
+        task = asyncio.ensure_future(
+            pool.run_in_connection(self._guarded_call, guard, current_call.get(), fn, *args))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            await self._kill(pool, guard, task)
+            raise QueryTimeoutError(f"查询超时(timeout after {timeout:g}s)，已终止执行")
+        except asyncio.CancelledError:
+            # 调用被取消(如客户端断开、健康检查项超时)，语句不再需要；终止语句在后台进行，取消立即完成
+            if not task.done():
+                kill_task = asyncio.ensure_future(self._kill(pool, guard, task))
+                _kill_tasks.add(kill_task)
+                kill_task.add_done_callback(_kill_tasks.discard)
+            raise
+
+    async def _kill(self, pool, guard: QueryGuard, task: asyncio.Future) -> None:
+        """终止语句并等待其返回"""
+        if task.done():
+            return
+        await asyncio.to_thread(guard.kill, pool.database_url)
+        try:
+            await asyncio.wait_for(asyncio.shield(task), self.KILL_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("等待被终止的语句返回超时，连接将在语句结束后归还连接池")
+        except Exception:
+            # 被终止的语句返回的错误已无意义
+            pass
+
+    @staticmethod
+    def _guarded_call(conn, guard: QueryGuard, call, fn, *args):
+        guard.attach(conn)
+        # 异步连接池的 run_sync 不继承调用方的上下文，显式传入当前的工具调用以记录各阶段耗时
+        token = current_guard.set(guard)
+        call_token = current_call.set(call)
+        try:
+            return fn(conn, *args)
+        finally:
+            current_call.reset(call_token)
+            current_guard.reset(token)
+            guard.detach()
+
     @classmethod
     def create_mysql_pool(cls, db_config: Dict[str, Any]):
         # 提取连接池相关配置
-        pool_config = {
+        pool_config = cls.pool_config(db_config)
+
+        # 创建MySQL连接池，连接的服务端可能已变化，清空服务端能力、元数据缓存和查询结果缓存
+        cls._capabilities = None
+        get_metadata_cache().invalidate()
+        get_query_cache().invalidate()
+        cls._connection_pool = create_mysql_pool(
+            host=db_config.get('host', 'localhost'),
+            port=db_config.get('port', 3306),
+            **pool_config
+        )
+
+        # 从库使用与主库相同的账号、库名和连接池配置
+        replicas = db_config.get('replicas') or ()
+        cls._replica_router = ReplicaRouter([
+            ReplicaEndpoint(name=f"{host}:{port}", pool=create_mysql_pool(host=host, port=port, **pool_config))
+            for host, port in replicas
+        ]) if replicas else None
+
+    @staticmethod
+    def pool_config(db_config: Dict[str, Any]) -> Dict[str, Any]:
+        """连接池及账号配置，主库和从库共用"""
+        return {
+            'user': db_config.get('user', 'root'),
+            'password': db_config.get('password', ''),
+            'database': db_config.get('database', ''),
             'pool_size': db_config.get('pool_size', 10),
             'max_overflow': db_config.get('max_overflow', 20),
             'pool_recycle': db_config.get('pool_recycle', 3600),
-            'pool_timeout': db_config.get('pool_timeout', 30)
+            'pool_timeout': db_config.get('pool_timeout', 30),
+            'backend': db_config.get('pool_backend', 'sync'),
+            'multi_statements': db_config.get('multi_statements', False),
+            'local_infile': db_config.get('bulk_load_local_infile', False),
+            'pool_pre_ping': db_config.get('pool_pre_ping', True),
+            'idle_validation': db_config.get('pool_idle_validation', 30)
         }
 
-        # 提取数据库连接配置
-        db_params = {
-            'host': db_config.get('host', 'localhost'),
-            'port': db_config.get('port', 3306),
-            'user': db_config.get('user', 'root'),
-            'password': db_config.get('password', ''),
-            'database': db_config.get('database', '')
-        }
+    @classmethod
+    def get_connection_pool(cls):
+        """获取连接池，未初始化时按当前配置创建
 
-        # 创建MySQL连接池
-        cls._connection_pool = create_mysql_pool(
-            host=db_params['host'],
-            port=db_params['port'],
-            user=db_params['user'],
-            password=db_params['password'],
-            database=db_params['database'],
-            pool_size=pool_config['pool_size'],
-            max_overflow=pool_config['max_overflow'],
-            pool_recycle=pool_config['pool_recycle'],
-            pool_timeout=pool_config['pool_timeout']
-        )
+        Returns:
+            SQLAlchemyConnectionPool | AsyncSQLAlchemyConnectionPool: 连接池实例
+        """
+        if cls._connection_pool is None:
+            cls.create_mysql_pool(db_config=get_db_config())
+        return cls._connection_pool
+
+    @classmethod
+    def get_replica_router(cls) -> Optional[ReplicaRouter]:
+        """获取从库路由，未配置从库时返回None"""
+        cls.get_connection_pool()
+        return cls._replica_router
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Any]:
+        """默认库连接池的统计信息，连接池尚未创建时返回空字典(不会因此创建连接池)"""
+        pool = cls._connection_pool
+        return {} if pool is None else pool.get_stats()
+
+    @classmethod
+    def replica_stats(cls) -> List[Dict[str, Any]]:
+        """各从库的统计信息，未配置从库或连接池尚未创建时返回空列表"""
+        router = cls._replica_router
+        return [] if router is None else router.get_stats()
+
+    @classmethod
+    async def get_capabilities(cls) -> Optional[ServerCapabilities]:
+        """获取服务端能力，每个连接池首次使用时探测一次并缓存
+
+        Returns:
+            ServerCapabilities: 探测结果，探测失败时返回None(下次调用重试)
+        """
+        if cls._capabilities is None:
+            pool = cls.get_connection_pool()
+            try:
+                capabilities = await pool.run_in_connection(probe_capabilities)
+            except Exception as e:
+                logger.warning(f"探测数据库服务端能力失败: {e}")
+                return None
+            # 探测期间连接池已被重建时，结果属于旧连接池，不缓存
+            if pool is not cls._connection_pool:
+                return capabilities
+            cls._capabilities = capabilities
+        return cls._capabilities
+
+    @classmethod
+    async def warm_up_pool(cls) -> int:
+        """配置 POOL_WARMUP 开启时，预先建立 pool_size 个连接，失败时只记录日志
+
+        Returns:
+            int: 建立的连接数
+        """
+        if not get_db_config().get("pool_warmup", False):
+            return 0
+        try:
+            count = await cls.get_connection_pool().warm_up()
+        except Exception as e:
+            logger.warning(f"连接池预热失败: {e}")
+            return 0
+        logger.info(f"连接池预热完成，已建立 {count} 个连接")
+        return count
+
+    @classmethod
+    async def keep_alive_pool(cls) -> int:
+        """检测连接池中的空闲连接，保持连接活跃并移除已失效的连接
+
+        Returns:
+            int: 移除的连接数
+        """
+        removed = await cls.get_connection_pool().keepalive()
+        if cls._replica_router is not None:
+            removed += await cls._replica_router.keepalive()
+        return removed
+
+    @classmethod
+    async def evict_idle_engines(cls) -> int:
+        """关闭其他库中超过 TENANT_ENGINE_IDLE_TTL 未使用的连接池
+
+        Returns:
+            int: 关闭的连接池数
+        """
+        return await get_engine_registry().evict_idle()
+
+    @classmethod
+    async def reload_config(cls) -> bool:
+        """重新加载配置，只有数据库连接参数变化时才重建连接池
+
+        新连接池创建成功后才替换旧连接池，旧连接池中正在使用的连接归还后关闭；
+        按旧配置创建的缓存、结果句柄存储和库结构快照同时按新配置更新
+
+        Returns:
+            bool: 是否重建了连接池
+
+        Raises:
+            ValueError: 新配置不合法时抛出，此时仍使用旧配置
+        """
+        from .result_handle import ResultPager
+        from .schema_catalog import reload_schema_catalog
+
+        old_config, new_config = reload_db_config()
+        reload_metadata_cache(new_config)
+        reload_query_cache(new_config)
+        ResultPager.reload_store(new_config)
+        if cls._connection_pool is not None and not connection_changed(old_config, new_config):
+            reload_schema_catalog()
+            logger.info("配置已重新加载，数据库连接参数未变化")
+            return False
+
+        old_pool, old_router = cls._connection_pool, cls._replica_router
+        cls.create_mysql_pool(db_config=new_config)
+        if old_pool is not None:
+            closed = old_pool.close_all_connections()
+            if inspect.isawaitable(closed):
+                await closed
+        if old_router is not None:
+            await old_router.close_all_connections()
+        await get_engine_registry().close_all_connections()
+        await cls.warm_up_pool()
+        reload_schema_catalog()
+        logger.info("配置已重新加载，连接池已重建")
+        return True
 
     @classmethod
     @contextmanager
     def get_db_connection(cls):
-        """获取数据库连接的上下文管理器
+        """获取数据库连接的上下文管理器(仅适用于同步连接池)
         
         Yields:
             数据库连接对象
         """
         connection = None
         try:
-
-            if cls._connection_pool is None:
-                cls.create_mysql_pool(db_config=get_db_config())
-
-            connection = cls._connection_pool.get_connection()
+            pool = cls.get_connection_pool()
+            connection = pool.get_connection()
             yield connection
         except Exception as e:
             logger.error(f"从连接池获取数据库连接失败: {e}")
@@ -126,116 +469,429 @@ class ExecuteSqlUtil:
                 except Exception as e:
                     logger.warning(f"归还数据库连接到连接池时出错: {e}")
 
-    def execute_single_statement(self, statement: str) -> SQLResult:
+    async def execute_single_statement(self, statement: str, params: Optional[Params] = None) -> SQLResult:
         """执行单条SQL语句
+
+        同步连接池在工作线程中执行，异步连接池直接在事件循环上等待，
+        两种方式都不会阻塞其他会话的请求。配置了从库时只读语句在从库执行
         
         Args:
-            statement: SQL语句
+            statement: SQL语句，可使用 :name 形式的命名参数
+            params: 参数值，为对象数组时以 executemany 批量执行(仅限非查询语句)
             
         Returns:
             SQL执行结果
-            
-        Raises:
-            Exception: 当执行出错时
         """
         try:
+            params = validate_params(params)
+
             # 检查权限
             operations = self.extract_operations(statement)
             self.check_permissions(operations)
 
-            with ExecuteSqlUtil.get_db_connection() as conn:
-                from sqlalchemy import text
-                
-                # 清理SQL语句并转为大写进行分析
-                cleaned_statement = self.clean_sql(statement)
-                upper_statement = cleaned_statement.upper().strip()
-                
-                # 判断语句类型
-                is_select = (upper_statement.startswith('SELECT') or 
-                           upper_statement.startswith('WITH'))
-                
-                is_show = upper_statement.startswith('SHOW')
-                is_explain = upper_statement.startswith('EXPLAIN')
-                is_describe = (upper_statement.startswith('DESCRIBE') or 
-                             upper_statement.startswith('DESC '))
-                
-                # 特殊语句类型（通常返回结果集）
-                is_query_type = is_select or is_show or is_explain or is_describe
-                
+            # 在事件循环中读取配置，避免在工作线程中访问
+            self._get_stream_limits()
+
+            cache_key, cached = self._lookup_cache(statement, params)
+            if cached is not None:
+                return cached
+
+            generation = get_query_cache().generation
+            read_only = not is_executemany(params) and is_replica_safe(statement)
+            try:
+                result = await self._run_routed(read_only, self._execute_on_connection, statement, True, params)
+                self._store_cache(cache_key, statement, result, generation)
+                return result
+            finally:
+                self.invalidate_for([statement])
+
+        except Exception as e:
+            return self._error_result(e, statement)
+
+    def invalidate_for(self, statements: List[str]) -> None:
+        """语句执行后(无论成功与否)，DDL使受影响表的元数据缓存失效，写入语句使引用了被写入表的查询结果缓存失效"""
+        cache = get_metadata_cache()
+        query_cache = get_query_cache()
+        database = self.database
+        for statement in statements:
+            cleaned = self.clean_sql(statement)
+            cache.invalidate_for_statement(cleaned, database)
+            if query_cache.enabled:
+                query_cache.invalidate_for_statement(cleaned, database)
+
+    def _lookup_cache(self, statement: str,
+                      params: Optional[Params] = None) -> Tuple[Optional[Tuple], Optional[SQLResult]]:
+        """查找查询结果缓存，参数值是缓存键的一部分，批量执行的语句不缓存
+
+        Returns:
+            (缓存键, 缓存的结果)，语句不可缓存时缓存键为None；结果已过期但仍在可返回旧结果的时间内时，
+            返回旧结果并在后台重新查询
+        """
+        cache = get_query_cache()
+        if not cache.enabled or is_executemany(params) or not is_cacheable(statement):
+            return None, None
+        config = get_db_config()
+        key = cache.make_key(statement, self.database, config.get("role", "readonly"),
+                             self._get_stream_limits(), params)
+        result, stale = cache.get(key)
+        if stale and cache.start_refresh(key):
+            task = asyncio.ensure_future(self._refresh_cache(key, statement, params))
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        return key, result
+
+    def _store_cache(self, key: Optional[Tuple], statement: str, result: SQLResult, generation: int) -> None:
+        """缓存成功的查询结果，generation 为开始查询前的值，期间有写入时不缓存"""
+        if key is None or not result.success or result.columns is None:
+            return
+        tables = referenced_tables(statement, self.database)
+        get_query_cache().put(key, result, tables, generation)
+
+    async def _refresh_cache(self, key: Tuple, statement: str, params: Optional[Params] = None) -> None:
+        """后台重新执行查询，更新已过期的缓存"""
+        cache = get_query_cache()
+        generation = cache.generation
+        try:
+            result = await self._run_routed(is_replica_safe(statement), self._execute_on_connection,
+                                            statement, True, params)
+            self._store_cache(key, statement, result, generation)
+        except Exception as e:
+            logger.warning(f"刷新查询结果缓存失败: {e}, SQL: {statement}")
+        finally:
+            cache.finish_refresh(key)
+
+    @staticmethod
+    def _error_result(e: Exception, statement: str) -> SQLResult:
+        """记录日志并构造执行失败的结果"""
+        if isinstance(e, MySQLError):
+            logger.error(f"SQL执行错误: {e}, SQL: {statement}")
+        else:
+            logger.error(f"未知错误: {e}, SQL: {statement}")
+        return SQLResult(
+            success=False,
+            message=f"执行失败: {str(e)}"
+        )
+
+    def is_query_statement(self, statement: str) -> bool:
+        """判断是否为返回结果集的查询类语句(SELECT, SHOW, EXPLAIN, DESCRIBE等)
+
+        Args:
+            statement: SQL语句
+
+        Returns:
+            是否为查询类语句
+        """
+        # 清理SQL语句并转为大写进行分析
+        cleaned_statement = self.clean_sql(statement)
+        upper_statement = cleaned_statement.upper().strip()
+
+        # 判断语句类型
+        is_select = (upper_statement.startswith('SELECT') or
+                   upper_statement.startswith('WITH'))
+
+        is_show = upper_statement.startswith('SHOW')
+        is_explain = upper_statement.startswith('EXPLAIN')
+        is_describe = (upper_statement.startswith('DESCRIBE') or
+                     upper_statement.startswith('DESC '))
+
+        # 特殊语句类型（通常返回结果集）
+        return is_select or is_show or is_explain or is_describe
+
+    def _execute_on_connection(self, conn, statement: str, commit: bool = True,
+                               params: Optional[Params] = None) -> SQLResult:
+        """在给定连接上执行单条SQL语句
+
+        Args:
+            conn: SQLAlchemy连接对象
+            statement: SQL语句
+            commit: 非查询语句执行后是否立即提交(失败时回滚)，批量事务模式下由调用方统一提交
+            params: 参数值，为对象数组时以 executemany 批量执行
+
+        Returns:
+            SQL执行结果
+
+        Raises:
+            Exception: 当执行出错时
+        """
+        is_query_type = self.is_query_statement(statement)
+        if is_query_type and is_executemany(params):
+            raise ValueError("参数为对象数组的批量执行只能用于非查询语句")
+
+        stream_results, max_rows, max_bytes = self._get_stream_limits()
+
+        # SELECT语句加上服务端的执行时间上限
+        guard = current_guard.get()
+        if guard is not None:
+            statement = guard.apply(statement)
+
+        try:
+            # 根据语句类型处理结果
+            if is_query_type and stream_results:
+                # 查询类语句使用服务端游标流式读取，达到上限即停止
+                with phase(PHASE_EXECUTE):
+                    result = conn.execute(
+                        prepare(statement, params), params,
+                        execution_options={"stream_results": True, "max_row_buffer": self.STREAM_BATCH_SIZE}
+                    )
                 try:
-                    # 执行SQL语句
-                    result = conn.execute(text(statement))
-                    
-                    # 根据语句类型处理结果
-                    if is_query_type:
-                        # 查询类语句（SELECT, SHOW, EXPLAIN, DESCRIBE等）
-                        columns = list(result.keys())
-                        rows = result.fetchall()
-                        return SQLResult(
-                            success=True,
-                            message="查询执行成功",
-                            columns=columns,
-                            rows=rows
-                        )
-                    else:
-                        # 非查询语句（INSERT, UPDATE, DELETE等）
+                    columns = list(result.keys())
+                    origins = column_origins(result)
+                    with phase(PHASE_FETCH):
+                        rows, truncated = self._fetch_limited(result, max_rows, max_bytes)
+                finally:
+                    # 关闭服务端游标，丢弃未读取的行，保证连接归还后仍可使用
+                    result.close()
+                return SQLResult(
+                    success=True,
+                    message="查询执行成功",
+                    columns=columns,
+                    rows=rows,
+                    truncated=truncated,
+                    column_origins=origins
+                )
+
+            # 执行SQL语句
+            with phase(PHASE_EXECUTE):
+                result = conn.execute(prepare(statement, params), params)
+
+            if is_query_type:
+                # 查询类语句（SELECT, SHOW, EXPLAIN, DESCRIBE等）
+                columns = list(result.keys())
+                origins = column_origins(result)
+                with phase(PHASE_FETCH):
+                    rows = result.fetchall()
+                return SQLResult(
+                    success=True,
+                    message="查询执行成功",
+                    columns=columns,
+                    rows=rows,
+                    column_origins=origins
+                )
+            else:
+                # 非查询语句（INSERT, UPDATE, DELETE等）
+                if commit:
+                    with phase(PHASE_EXECUTE):
                         conn.commit()
-                        return SQLResult(
-                            success=True,
-                            message="执行成功",
-                            affected_rows=result.rowcount
-                        )
-                except Exception as e:
-                    # 如果是非查询语句且执行失败，回滚事务
-                    if not is_query_type:
-                        conn.rollback()
-                    raise
-                        
-        except MySQLError as e:
-            logger.error(f"SQL执行错误: {e}, SQL: {statement}")
-            return SQLResult(
-                success=False,
-                message=f"执行失败: {str(e)}"
-            )
+                return SQLResult(
+                    success=True,
+                    message="执行成功",
+                    affected_rows=result.rowcount
+                )
         except Exception as e:
-            logger.error(f"未知错误: {e}, SQL: {statement}")
-            return SQLResult(
-                success=False,
-                message=f"执行失败: {str(e)}"
-            )
+            # 如果是非查询语句且执行失败，回滚事务
+            if not is_query_type and commit:
+                conn.rollback()
+            raise
+
+    def _fetch_limited(self, result, max_rows: int, max_bytes: int) -> Tuple[List[Tuple], bool]:
+        """分批读取结果集，超过行数或字节数上限时停止
 
-    def execute_multiple_statements(self, query: str) -> List[SQLResult]:
+        Args:
+            result: 使用 stream_results 执行得到的结果对象
+            max_rows: 最多读取的行数
+            max_bytes: 最多读取的数据量(字节，估算值)
+
+        Returns:
+            (已读取的行, 是否被截断)
+        """
+        rows = []
+        size = 0
+        for partition in result.partitions(self.STREAM_BATCH_SIZE):
+            for row in partition:
+                if len(rows) >= max_rows or size >= max_bytes:
+                    return rows, True
+                rows.append(row)
+                size += sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in row)
+        return rows, False
+
+    async def execute_multiple_statements(self, query: Union[str, List[str]],
+                                          transactional: bool = False) -> List[SQLResult]:
         """执行多条SQL语句
+
+        所有语句在同一个连接上依次执行，只需一次连接获取与检测。
+        开启 MULTI_STATEMENTS 时，连续的非查询语句合并为一次请求发送到服务端。
+        配置了从库且所有语句都是只读语句(非事务模式)时，整批在从库执行。
         
         Args:
-            query: 包含多条SQL语句的查询字符串，以分号分隔
+            query: 包含多条SQL语句的查询字符串，以分号分隔(支持 DELIMITER 指令)，
+                或已由 split_statements 拆分的语句列表
+            transactional: 是否在同一个事务中执行，任一语句失败则全部回滚
             
         Returns:
-            SQL执行结果列表
+            SQL执行结果列表，与语句一一对应
         """
-        statements = [stmt.strip() for stmt in query.split(';') if stmt.strip()]
-        results = []
-        
-        for statement in statements:
+        statements = self.split_statements(query) if isinstance(query, str) else list(query)
+        results: List[Optional[SQLResult]] = [None] * len(statements)
+
+        # 执行前统一检查权限
+        for index, statement in enumerate(statements):
             try:
-                result = self.execute_single_statement(statement)
-                results.append(result)
-            except Exception as e:
+                self.check_permissions(self.extract_operations(statement))
+            except SQLPermissionError as e:
                 logger.warning(f"SQL执行警告: {e}, SQL: {statement}")
-                results.append(SQLResult(
-                    success=False,
-                    message=f"执行失败: {str(e)}"
-                ))
-                
+                results[index] = SQLResult(success=False, message=f"执行失败: {str(e)}")
+
+        if transactional and any(results):
+            return [result or SQLResult(success=False, message="未执行: 事务中存在无权限执行的语句")
+                    for result in results]
+
+        # 在事件循环中读取配置，避免在工作线程中访问
+        self._get_stream_limits()
+        multi_statements = get_db_config().get("multi_statements", False)
+
+        # 不含写入语句的非事务批次，命中缓存的查询不再执行
+        cache_keys: Dict[int, Tuple] = {}
+        generation = get_query_cache().generation
+        if get_query_cache().enabled and not transactional and not any(map(is_write, statements)):
+            for index, statement in enumerate(statements):
+                if results[index] is None:
+                    key, cached = self._lookup_cache(statement)
+                    if cached is not None:
+                        results[index] = cached
+                    elif key is not None:
+                        cache_keys[index] = key
+
+        try:
+            pending = [statement for statement, result in zip(statements, results) if result is None]
+            if pending:
+                # 整批在同一个连接上执行，事务中或包含非只读语句时在主库执行
+                read_only = not transactional and all(map(is_replica_safe, pending))
+                await self._run_routed(
+                    read_only, self._execute_batch_on_connection, statements, results, transactional, multi_statements
+                )
+            for index, key in cache_keys.items():
+                self._store_cache(key, statements[index], results[index], generation)
+        except Exception as e:
+            logger.warning(f"SQL批量执行警告: {e}")
+            message = "未执行: 事务已回滚" if transactional else f"执行失败: {str(e)}"
+            results = [SQLResult(success=False, message=message) if result is None else result
+                       for result in results]
+        finally:
+            self.invalidate_for(statements)
+
         return results
 
+    def _execute_batch_on_connection(self, conn, statements: List[str], results: List[Optional[SQLResult]],
+                                     transactional: bool, multi_statements: bool) -> None:
+        """在同一个连接上执行一批语句，结果写入 results 中对应位置
+
+        Args:
+            conn: SQLAlchemy连接对象
+            statements: SQL语句列表
+            results: 结果列表，已有结果(如权限检查失败)的语句会被跳过
+            transactional: 是否在同一个事务中执行
+            multi_statements: 是否将连续的非查询语句合并为一次请求
+        """
+        index = 0
+        while index < len(statements):
+            if results[index] is not None:
+                index += 1
+                continue
+
+            # 收集连续的、待执行的非查询语句
+            end = index
+            if multi_statements:
+                while (end < len(statements) and results[end] is None
+                       and not self.is_query_statement(statements[end])):
+                    end += 1
+
+            try:
+                if end - index > 1:
+                    index = self._execute_multi_statement(conn, statements, results, index, end, transactional)
+                    if index < 0:
+                        return
+                    continue
+                results[index] = self._execute_on_connection(conn, statements[index], commit=not transactional)
+                index += 1
+            except Exception as e:
+                results[index] = self._error_result(e, statements[index])
+                if transactional:
+                    conn.rollback()
+                    self._mark_rolled_back(results)
+                    return
+                index += 1
+
+        if transactional:
+            conn.commit()
+
+    def _execute_multi_statement(self, conn, statements: List[str], results: List[Optional[SQLResult]],
+                                 start: int, end: int, transactional: bool) -> int:
+        """利用驱动的多语句支持，一次请求执行 statements[start:end]
+
+        Returns:
+            下一条待执行语句的位置。某条语句失败时服务端不再执行其后的语句，
+            非事务模式下从失败语句的下一条继续执行，事务模式下回滚并返回-1
+        """
+        if not conn.in_transaction():
+            conn.begin()
+
+        cursor = conn.connection.cursor()
+        index = start
+        try:
+            with phase(PHASE_EXECUTE):
+                cursor.execute(";\n".join(statements[start:end]))
+                while True:
+                    results[index] = SQLResult(success=True, message="执行成功", affected_rows=cursor.rowcount)
+                    index += 1
+                    if index == end:
+                        break
+                    cursor.nextset()
+        except Exception as e:
+            results[index] = self._error_result(e, statements[index])
+            if transactional:
+                conn.rollback()
+                self._mark_rolled_back(results)
+                return -1
+            # 提交失败语句之前已执行成功的部分，与逐条执行时的行为一致
+            conn.commit()
+            return index + 1
+        finally:
+            cursor.close()
+
+        if not transactional:
+            conn.commit()
+        return end
+
+    @staticmethod
+    def _mark_rolled_back(results: List[Optional[SQLResult]]) -> None:
+        """事务回滚后，更新已执行语句和未执行语句的结果"""
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = SQLResult(success=False, message="未执行: 事务已回滚")
+            elif result.success and result.columns is None:
+                result.message = "执行成功(事务已回滚)"
+
+    def split_statements(self, query: str) -> List[str]:
+        """将包含多条SQL语句的字符串拆分为单条语句
+
+        字符串、标识符和注释中的分号不会被拆分，支持 DELIMITER 指令。
+        开启 MULTI_STATEMENTS 时服务端按自己的词法规则拆分一次请求中的多条语句，
+        语句边界取决于 NO_BACKSLASH_ESCAPES 的脚本被拒绝执行
+
+        Args:
+            query: 包含多条SQL语句的查询字符串
+
+        Returns:
+            SQL语句列表
+
+        Raises:
+            SQLExecutionError: 开启 MULTI_STATEMENTS 时语句边界无法确定
+        """
+        with phase(PHASE_PARSE):
+            if not get_db_config().get("multi_statements", False):
+                return split_statements(query)
+            try:
+                return split_statements_strict(query)
+            except ValueError as e:
+                raise SQLExecutionError(f"执行失败: {e}")
+
     def get_connection_pool_stats(self) -> Dict[str, Any]:
         """获取连接池统计信息
         
         Returns:
             连接池统计信息
         """
-        return self._connection_pool.get_stats()
+        return ExecuteSqlUtil.get_connection_pool().get_stats()
 
     def _get_allowed_operations(self) -> Set[SQLOperation]:
         """获取当前角色允许的操作列表
@@ -245,7 +901,7 @@ class ExecuteSqlUtil:
         """
         config = get_db_config()
         role = config.get("role", "readonly")  # 默认为只读角色
-        return {SQLOperation.from_str(op) for op in get_role_permissions(role)}
+        return allowed_operations(tuple(get_role_permissions(role)))
 
     def clean_sql(self, sql: str) -> str:
         """清理SQL语句，移除注释和多余空白
@@ -264,17 +920,16 @@ class ExecuteSqlUtil:
     def extract_operations(self, sql: str) -> Set[SQLOperation]:
         """提取SQL语句中的所有操作类型
 
+        字符串、标识符和注释中的关键字不计入，结果按语句指纹缓存
+
         Args:
             sql: SQL语句
 
         Returns:
             操作类型集合
         """
-        sql = self.clean_sql(sql.upper())
-        return {
-            op for op in SQLOperation
-            if re.search(rf'\b{op.value}\b', sql)
-        }
+        with phase(PHASE_PARSE):
+            return classify(sql)
 
     def check_permissions(self, operations: Set[SQLOperation]) -> bool:
         """检查操作权限
@@ -288,8 +943,9 @@ class ExecuteSqlUtil:
         Raises:
             SQLPermissionError: 当权限不足时
         """
-        allowed = self._get_allowed_operations()
-        unauthorized = operations - allowed
+        with phase(PHASE_PERMISSION):
+            allowed = self._get_allowed_operations()
+            unauthorized = operations - allowed
 
         if unauthorized:
             raise SQLPermissionError(
@@ -297,24 +953,36 @@ class ExecuteSqlUtil:
             )
         return True
 
-    def format_result(self, result: SQLResult) -> str:
+    def format_result(self, result: SQLResult, budget: Optional[ResponseBudget] = None,
+                      min_rows: int = 0) -> str:
         """格式化SQL执行结果
 
         Args:
             result: SQL执行结果
+            budget: 响应大小预算，查询结果超出剩余预算时只保留前面的行和列统计，
+                    未返回的行数记录在 result.omitted_rows
+            min_rows: 超出预算时至少保留的行数
 
         Returns:
             格式化后的结果字符串
         """
         if not result.success:
-            return result.message
-
-        if result.columns and result.rows:  # SELECT 类查询结果
-            # 将所有值转换为字符串，None转换为"NULL"
-            formatted_rows = [
-                ",".join("NULL" if v is None else str(v) for v in row)
-                for row in result.rows
-            ]
-            return "\n".join([",".join(result.columns)] + formatted_rows)
+            record_error()
+            text = result.message
+        elif result.columns and result.rows:  # SELECT 类查询结果，按列编码为指定格式，None输出为NULL
+            if self._encoder is None:
+                self._encoder = ResultEncoder(get_db_config().get("result_format", "csv"))
+            with phase(PHASE_ENCODE):
+                if budget is None or not budget.limited:
+                    text = self._encoder.encode(result.columns, result.rows, result.truncated)
+                else:
+                    text, kept = self._encoder.encode_head(result.columns, result.rows, budget.remaining,
+                                                           result.truncated, min_rows)
+                    result.omitted_rows = len(result.rows) - kept
+            record_rows(len(result.rows) - result.omitted_rows)
         else:  # 非查询语句结果
-            return f"{result.message}。影响行数: {result.affected_rows}"
\ No newline at end of file
+            text = f"{result.message}。影响行数: {result.affected_rows}"
+
+        if budget is not None:
+            budget.consume(text)
+        return text
\ No newline at end of file
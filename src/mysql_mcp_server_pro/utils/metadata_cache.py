@@ -0,0 +1,194 @@
+"""
+表元数据缓存
+
+缓存 information_schema 中按表查询的元数据(字段、索引、数据量等)，按 (类型, 库名, 表名) 保存，
+带过期时间和条目数上限。execute_sql 执行 CREATE/ALTER/DROP/TRUNCATE/RENAME 后自动失效对应的表。
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+# 以库为单位缓存的元数据类型(如按注释搜索表)，库中任意表结构变化时都需失效
+SCHEMA_WIDE_KINDS = {"table_search"}
+
+# 会改变表元数据的DDL语句，捕获其中的表名
+DDL_TARGET_PATTERN = re.compile(r'''
+    ^\s*(?:
+        (?:CREATE|DROP)\s+(?:TEMPORARY\s+)?TABLES?\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(?P<tables>[`\w.$]+(?:\s*,\s*[`\w.$]+)*)
+      | (?:ALTER|TRUNCATE)\s+(?:IGNORE\s+)?(?:TABLE\s+)?(?P<table>[`\w.$]+)
+      | RENAME\s+TABLES?\s+(?P<renames>.+)
+      | (?:CREATE|DROP)\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?INDEX\s+\S+\s+ON\s+(?P<index_table>[`\w.$]+)
+    )
+''', re.IGNORECASE | re.VERBOSE | re.DOTALL)
+
+DDL_KEYWORD_PATTERN = re.compile(r'^\s*(CREATE|ALTER|DROP|TRUNCATE|RENAME)\b', re.IGNORECASE)
+
+# 不影响表元数据的DDL(库、视图、存储过程等)
+NON_TABLE_DDL_PATTERN = re.compile(
+    r'^\s*(?:CREATE|ALTER|DROP)\s+(?:OR\s+REPLACE\s+)?(?:DEFINER\s*=\s*\S+\s+)?(?:SQL\s+SECURITY\s+\w+\s+)?'
+    r'(?:USER|ROLE|VIEW|PROCEDURE|FUNCTION|TRIGGER|EVENT|SERVER)\b',
+    re.IGNORECASE
+)
+
+
+def parse_table_name(name: str, default_schema: Optional[str]) -> Tuple[Optional[str], str]:
+    """解析 [schema.]table 形式的表名，返回小写的 (库名, 表名)"""
+    parts = [part.strip().strip("`") for part in name.strip().split(".")]
+    schema = parts[0] if len(parts) == 2 else default_schema
+    return (schema.lower() if schema else None), parts[-1].lower()
+
+
+def ddl_targets(statement: str, default_schema: Optional[str]) -> Optional[List[Tuple[Optional[str], str]]]:
+    """提取DDL语句影响的表
+
+    Args:
+        statement: SQL语句(已去除注释)
+        default_schema: 未指定库名时使用的库
+
+    Returns:
+        受影响的 (库名, 表名) 列表；不是DDL或不影响表元数据时返回空列表；无法确定具体表时返回None
+    """
+    if not DDL_KEYWORD_PATTERN.match(statement) or NON_TABLE_DDL_PATTERN.match(statement):
+        return []
+    if re.match(r'^\s*(?:CREATE|DROP|ALTER)\s+(?:DATABASE|SCHEMA)\b', statement, re.IGNORECASE):
+        return None
+
+    match = DDL_TARGET_PATTERN.match(statement)
+    if not match:
+        return None
+    if match.group("tables"):
+        names = match.group("tables").split(",")
+    elif match.group("renames"):
+        # RENAME TABLE a TO b, c TO d
+        names = re.split(r',|\s+TO\s+', match.group("renames"), flags=re.IGNORECASE)
+    else:
+        names = [match.group("table") or match.group("index_table")]
+    return [parse_table_name(name, default_schema) for name in names if name.strip()]
+
+
+class MetadataCache:
+    """带过期时间和条目数上限的表元数据LRU缓存，线程安全"""
+
+    def __init__(self, ttl: float = 300, max_entries: int = 10000):
+        """
+        Args:
+            ttl: 缓存过期时间(秒)，0表示不缓存
+            max_entries: 最多缓存的条目数
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Optional[str], str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listeners: List[Callable[[Optional[str], Optional[str]], None]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, kind: str, schema: Optional[str], table: str) -> Optional[Any]:
+        """读取缓存，不存在或已过期时返回None"""
+        key = (kind, schema and schema.lower(), table.lower())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, kind: str, schema: Optional[str], table: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        key = (kind, schema and schema.lower(), table.lower())
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def configure(self, ttl: float, max_entries: int) -> None:
+        """按新配置更新过期时间和条目数上限，过期时间变化时清空缓存"""
+        with self._lock:
+            if ttl != self.ttl or not ttl > 0:
+                self._entries.clear()
+            self.ttl, self.max_entries = ttl, max_entries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add_listener(self, listener: Callable[[Optional[str], Optional[str]], None]) -> None:
+        """注册失效回调，参数与 invalidate 相同(已转为小写)，用于同步失效其他层级的元数据"""
+        self._listeners.append(listener)
+
+    def invalidate(self, schema: Optional[str] = None, table: Optional[str] = None) -> None:
+        """使缓存失效
+
+        Args:
+            schema: 库名，为None时清空全部缓存
+            table: 表名，为None时使整个库的缓存失效
+        """
+        schema = schema and schema.lower()
+        table = table and table.lower()
+        with self._lock:
+            self.invalidations += 1
+            if schema is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[1] == schema and
+                            (table is None or key[2] == table or key[0] in SCHEMA_WIDE_KINDS)]:
+                    del self._entries[key]
+        for listener in self._listeners:
+            listener(schema, table)
+
+    def invalidate_for_statement(self, statement: str, default_schema: Optional[str]) -> None:
+        """执行DDL语句后使受影响的表缓存失效"""
+        targets = ddl_targets(statement, default_schema)
+        if targets is None:
+            self.invalidate()
+        for schema, table in targets or []:
+            self.invalidate(schema, table)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+_metadata_cache: Optional[MetadataCache] = None
+
+
+def _metadata_cache_settings(config: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "ttl": config.get("metadata_cache_ttl", 300),
+        "max_entries": config.get("metadata_cache_max_entries", 10000),
+    }
+
+
+def get_metadata_cache() -> MetadataCache:
+    """获取全局的表元数据缓存，首次调用时按配置创建"""
+    global _metadata_cache
+    if _metadata_cache is None:
+        from ..config import get_db_config
+        _metadata_cache = MetadataCache(**_metadata_cache_settings(get_db_config()))
+    return _metadata_cache
+
+
+def reload_metadata_cache(config: Mapping[str, Any]) -> None:
+    """配置重新加载后，按新配置更新已创建的表元数据缓存"""
+    if _metadata_cache is not None:
+        _metadata_cache.configure(**_metadata_cache_settings(config))
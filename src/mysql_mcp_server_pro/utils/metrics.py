@@ -0,0 +1,416 @@
+"""
+运行指标
+
+进程内的计数器、直方图和采集时读取的仪表，输出 Prometheus 文本格式(text/plain; version=0.0.4)，
+HTTP 模式通过 /metrics 暴露，stdio 模式通过 get_server_stats 工具读取。不依赖 prometheus_client。
+
+指标:
+    - 连接池: 已借出、空闲、溢出连接数，借出连接的等待时间
+    - 多库连接池: 其他库的连接池数及可建立的连接数
+    - 读写分离: 主库和各从库上执行的请求数，从库的复制延迟、可用状态和未完成的请求数
+    - 工具调用: 各工具的耗时及各阶段耗时、调用次数、错误次数、返回的行数和字节数
+    - 元数据缓存与查询结果缓存的命中统计
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .slow_call_log import log_slow_call
+
+# 工具耗时的直方图分桶(秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 借出连接等待时间的直方图分桶(秒)，正常情况下应在毫秒以内
+CHECKOUT_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# 工具返回的错误文本的前缀
+ERROR_PREFIXES = ("执行查询时出错", "执行失败", "错误:")
+
+# 工具调用的阶段: SQL解析(拆分语句、识别操作类型)、权限检查、借出连接、执行、读取结果、编码输出
+PHASE_PARSE = "parse"
+PHASE_PERMISSION = "permission"
+PHASE_CHECKOUT = "checkout"
+PHASE_EXECUTE = "execute"
+PHASE_FETCH = "fetch"
+PHASE_ENCODE = "encode"
+PHASES = (PHASE_PARSE, PHASE_PERMISSION, PHASE_CHECKOUT, PHASE_EXECUTE, PHASE_FETCH, PHASE_ENCODE)
+
+# 慢调用日志中每个参数值保留的字符数
+ARGUMENT_PREVIEW_CHARS = 500
+
+# 慢调用日志中记录取值的参数，其他参数(如 params、rows、data 中的业务数据)只记录大小
+LOGGED_ARGUMENTS = frozenset({"query", "table", "database", "format"})
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """指标基类"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def collect(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                for labels, value in values]
+
+
+class Gauge(Metric):
+    """采集时通过回调读取当前值，回调返回 [(标签值, 值)]"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 callback: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None):
+        super().__init__(name, documentation, label_names)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        try:
+            values = list(self.callback()) if self.callback else []
+        except Exception:
+            # 数据源不可用(如连接池未创建)时不输出样本
+            values = []
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                for labels, value in values]
+
+
+class CallbackCounter(Gauge):
+    """采集时通过回调读取的累计值(如缓存的命中次数)"""
+    type_name = "counter"
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 标签值 -> (各分桶计数, 总和, 总数)
+        self._values: Dict[Labels, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total, count = self._values.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[labels] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total, count))
+                            for labels, (counts, total, count) in self._values.items())
+        lines = []
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+def _pool_stats() -> Dict:
+    from .execute_sql_util import ExecuteSqlUtil
+    return ExecuteSqlUtil.pool_stats()
+
+
+def _pool_gauge(key: str) -> Callable[[], Iterable[Tuple[Labels, float]]]:
+    def collect():
+        stats = _pool_stats()
+        return [((), stats[key])] if key in stats else []
+    return collect
+
+
+def _cache_stats(key: str) -> Callable[[], Iterable[Tuple[Labels, float]]]:
+    """读取元数据缓存和查询结果缓存的统计"""
+    def collect():
+        from .metadata_cache import get_metadata_cache
+        from .query_cache import get_query_cache
+        return [((name,), cache.stats()[key])
+                for name, cache in (("metadata", get_metadata_cache()), ("query", get_query_cache()))]
+    return collect
+
+
+def _query_cache_stats(key: str) -> Callable[[], Iterable[Tuple[Labels, float]]]:
+    """读取查询结果缓存特有的统计"""
+    def collect():
+        from .query_cache import get_query_cache
+        return [((), get_query_cache().stats()[key])]
+    return collect
+
+
+def _replica_stats(key: str) -> Callable[[], Iterable[Tuple[Labels, float]]]:
+    def collect():
+        from .execute_sql_util import ExecuteSqlUtil
+        return [((stats["endpoint"],), float(stats[key]))
+                for stats in ExecuteSqlUtil.replica_stats() if stats[key] is not None]
+    return collect
+
+
+def _tenant_engine_stats() -> List[Dict]:
+    from .engine_registry import get_engine_registry
+    return get_engine_registry().get_stats()
+
+
+REGISTRY = MetricsRegistry()
+
+POOL_SIZE = REGISTRY.register(Gauge(
+    "mysql_mcp_pool_size", "连接池大小(POOL_SIZE)", callback=_pool_gauge("pool_size")))
+POOL_MAX_OVERFLOW = REGISTRY.register(Gauge(
+    "mysql_mcp_pool_max_overflow", "超出连接池大小后最多可创建的连接数(POOL_MAX_OVERFLOW)",
+    callback=_pool_gauge("max_overflow")))
+POOL_CHECKED_OUT = REGISTRY.register(Gauge(
+    "mysql_mcp_pool_checked_out_connections", "已借出的连接数", callback=_pool_gauge("checked_out_connections")))
+POOL_AVAILABLE = REGISTRY.register(Gauge(
+    "mysql_mcp_pool_available_connections", "连接池中空闲的连接数", callback=_pool_gauge("available_connections")))
+POOL_OVERFLOW = REGISTRY.register(Gauge(
+    "mysql_mcp_pool_overflow_connections", "当前的溢出连接数(为负数时表示连接池尚未建满)",
+    callback=_pool_gauge("overflow_connections")))
+POOL_CHECKOUT_WAIT = REGISTRY.register(Histogram(
+    "mysql_mcp_pool_checkout_wait_seconds", "从连接池借出连接的等待时间(秒)", buckets=CHECKOUT_WAIT_BUCKETS))
+
+TOOL_DURATION = REGISTRY.register(Histogram(
+    "mysql_mcp_tool_duration_seconds", "工具调用耗时(秒)", ("tool",)))
+TOOL_PHASE_DURATION = REGISTRY.register(Histogram(
+    "mysql_mcp_tool_phase_duration_seconds", "工具调用各阶段的累计耗时(秒)", ("tool", "phase")))
+TOOL_ERRORS = REGISTRY.register(Counter(
+    "mysql_mcp_tool_errors_total", "返回错误的工具调用次数", ("tool",)))
+TOOL_ROWS = REGISTRY.register(Counter(
+    "mysql_mcp_tool_rows_returned_total", "工具返回的查询结果行数", ("tool",)))
+TOOL_BYTES = REGISTRY.register(Counter(
+    "mysql_mcp_tool_response_bytes_total", "工具返回的响应字节数(UTF-8)", ("tool",)))
+
+TENANT_ENGINES = REGISTRY.register(Gauge(
+    "mysql_mcp_tenant_engines", "通过 database 参数访问的其他库的连接池数",
+    callback=lambda: [((), len(_tenant_engine_stats()))]))
+TENANT_ENGINE_CAPACITY = REGISTRY.register(Gauge(
+    "mysql_mcp_tenant_engine_capacity_connections", "其他库的连接池可建立的连接数之和(计入 MAX_TOTAL_CONNECTIONS)",
+    callback=lambda: [((), sum(stats["capacity"] for stats in _tenant_engine_stats()))]))
+
+ENDPOINT_REQUESTS = REGISTRY.register(Counter(
+    "mysql_mcp_endpoint_requests_total", "在主库(primary)和各从库上执行的请求数", ("endpoint",)))
+REPLICA_AVAILABLE = REGISTRY.register(Gauge(
+    "mysql_mcp_replica_available", "从库是否参与只读语句的路由(1/0)", ("endpoint",),
+    callback=_replica_stats("available")))
+REPLICA_LAG = REGISTRY.register(Gauge(
+    "mysql_mcp_replica_lag_seconds", "从库的复制延迟(秒)，复制未运行或检测失败时不输出", ("endpoint",),
+    callback=_replica_stats("lag_seconds")))
+REPLICA_OUTSTANDING = REGISTRY.register(Gauge(
+    "mysql_mcp_replica_outstanding_requests", "从库上未完成的请求数", ("endpoint",),
+    callback=_replica_stats("outstanding_requests")))
+
+CACHE_HITS = REGISTRY.register(CallbackCounter(
+    "mysql_mcp_cache_hits_total", "缓存命中次数(查询结果缓存不含返回过期结果的命中)", ("cache",),
+    callback=_cache_stats("hits")))
+CACHE_MISSES = REGISTRY.register(CallbackCounter(
+    "mysql_mcp_cache_misses_total", "缓存未命中次数", ("cache",), callback=_cache_stats("misses")))
+CACHE_INVALIDATIONS = REGISTRY.register(CallbackCounter(
+    "mysql_mcp_cache_invalidations_total", "缓存失效次数", ("cache",), callback=_cache_stats("invalidations")))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "mysql_mcp_cache_entries", "缓存条目数", ("cache",), callback=_cache_stats("entries")))
+QUERY_CACHE_STALE_HITS = REGISTRY.register(CallbackCounter(
+    "mysql_mcp_query_cache_stale_hits_total", "查询结果缓存返回过期结果(同时在后台重新查询)的次数",
+    callback=_query_cache_stats("stale_hits")))
+QUERY_CACHE_BYTES_SAVED = REGISTRY.register(CallbackCounter(
+    "mysql_mcp_query_cache_bytes_saved_total", "查询结果缓存命中时免于从数据库读取的结果数据量(字节，估算值)",
+    callback=_query_cache_stats("bytes_saved")))
+
+
+@dataclass
+class ToolCall:
+    """一次工具调用中累计的统计"""
+    tool: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+    rows: int = 0
+    errors: int = 0
+    # 阶段 -> 累计耗时(秒)，并发执行的阶段(如健康检查的各检查项)耗时相加
+    phases: Dict[str, float] = field(default_factory=dict)
+    token: Optional[Token] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        # 执行和读取阶段在工作线程中记录
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record(self, duration: float, response_bytes: int, failed: bool) -> Dict[str, Any]:
+        """结构化的调用记录，耗时单位为毫秒；other_ms 为各阶段之外的耗时(参数处理、调度等)"""
+        with self._lock:
+            phases = dict(self.phases)
+        return {
+            "time": datetime.now().astimezone().isoformat(timespec="milliseconds"),
+            "tool": self.tool,
+            "duration_ms": round(duration * 1000, 3),
+            "phases_ms": {name: round(phases[name] * 1000, 3) for name in PHASES if name in phases},
+            "other_ms": round(max(0.0, duration - sum(phases.values())) * 1000, 3),
+            "rows": self.rows,
+            "response_bytes": response_bytes,
+            "error": failed,
+            "arguments": {key: _preview(key, value) for key, value in self.arguments.items()},
+        }
+
+
+def _preview(key: str, value: Any) -> Any:
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    if key not in LOGGED_ARGUMENTS:
+        if isinstance(value, (str, bytes)):
+            return f"<{len(value)} chars>"
+        if isinstance(value, dict):
+            return f"<{len(value)} keys>"
+        if isinstance(value, (list, tuple)):
+            return f"<{len(value)} items>"
+        return f"<{type(value).__name__}>"
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= ARGUMENT_PREVIEW_CHARS else text[:ARGUMENT_PREVIEW_CHARS] + "..."
+
+
+# 当前的工具调用，执行SQL时累计返回的行数、错误数和各阶段耗时
+current_call: ContextVar[Optional[ToolCall]] = ContextVar("current_call", default=None)
+
+
+@contextmanager
+def phase(name: str, call: Optional[ToolCall] = None) -> Iterator[None]:
+    """记录一个阶段的耗时到当前(或指定的)工具调用，不在工具调用中时不记录"""
+    call = call or current_call.get()
+    if call is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        call.add_phase(name, time.perf_counter() - start)
+
+
+def observe_checkout(seconds: float) -> None:
+    """记录借出连接的等待时间"""
+    POOL_CHECKOUT_WAIT.observe(seconds)
+    call = current_call.get()
+    if call is not None:
+        call.add_phase(PHASE_CHECKOUT, seconds)
+
+
+def record_rows(rows: int) -> None:
+    call = current_call.get()
+    if call is not None:
+        call.rows += rows
+
+
+def record_error() -> None:
+    call = current_call.get()
+    if call is not None:
+        call.errors += 1
+
+
+def start_call(tool: str, arguments: Optional[Dict[str, Any]] = None) -> ToolCall:
+    call = ToolCall(tool=tool, arguments=dict(arguments or {}))
+    call.token = current_call.set(call)
+    return call
+
+
+def finish_call(call: ToolCall, texts: Sequence[str] = (), failed: bool = False) -> Dict[str, Any]:
+    """记录一次工具调用的耗时、各阶段耗时、返回的行数和字节数，超过 SLOW_CALL_THRESHOLD 时写入慢调用日志
+
+    调用抛出异常、SQL执行失败或返回错误文本时计为错误
+
+    Returns:
+        结构化的调用记录
+    """
+    duration = time.perf_counter() - call.started
+    if call.token is not None:
+        current_call.reset(call.token)
+        call.token = None
+    failed = bool(failed or call.errors or any(text.startswith(ERROR_PREFIXES) for text in texts))
+    response_bytes = sum(len(text.encode("utf-8")) for text in texts)
+
+    TOOL_DURATION.observe(duration, call.tool)
+    for name, seconds in list(call.phases.items()):
+        TOOL_PHASE_DURATION.observe(seconds, call.tool, name)
+    if failed:
+        TOOL_ERRORS.inc(call.tool)
+    if call.rows:
+        TOOL_ROWS.inc(call.tool, amount=call.rows)
+    TOOL_BYTES.inc(call.tool, amount=response_bytes)
+
+    record = call.record(duration, response_bytes, failed)
+    log_slow_call(record)
+    return record
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
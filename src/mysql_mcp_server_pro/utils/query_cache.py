@@ -0,0 +1,344 @@
+"""
+查询结果缓存
+
+缓存只读SELECT语句的结果，按 (规范化SQL, 库名, 角色, 结果上限, 参数值) 保存，带过期时间和内存上限。
+过期后的一段时间内(QUERY_CACHE_STALE_TTL)仍可返回旧结果，同时在后台重新查询。
+execute_sql 执行写入语句后，引用了被写入表的缓存结果立即失效；其他客户端的写入只能等待过期。
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+from .sql_classifier import SQLOperation, classify
+from .sql_lexer import TokenType, tokenize
+from .sql_params import params_key
+
+# 结果不确定(依赖时间、会话、随机数等)或有副作用的语句，不缓存
+NON_CACHEABLE_PATTERN = re.compile(r'''
+    \b(?:NOW|CURDATE|CURTIME|SYSDATE|UNIX_TIMESTAMP|RAND|UUID|UUID_SHORT|CONNECTION_ID|LAST_INSERT_ID
+       |FOUND_ROWS|ROW_COUNT|SLEEP|BENCHMARK|GET_LOCK|RELEASE_LOCK|IS_FREE_LOCK|IS_USED_LOCK
+       |USER|SESSION_USER|SYSTEM_USER|DATABASE|SCHEMA|NEXTVAL|LASTVAL)\s*\(
+  | \b(?:CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|CURRENT_USER|LOCALTIME|LOCALTIMESTAMP
+       |UTC_DATE|UTC_TIME|UTC_TIMESTAMP|SQL_NO_CACHE)\b
+  | @
+  | \bFOR\s+(?:UPDATE|SHARE)\b
+  | \bLOCK\s+IN\s+SHARE\s+MODE\b
+  | \bINTO\b
+  | \b(?:information_schema|performance_schema|sys|mysql)\b
+''', re.IGNORECASE | re.VERBOSE)
+
+# 会修改数据的语句(按首个关键字判断)，执行后需要失效相关的缓存
+WRITE_KEYWORD_PATTERN = re.compile(
+    r'^\s*(?:INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP|TRUNCATE|RENAME|LOAD|CALL|IMPORT|HANDLER)\b',
+    re.IGNORECASE
+)
+
+# 无法从语句本身确定写入了哪些表的语句
+PROCEDURAL_PATTERN = re.compile(r'^\s*(?:CALL|LOAD|IMPORT|HANDLER)\b', re.IGNORECASE)
+
+WRITE_OPERATIONS = frozenset({SQLOperation.INSERT, SQLOperation.UPDATE, SQLOperation.DELETE,
+                              SQLOperation.CREATE, SQLOperation.ALTER, SQLOperation.DROP,
+                              SQLOperation.TRUNCATE})
+
+# 其后跟表名的关键字
+TABLE_KEYWORDS = {"FROM", "JOIN", "INTO", "UPDATE", "TABLE", "TABLES"}
+
+# 表名之后出现这些关键字时，不是表的别名
+NON_ALIAS_KEYWORDS = {
+    "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "OUTER", "CROSS", "NATURAL", "STRAIGHT_JOIN", "ON", "USING",
+    "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "EXCEPT", "INTERSECT", "SET", "VALUES", "VALUE", "SELECT",
+    "FOR", "LOCK", "WINDOW", "PARTITION", "USE", "IGNORE", "FORCE", "INTO", "AS", "WITH", "TO", "IF",
+}
+
+# 规范化时统一为大写的常用关键字(表名、列名等保留原样，表名可能区分大小写)
+NORMALIZED_KEYWORDS = {
+    "SELECT", "FROM", "WHERE", "AND", "OR", "NOT", "IN", "IS", "NULL", "AS", "ON", "USING", "JOIN", "INNER",
+    "LEFT", "RIGHT", "OUTER", "CROSS", "GROUP", "BY", "ORDER", "ASC", "DESC", "LIMIT", "OFFSET", "HAVING",
+    "UNION", "ALL", "DISTINCT", "WITH", "LIKE", "BETWEEN", "CASE", "WHEN", "THEN", "ELSE", "END", "EXISTS",
+    "COUNT", "SUM", "AVG", "MIN", "MAX",
+}
+
+# 缓存结果中每行、每个值的估算开销(字节)
+ROW_OVERHEAD = 64
+VALUE_OVERHEAD = 8
+
+
+def normalize_sql(sql: str) -> str:
+    """规范化SQL：去掉注释，合并空白，常用关键字转为大写，保留字面量和标识符的大小写"""
+    return " ".join(token.value.upper() if token.type == TokenType.WORD and token.value.upper() in NORMALIZED_KEYWORDS
+                    else token.value
+                    for token in tokenize(sql) if token.type not in (TokenType.WHITESPACE, TokenType.COMMENT))
+
+
+def _unquote(name: str) -> str:
+    return name[1:-1].replace("``", "`") if name.startswith("`") else name
+
+
+def referenced_tables(sql: str, default_schema: Optional[str]) -> Set[Tuple[Optional[str], str]]:
+    """提取语句中 FROM/JOIN/INTO/UPDATE/TABLE 之后引用的表，返回小写的 (库名, 表名)
+
+    只做词法层面的识别，可能多识别(如把列名当作表名)，但不会遗漏直接引用的表；视图引用的底层表无法识别
+    """
+    tokens = [token for token in tokenize(sql) if token.type not in (TokenType.WHITESPACE, TokenType.COMMENT)]
+    tables = set()
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        index += 1
+        if token.type != TokenType.WORD or token.value.upper() not in TABLE_KEYWORDS:
+            continue
+        # IF [NOT] EXISTS
+        if index < len(tokens) and tokens[index].value.upper() == "IF":
+            while index < len(tokens) and tokens[index].value.upper() != "EXISTS":
+                index += 1
+            index += 1
+        while index < len(tokens):
+            # 表名: name 或 schema.name
+            if tokens[index].type not in (TokenType.WORD, TokenType.IDENTIFIER) \
+                    or tokens[index].value.upper() in NON_ALIAS_KEYWORDS:
+                break
+            parts = [_unquote(tokens[index].value)]
+            index += 1
+            if index + 1 < len(tokens) and tokens[index].value == "." \
+                    and tokens[index + 1].type in (TokenType.WORD, TokenType.IDENTIFIER):
+                parts.append(_unquote(tokens[index + 1].value))
+                index += 2
+            schema = parts[0] if len(parts) == 2 else default_schema
+            if parts[-1].upper() != "DUAL":
+                tables.add((schema.lower() if schema else None, parts[-1].lower()))
+
+            # 跳过别名，逗号之后是下一张表
+            if index < len(tokens) and tokens[index].value.upper() == "AS":
+                index += 1
+            if index < len(tokens) and tokens[index].type in (TokenType.WORD, TokenType.IDENTIFIER) \
+                    and tokens[index].value.upper() not in NON_ALIAS_KEYWORDS:
+                index += 1
+            if index < len(tokens) and tokens[index].value == ",":
+                index += 1
+                continue
+            break
+    return tables
+
+
+def is_cacheable(sql: str) -> bool:
+    """是否为可以缓存结果的只读SELECT语句"""
+    normalized = normalize_sql(sql)
+    if not re.match(r'(?:SELECT|WITH)\b|\(', normalized, re.IGNORECASE):
+        return False
+    return classify(sql) == {SQLOperation.SELECT} and not NON_CACHEABLE_PATTERN.search(normalized)
+
+
+def is_write(sql: str) -> bool:
+    """是否为可能修改数据的语句"""
+    return bool(WRITE_KEYWORD_PATTERN.match(normalize_sql(sql)) or classify(sql) & WRITE_OPERATIONS)
+
+
+def estimate_size(result: Any) -> int:
+    """查询结果占用内存的估算值(字节)"""
+    size = ROW_OVERHEAD
+    for row in result.rows or []:
+        size += ROW_OVERHEAD + sum(len(v) if isinstance(v, (str, bytes)) else VALUE_OVERHEAD for v in row)
+    return size
+
+
+@dataclass
+class CacheEntry:
+    """一条缓存的查询结果"""
+    result: Any
+    tables: FrozenSet[Tuple[Optional[str], str]]
+    size: int
+    expires_at: float
+    stale_until: float
+
+
+class QueryResultCache:
+    """带过期时间和内存上限的查询结果LRU缓存，线程安全"""
+
+    def __init__(self, ttl: float = 60, stale_ttl: float = 0, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            ttl: 缓存过期时间(秒)，0表示不缓存
+            stale_ttl: 过期后仍可返回旧结果(并在后台刷新)的时间(秒)，0表示过期即失效
+            max_bytes: 缓存结果占用内存的上限(字节，估算值)
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing: Set[Tuple] = set()
+        # 每次失效加1，写入前后不一致时丢弃结果，避免缓存查询期间被其他调用写入的表
+        self.generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(statement: str, database: Optional[str], role: str, limits: Tuple,
+                 params: Optional[Dict[str, Any]] = None) -> Tuple:
+        return normalize_sql(statement), (database or "").lower(), role, limits, params_key(params)
+
+    def get(self, key: Tuple) -> Tuple[Optional[Any], bool]:
+        """读取缓存
+
+        Returns:
+            (结果副本, 是否已过期)，不存在或超出可返回旧结果的时间时结果为None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.stale_until < now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            stale = entry.expires_at < now
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            self.bytes_saved += entry.size
+        # 调用方可能修改结果(如分页截取)，返回副本
+        return replace(entry.result, rows=list(entry.result.rows or [])), stale
+
+    def put(self, key: Tuple, result: Any, tables: Set[Tuple[Optional[str], str]], generation: int) -> None:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            result: 查询结果
+            tables: 查询引用的表
+            generation: 开始查询前的 generation，期间发生过失效时不写入
+        """
+        if not self.enabled:
+            return
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+        now = time.monotonic()
+        entry = CacheEntry(replace(result, rows=list(result.rows or [])), frozenset(tables), size,
+                           now + self.ttl, now + self.ttl + self.stale_ttl)
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def start_refresh(self, key: Tuple) -> bool:
+        """开始后台刷新过期的结果，同一个键同一时间只刷新一次"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def finish_refresh(self, key: Tuple) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def invalidate(self, schema: Optional[str] = None, table: Optional[str] = None) -> None:
+        """使缓存失效
+
+        Args:
+            schema: 库名，为None时清空全部缓存
+            table: 表名，为None时使引用了该库中任意表的缓存失效
+        """
+        schema = schema and schema.lower()
+        table = table and table.lower()
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            if schema is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for key in [key for key, entry in self._entries.items()
+                        if any(name[0] == schema and (table is None or name[1] == table) for name in entry.tables)]:
+                self._remove(key)
+
+    def invalidate_for_statement(self, statement: str, default_schema: Optional[str]) -> None:
+        """执行写入语句后使引用了被写入表的缓存失效，无法确定被写入的表时清空全部缓存"""
+        if not is_write(statement):
+            return
+        tables = referenced_tables(statement, default_schema)
+        if not tables or PROCEDURAL_PATTERN.match(statement) or any(schema is None for schema, _ in tables):
+            self.invalidate()
+            return
+        for schema, table in tables:
+            self.invalidate(schema, table)
+
+    def configure(self, ttl: float, stale_ttl: float, max_bytes: int) -> None:
+        """按新配置更新过期时间和内存上限，过期时间变化时清空缓存(已缓存结果的过期时间按旧配置计算)"""
+        with self._lock:
+            if (ttl, stale_ttl) != (self.ttl, self.stale_ttl) or not ttl > 0:
+                self.generation += 1
+                self._entries.clear()
+                self._bytes = 0
+            self.ttl, self.stale_ttl, self.max_bytes = ttl, stale_ttl, max_bytes
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple) -> None:
+        self._bytes -= self._entries.pop(key).size
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.stale_hits) / total, 4) if total else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+_query_cache: Optional[QueryResultCache] = None
+
+
+def _query_cache_settings(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """查询结果缓存的配置(未开启时 ttl 为0，不缓存)"""
+    return {
+        "ttl": config.get("query_cache_ttl", 60) if config.get("query_cache_enabled", False) else 0,
+        "stale_ttl": config.get("query_cache_stale_ttl", 0),
+        "max_bytes": config.get("query_cache_max_bytes", 64 * 1024 * 1024),
+    }
+
+
+def get_query_cache() -> QueryResultCache:
+    """获取全局的查询结果缓存，首次调用时按配置创建"""
+    global _query_cache
+    if _query_cache is None:
+        from ..config import get_db_config
+        _query_cache = QueryResultCache(**_query_cache_settings(get_db_config()))
+    return _query_cache
+
+
+def reload_query_cache(config: Mapping[str, Any]) -> None:
+    """配置重新加载后，按新配置更新已创建的查询结果缓存"""
+    if _query_cache is not None:
+        _query_cache.configure(**_query_cache_settings(config))
@@ -0,0 +1,135 @@
+"""
+查询超时与取消
+
+SELECT语句通过服务端的执行时间上限(MySQL 的 MAX_EXECUTION_TIME 优化器提示、MariaDB 的 max_statement_time)
+由服务端自行中止；所有语句另有一个看门狗：调用超时或被取消(如MCP客户端断开)时，
+从旁路连接执行 KILL QUERY 终止正在执行的语句，等待语句返回后连接正常归还连接池。
+"""
+
+import logging
+import re
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.pool import NullPool
+
+from .server_capabilities import ServerCapabilities
+
+logger = logging.getLogger(__name__)
+
+# 可以加执行时间提示的SELECT语句(已带优化器提示的语句不再添加)，跳过语句前的空白和注释，
+# 可执行注释(/*! ... */)和优化器提示(/*+ ... */)不是普通注释，以其开头的语句不添加
+SELECT_PATTERN = re.compile(
+    r'^(?>\s+|(?:--(?=\s|$)|\#)[^\n]*|/\*(?![!+]).*?\*/)*+SELECT\b(?!\s*/\*\+)',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# KILL QUERY 使用的旁路连接引擎，按连接池URL缓存
+_kill_engines: Dict[str, Engine] = {}
+_kill_engines_lock = threading.Lock()
+
+
+def apply_statement_timeout(statement: str, timeout: Optional[float],
+                            capabilities: Optional[ServerCapabilities]) -> str:
+    """为SELECT语句加上服务端的执行时间上限，服务端不支持或不是SELECT语句时原样返回
+
+    Args:
+        statement: SQL语句
+        timeout: 超时时间(秒)
+        capabilities: 服务端能力，未知时不添加
+    """
+    if not timeout or capabilities is None:
+        return statement
+    match = SELECT_PATTERN.match(statement)
+    if not match:
+        return statement
+    if capabilities.supports_max_execution_time:
+        return f"{match.group()} /*+ MAX_EXECUTION_TIME({max(1, int(timeout * 1000))}) */{statement[match.end():]}"
+    if capabilities.supports_max_statement_time:
+        return f"SET STATEMENT max_statement_time={timeout:g} FOR {statement}"
+    return statement
+
+
+def connection_id(conn: Connection) -> Optional[int]:
+    """获取连接在服务端的线程ID(CONNECTION_ID())，优先从驱动读取，避免额外的查询"""
+    dbapi_connection = conn.connection.dbapi_connection
+    # pymysql 直接提供 thread_id()，aiomysql 的连接被 SQLAlchemy 适配器包装在 _connection 中
+    for driver_connection in (dbapi_connection, getattr(dbapi_connection, "_connection", None)):
+        thread_id = getattr(driver_connection, "thread_id", None)
+        if callable(thread_id):
+            try:
+                return int(thread_id())
+            except Exception:
+                pass
+    try:
+        return int(conn.exec_driver_sql("SELECT CONNECTION_ID()").scalar())
+    except Exception as e:
+        logger.warning(f"获取连接ID失败，超时后无法终止语句: {e}")
+        return None
+
+
+def kill_query(database_url: str, thread_id: int) -> None:
+    """从旁路连接(不占用连接池)终止指定连接上正在执行的语句"""
+    with _kill_engines_lock:
+        engine = _kill_engines.get(database_url)
+        if engine is None:
+            url = make_url(database_url).set(drivername="mysql+pymysql")
+            engine = _kill_engines[database_url] = create_engine(url, poolclass=NullPool)
+    with engine.connect() as conn:
+        conn.execute(text(f"KILL QUERY {int(thread_id)}"))
+
+
+class QueryGuard:
+    """一次调用中正在执行语句的连接，超时或取消时用于终止语句"""
+
+    def __init__(self, timeout: Optional[float] = None, capabilities: Optional[ServerCapabilities] = None):
+        """
+        Args:
+            timeout: 超时时间(秒)，用于SELECT语句的服务端执行时间上限
+            capabilities: 服务端能力
+        """
+        self.timeout = timeout
+        self.capabilities = capabilities
+        self.connection_id: Optional[int] = None
+        self._running = False
+        # 保证只在语句执行期间 KILL，连接归还连接池后不会误杀其他调用的语句
+        self._lock = threading.Lock()
+
+    def apply(self, statement: str) -> str:
+        return apply_statement_timeout(statement, self.timeout, self.capabilities)
+
+    def attach(self, conn: Connection) -> None:
+        """开始在连接上执行语句"""
+        thread_id = connection_id(conn)
+        with self._lock:
+            self.connection_id = thread_id
+            self._running = thread_id is not None
+
+    def detach(self) -> None:
+        """语句执行结束，连接即将归还连接池"""
+        with self._lock:
+            self._running = False
+
+    def kill(self, database_url: str) -> bool:
+        """终止正在执行的语句，语句已结束时不做任何操作
+
+        Returns:
+            是否执行了 KILL QUERY
+        """
+        with self._lock:
+            if not self._running:
+                return False
+            try:
+                kill_query(database_url, self.connection_id)
+            except Exception as e:
+                logger.warning(f"终止语句失败(connection id: {self.connection_id}): {e}")
+                return False
+            logger.info(f"已终止超时或被取消的语句(connection id: {self.connection_id})")
+            return True
+
+
+# 当前调用的 QueryGuard，工作线程(asyncio.to_thread)和 run_sync 中都能读取到
+current_guard: ContextVar[Optional[QueryGuard]] = ContextVar("current_guard", default=None)
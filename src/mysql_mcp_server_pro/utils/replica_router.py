@@ -0,0 +1,189 @@
+"""
+读写分离
+
+配置 MYSQL_REPLICAS 后，只读语句发送到从库执行，写入语句、显式事务中的语句和依赖主库状态的语句留在主库:
+    - 只读语句: SELECT / WITH / DESCRIBE / EXPLAIN，且不含锁定读(FOR UPDATE、LOCK IN SHARE MODE)、
+      SELECT ... INTO、用户锁函数、会话变量和依赖上一条语句的函数(LAST_INSERT_ID 等)
+    - SHOW 语句反映的是实例自身的状态(进程、变量、引擎状态等)，留在主库
+    - 从库按未完成的请求数最少选择；复制延迟超过 REPLICA_MAX_LAG 或复制未运行的从库不参与选择，
+      没有可用从库时在主库执行
+    - 复制延迟每 REPLICA_CHECK_INTERVAL 秒在后台检测一次(SHOW REPLICA STATUS，需要 REPLICATION CLIENT 权限)
+"""
+
+import asyncio
+import inspect
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from .query_cache import WRITE_KEYWORD_PATTERN, normalize_sql
+from .sql_classifier import SQLOperation, classify
+
+logger = logging.getLogger(__name__)
+
+# 可以在从库执行的操作类型
+READ_OPERATIONS = frozenset({SQLOperation.SELECT, SQLOperation.DESCRIBE, SQLOperation.EXPLAIN})
+
+# 只读语句的首个关键字
+READ_STATEMENT_PATTERN = re.compile(r'^(?:SELECT|WITH|DESC|DESCRIBE|EXPLAIN)\b|^\(', re.IGNORECASE)
+
+# 需要在主库执行的只读语句: 锁定读、写入变量或文件、用户锁、会话状态
+PRIMARY_ONLY_PATTERN = re.compile(r'''
+    \bFOR\s+(?:UPDATE|SHARE)\b
+  | \bLOCK\s+IN\s+SHARE\s+MODE\b
+  | \bINTO\b
+  | @
+  | \b(?:GET_LOCK|RELEASE_LOCK|RELEASE_ALL_LOCKS|IS_FREE_LOCK|IS_USED_LOCK|LAST_INSERT_ID|FOUND_ROWS|ROW_COUNT
+       |CONNECTION_ID|NEXTVAL|LASTVAL|SLEEP)\s*\(
+''', re.IGNORECASE | re.VERBOSE)
+
+# 连接失败类错误码(服务端不可达、连接断开)，读语句可以改在主库重新执行
+CONNECTION_ERROR_CODES = frozenset({2002, 2003, 2005, 2006, 2013, 2055})
+
+# 检测复制延迟的超时时间(秒)
+LAG_CHECK_TIMEOUT = 5
+
+PRIMARY_ENDPOINT = "primary"
+
+
+def is_replica_safe(sql: str) -> bool:
+    """是否为可以在从库执行的只读语句"""
+    normalized = normalize_sql(sql)
+    if not READ_STATEMENT_PATTERN.match(normalized) or WRITE_KEYWORD_PATTERN.match(normalized):
+        return False
+    return classify(sql) <= READ_OPERATIONS and not PRIMARY_ONLY_PATTERN.search(normalized)
+
+
+def is_connection_error(e: Exception) -> bool:
+    """是否为连接失败类错误(语句未在服务端执行)"""
+    orig = getattr(e, "orig", e)
+    args = getattr(orig, "args", ())
+    return bool(args) and args[0] in CONNECTION_ERROR_CODES
+
+
+def fetch_replica_lag(conn) -> Optional[float]:
+    """读取复制延迟(秒)，未配置复制或复制线程未运行时返回None"""
+    try:
+        result = conn.execute(text("SHOW REPLICA STATUS"))
+        column = "Seconds_Behind_Source"
+    except Exception:
+        # MySQL 8.0.22 之前的版本及 MariaDB
+        conn.rollback()
+        result = conn.execute(text("SHOW SLAVE STATUS"))
+        column = "Seconds_Behind_Master"
+    row = result.mappings().first()
+    if row is None:
+        return None
+    lag = row.get(column)
+    return None if lag is None else float(lag)
+
+
+@dataclass
+class ReplicaEndpoint:
+    """一个从库及其状态"""
+    name: str
+    pool: Any
+    # 本进程中在该从库上未完成的请求数
+    outstanding: int = 0
+    # 复制延迟(秒)，None 表示未检测或复制未运行
+    lag: Optional[float] = None
+    available: bool = False
+    error: Optional[str] = None
+
+
+class ReplicaRouter:
+    """在从库中选择执行只读语句的连接池"""
+
+    def __init__(self, endpoints: List[ReplicaEndpoint]):
+        self.endpoints = endpoints
+        self._checked_at: Optional[float] = None
+        self._check_task: Optional[asyncio.Task] = None
+        # 未完成请求数相同时轮流选择
+        self._next = 0
+
+    async def acquire(self) -> Optional[ReplicaEndpoint]:
+        """选择未完成请求数最少的可用从库并计入一个请求，没有可用从库时返回None
+
+        首次选择时等待复制延迟检测完成，之后到期的检测在后台进行，不阻塞请求
+        """
+        from ..config import get_db_config
+        interval = get_db_config().get("replica_check_interval", 5)
+        if self._check_task is None and (self._checked_at is None
+                                         or time.monotonic() - self._checked_at >= interval):
+            self._check_task = asyncio.create_task(self.check())
+            self._check_task.add_done_callback(self._on_checked)
+        if self._checked_at is None and self._check_task is not None:
+            await asyncio.shield(self._check_task)
+
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.available]
+        if not candidates:
+            return None
+        self._next = (self._next + 1) % len(candidates)
+        endpoint = min(candidates[self._next:] + candidates[:self._next], key=lambda e: e.outstanding)
+        endpoint.outstanding += 1
+        return endpoint
+
+    def release(self, endpoint: ReplicaEndpoint) -> None:
+        endpoint.outstanding -= 1
+
+    def mark_failed(self, endpoint: ReplicaEndpoint, e: Exception) -> None:
+        """从库连接失败，在下次检测成功前不再选择"""
+        logger.warning(f"从库 {endpoint.name} 连接失败，暂停使用: {e}")
+        endpoint.available = False
+        endpoint.error = str(e)
+
+    def _on_checked(self, task: asyncio.Task) -> None:
+        self._check_task = None
+        self._checked_at = time.monotonic()
+
+    async def check(self) -> None:
+        """并发检测所有从库的复制延迟"""
+        await asyncio.gather(*(self._check_endpoint(endpoint) for endpoint in self.endpoints))
+
+    async def _check_endpoint(self, endpoint: ReplicaEndpoint) -> None:
+        from ..config import get_db_config
+        max_lag = get_db_config().get("replica_max_lag", 30)
+        try:
+            lag = await asyncio.wait_for(endpoint.pool.run_in_connection(fetch_replica_lag), LAG_CHECK_TIMEOUT)
+        except Exception as e:
+            if endpoint.available or endpoint.error is None:
+                logger.warning(f"检测从库 {endpoint.name} 的复制延迟失败: {e}")
+            endpoint.lag, endpoint.available, endpoint.error = None, False, str(e) or type(e).__name__
+            return
+
+        endpoint.lag = lag
+        if lag is None:
+            endpoint.available, endpoint.error = False, "复制未运行"
+        elif max_lag > 0 and lag > max_lag:
+            endpoint.available, endpoint.error = False, f"复制延迟 {lag:g} 秒，超过 {max_lag:g} 秒"
+        else:
+            endpoint.available, endpoint.error = True, None
+        if not endpoint.available:
+            logger.info(f"从库 {endpoint.name} 暂不可用: {endpoint.error}")
+
+    async def keepalive(self) -> int:
+        removed = 0
+        for endpoint in self.endpoints:
+            removed += await endpoint.pool.keepalive()
+        return removed
+
+    async def close_all_connections(self) -> None:
+        if self._check_task is not None:
+            self._check_task.cancel()
+        for endpoint in self.endpoints:
+            closed = endpoint.pool.close_all_connections()
+            if inspect.isawaitable(closed):
+                await closed
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        return [{
+            "endpoint": endpoint.name,
+            "available": endpoint.available,
+            "lag_seconds": endpoint.lag,
+            "outstanding_requests": endpoint.outstanding,
+            "error": endpoint.error,
+        } for endpoint in self.endpoints]
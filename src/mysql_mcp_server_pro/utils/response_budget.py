@@ -0,0 +1,53 @@
+"""
+工具响应大小预算
+
+LLM客户端难以处理数MB的文本，且每个token都有成本。一次工具调用中的所有结果共享同一个预算，
+查询结果由编码器边编码边计数，超出预算后只保留前面的行和列统计，不会先拼出完整文本再截断。
+"""
+
+from typing import Optional
+
+from .result_encoder import text_size
+
+
+class ResponseBudget:
+    """一次工具调用的响应大小预算(UTF-8字节)，0表示不限制"""
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max(0, int(max_bytes))
+        self.used = 0
+
+    @classmethod
+    def for_call(cls, max_bytes: Optional[int] = None) -> "ResponseBudget":
+        """按调用方传入的上限创建预算，不能超过配置 RESPONSE_MAX_BYTES
+
+        Args:
+            max_bytes: 本次调用的响应大小上限，为None或0时使用配置
+        """
+        from ..config import get_db_config
+        limit = get_db_config().get("response_max_bytes", 0)
+        if max_bytes:
+            limit = min(int(max_bytes), limit) if limit else int(max_bytes)
+        return cls(limit)
+
+    @property
+    def limited(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def remaining(self) -> Optional[int]:
+        """剩余的字节数，不限制时为None"""
+        if not self.limited:
+            return None
+        return max(0, self.max_bytes - self.used)
+
+    def consume(self, text: str) -> str:
+        """计入已输出的文本"""
+        self.used += text_size(text)
+        return text
+
+    def split(self, parts: int) -> int:
+        """平分剩余预算，用于并发执行、各自输出结果的多个查询，不限制时返回0"""
+        if not self.limited:
+            return 0
+        return max(1, self.remaining // max(1, parts))
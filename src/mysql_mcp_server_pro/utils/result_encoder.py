@@ -0,0 +1,476 @@
+"""
+查询结果编码
+
+按列而不是按单元格格式化结果：先把行转置为列，再按列的值类型选择格式化函数，
+尽量让逐个单元格的处理落在 map/join 等内置函数中完成。支持的输出格式:
+    - csv:      逗号分隔，包含逗号、引号、换行的值按 RFC 4180 加引号
+    - jsonl:    每行一个 JSON 对象
+    - markdown: Markdown 表格
+    - json:     紧凑的带类型 JSON，{"columns": [{"name", "type"}], "rows": [[...]]}
+"""
+
+import base64
+import datetime
+import decimal
+import json
+import operator
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# json 模块的C实现，逐个字符串编码时比 json.dumps 快得多
+from json.encoder import encode_basestring
+
+RESULT_FORMATS = ("csv", "jsonl", "markdown", "json")
+
+NULL_TEXT = "NULL"
+NULL_JSON = "null"
+NONE_TYPE = type(None)
+
+# CSV 中需要加引号的字符
+CSV_SPECIAL_CHARS = (",", '"', "\n", "\r")
+CSV_SPECIAL_PATTERN = re.compile(r'[,"\r\n]')
+
+# 值类型 -> 类型名(用于 json 格式的列类型)
+TYPE_NAMES = {
+    bool: "bool",
+    int: "int",
+    float: "float",
+    decimal.Decimal: "decimal",
+    str: "string",
+    bytes: "bytes",
+    datetime.datetime: "datetime",
+    datetime.date: "date",
+    datetime.time: "time",
+    datetime.timedelta: "time",
+}
+
+
+def _bytes_to_text(value: bytes) -> str:
+    """二进制值能按UTF-8解码时输出文本，否则输出十六进制"""
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return "0x" + value.hex()
+
+
+def _bytes_to_json(value: bytes) -> str:
+    try:
+        return encode_basestring(value.decode("utf-8"))
+    except UnicodeDecodeError:
+        return encode_basestring("base64:" + base64.b64encode(value).decode("ascii"))
+
+
+def _bool_to_json(value: bool) -> str:
+    return "true" if value else "false"
+
+
+def _str_to_json(value: Any) -> str:
+    return encode_basestring(str(value))
+
+
+# 与 str() 结果相同，但省去一次方法分派
+_datetime_to_text = operator.methodcaller("isoformat", " ")
+
+
+def _json_default(value: Any) -> Any:
+    """json.dumps 遇到非原生类型时的转换，结果与 JSON_FORMATTERS 一致"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return "base64:" + base64.b64encode(value).decode("ascii")
+    return str(value)
+
+
+def _datetime_to_json(value: datetime.datetime) -> str:
+    return '"' + value.isoformat(" ") + '"'
+
+
+def _date_to_json(value: datetime.date) -> str:
+    return '"' + value.isoformat() + '"'
+
+
+# 值类型 -> 文本格式化函数(csv、markdown)
+TEXT_FORMATTERS: Dict[type, Callable[[Any], str]] = {
+    int: str,
+    float: repr,
+    decimal.Decimal: str,
+    str: str,
+    bytes: _bytes_to_text,
+    bool: str,
+    datetime.datetime: _datetime_to_text,
+    datetime.date: datetime.date.isoformat,
+    datetime.time: str,
+    datetime.timedelta: str,
+}
+
+# 值类型 -> JSON片段格式化函数(jsonl、json)
+JSON_FORMATTERS: Dict[type, Callable[[Any], str]] = {
+    int: str,
+    float: repr,
+    decimal.Decimal: str,
+    str: encode_basestring,
+    bytes: _bytes_to_json,
+    bool: _bool_to_json,
+    datetime.datetime: _datetime_to_json,
+    datetime.date: _date_to_json,
+    datetime.time: _str_to_json,
+    datetime.timedelta: _str_to_json,
+}
+
+# 格式化结果中不会出现引号、逗号、换行的类型，无需转义
+PLAIN_TYPES = {int, float, decimal.Decimal, bool, datetime.datetime, datetime.date,
+               datetime.time, datetime.timedelta}
+
+# 相等的值格式化结果一定相同的类型，重复值多时按去重后的值格式化
+# (Decimal('1.5') == Decimal('1.50')、0.0 == -0.0，不适用)
+DEDUPE_TYPES = {int, str, bytes, datetime.datetime, datetime.date, datetime.time, datetime.timedelta}
+
+# 可以交给 json.dumps 的C实现整体编码的列类型，非原生类型由 _json_default 转换
+# (Decimal 需要原样输出数字文本，只能逐个格式化)
+JSON_DUMPS_TYPES = {int, float, str, bool, None, bytes, datetime.datetime, datetime.date,
+                    datetime.time, datetime.timedelta}
+
+# 按前若干个值估算重复程度
+DEDUPE_SAMPLE_SIZE = 256
+
+# 限制响应大小时每批编码的行数，超出预算后不再编码后续的行
+BUDGET_CHUNK_ROWS = 1000
+
+# 列统计中最小值、最大值最多保留的字符数
+STAT_TEXT_LIMIT = 64
+
+
+def column_type(values: Sequence[Any]) -> Tuple[Optional[type], bool]:
+    """列中非空值的类型(类型不一致时为object，全部为空时为None)，以及列中是否有空值
+
+    用类型判断空值，避免 None in values 对每个值调用 __eq__ (Decimal、datetime 的比较很慢)
+    """
+    types = set(map(type, values))
+    has_null = NONE_TYPE in types
+    types.discard(NONE_TYPE)
+    if not types:
+        return None, has_null
+    if len(types) == 1:
+        return types.pop(), has_null
+    return object, has_null
+
+
+def format_column(values: Sequence[Any], formatters: Dict[type, Callable[[Any], str]],
+                  null: str) -> Tuple[Sequence[str], Optional[type]]:
+    """格式化一列值
+
+    Args:
+        values: 列中的值
+        formatters: 值类型 -> 格式化函数
+        null: NULL的输出
+
+    Returns:
+        (格式化后的字符串列表, 列类型)
+    """
+    value_type, has_null = column_type(values)
+    if value_type is None:
+        return [null] * len(values), None
+
+    formatter = formatters.get(value_type)
+    if formatter is None:
+        # 类型不一致或未知类型，逐个值选择格式化函数
+        return [null if v is None else formatters.get(type(v), _fallback(formatters))(v) for v in values], value_type
+
+    if formatter is str and value_type is str and not has_null:
+        # 字符串列无需转换
+        return values, value_type
+
+    if value_type in DEDUPE_TYPES and len(values) > DEDUPE_SAMPLE_SIZE \
+            and len(set(values[:DEDUPE_SAMPLE_SIZE])) * 2 <= DEDUPE_SAMPLE_SIZE:
+        # 重复值较多(状态、日期等)，每个不同的值只格式化一次
+        mapping = {v: null if v is None else formatter(v) for v in dict.fromkeys(values)}
+        return list(map(mapping.__getitem__, values)), value_type
+
+    if has_null:
+        return [null if v is None else formatter(v) for v in values], value_type
+    return list(map(formatter, values)), value_type
+
+
+def _fallback(formatters: Dict[type, Callable[[Any], str]]) -> Callable[[Any], str]:
+    return _str_to_json if formatters is JSON_FORMATTERS else str
+
+
+def _csv_quote(value: str) -> str:
+    if CSV_SPECIAL_PATTERN.search(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _csv_quote_column(values: Sequence[str]) -> Sequence[str]:
+    """整列没有特殊字符时直接返回，否则只给包含特殊字符的值加引号"""
+    joined = "".join(values)
+    if not any(char in joined for char in CSV_SPECIAL_CHARS):
+        return values
+    search = CSV_SPECIAL_PATTERN.search
+    return ['"' + v.replace('"', '""') + '"' if search(v) else v for v in values]
+
+
+def _markdown_escape(value: str) -> str:
+    return value.replace("|", "\\|").replace("\r\n", "<br>").replace("\n", "<br>")
+
+
+def _markdown_escape_column(values: Sequence[str]) -> Sequence[str]:
+    joined = "".join(values)
+    if "|" not in joined and "\n" not in joined:
+        return values
+    return list(map(_markdown_escape, values))
+
+
+def merge_types(left: Optional[type], right: Optional[type]) -> Optional[type]:
+    """合并两段数据的列类型，规则与 column_type 相同"""
+    if left is None or left is right:
+        return right
+    if right is None:
+        return left
+    return object
+
+
+def text_size(text: str) -> int:
+    """文本按UTF-8编码后的字节数"""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def column_stats(values: Sequence[Any]) -> Tuple[int, int, Any, Any]:
+    """列统计: (行数, 空值数, 最小值, 最大值)，值类型不可比较时最小值、最大值为None"""
+    present = [v for v in values if v is not None]
+    try:
+        low, high = min(present), max(present)
+    except (TypeError, ValueError):
+        low = high = None
+    return len(values), len(values) - len(present), low, high
+
+
+def _stat_text(value: Any) -> Optional[str]:
+    """统计值的文本，过长时截断"""
+    if value is None:
+        return None
+    text = TEXT_FORMATTERS.get(type(value), str)(value)
+    return text if len(text) <= STAT_TEXT_LIMIT else text[:STAT_TEXT_LIMIT] + "..."
+
+
+def validate_result_format(result_format: str) -> str:
+    """检查结果格式是否支持
+
+    Raises:
+        ValueError: 不支持的结果格式
+    """
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"不支持的结果格式: {result_format}，可选: {', '.join(RESULT_FORMATS)}")
+    return result_format
+
+
+def _stat_line_text(text: Optional[str]) -> str:
+    """统计行中的值，含换行等控制字符或引号时转为带引号的JSON字符串，避免一个值占据多行"""
+    if text is None:
+        return NULL_TEXT
+    text = str(text)
+    if text.isprintable() and '"' not in text:
+        return text
+    return json.dumps(text, ensure_ascii=False)
+
+
+def _append_line(text: str, line: str) -> str:
+    """在文本后追加一行"""
+    return text + "\n" + line if text else line
+
+
+def _format_template(parts: Sequence[str]) -> str:
+    """由固定片段组成的行模板，片段之间依次填入各列的值"""
+    return "{}".join(part.replace("{", "{{").replace("}", "}}") for part in parts)
+
+
+class ResultEncoder:
+    """将查询结果(列名 + 行)编码为指定格式的文本"""
+
+    def __init__(self, result_format: str = "csv"):
+        """
+        Args:
+            result_format: 输出格式，csv / jsonl / markdown / json
+        """
+        self.result_format = validate_result_format(result_format)
+
+    def encode(self, columns: Sequence[str], rows: Sequence[Sequence[Any]],
+               truncated: bool = False, max_bytes: Optional[int] = None) -> str:
+        """编码查询结果
+
+        Args:
+            columns: 列名
+            rows: 结果行
+            truncated: 结果是否被截断，截断时附上说明
+            max_bytes: 编码结果的大小上限(UTF-8字节)，为None时不限制
+
+        Returns:
+            编码后的文本
+        """
+        if max_bytes is not None:
+            return self.encode_head(columns, rows, max_bytes, truncated)[0]
+
+        columns = list(columns)
+        values = list(zip(*rows)) if rows else [() for _ in columns]
+        value_types = [column_type(column)[0] for column in values]
+        if self.result_format == "json" and JSON_DUMPS_TYPES.issuperset(value_types) \
+                and all(isinstance(row, (tuple, list)) for row in rows):
+            # 行可以直接交给C实现整体编码，比按列拼接更快
+            body = json.dumps(rows if isinstance(rows, list) else list(rows), ensure_ascii=False,
+                              separators=(",", ":"), default=_json_default)
+            text = self._header(columns, value_types)[:-1] + body + "}"
+        else:
+            text = self._join(self._header(columns, value_types), self._encode_rows(columns, values)[0])
+        return self._with_truncated_note(text, truncated, len(rows))
+
+    def encode_head(self, columns: Sequence[str], rows: Sequence[Sequence[Any]], max_bytes: int,
+                    truncated: bool = False, min_rows: int = 0) -> Tuple[str, int]:
+        """在大小上限内编码查询结果
+
+        按批编码并累计大小，超出上限后不再编码后续的行；放不下全部结果时只保留前面的行，
+        并附上各列的统计信息(行数、空值数、最小值、最大值)和省略的行数、估算的字节数
+
+        Args:
+            columns: 列名
+            rows: 结果行
+            max_bytes: 编码结果的大小上限(UTF-8字节)
+            truncated: 结果是否已被行数上限截断
+            min_rows: 至少保留的行数(即使超出上限)，分页读取时保证每页都有进展
+
+        Returns:
+            (编码后的文本, 保留的行数)
+        """
+        columns = list(columns)
+        # 行数截断说明的大小
+        extra = text_size(self._with_truncated_note("}", truncated, len(rows))) - 1
+        value_types: List[Optional[type]] = [None] * len(columns)
+        kept: List[str] = []
+        sizes: List[int] = []
+        used = 0
+        overflow = False
+        for start in range(0, len(rows), BUDGET_CHUNK_ROWS):
+            row_texts, chunk_types = self._encode_rows(columns, list(zip(*rows[start:start + BUDGET_CHUNK_ROWS])))
+            value_types = list(map(merge_types, value_types, chunk_types))
+            # 表头和行分隔符按每行多1字节估算，表头大小取决于列类型(json)，最后统一校正
+            budget = max_bytes - extra - text_size(self._header(columns, value_types))
+            for row_text in row_texts:
+                size = text_size(row_text) + 1
+                sizes.append(size)
+                if used + size > budget and len(kept) >= min_rows:
+                    overflow = True
+                    break
+                kept.append(row_text)
+                used += size
+            if overflow:
+                break
+
+        if not overflow:
+            return self._with_truncated_note(self._join(self._header(columns, value_types), kept),
+                                             truncated, len(rows)), len(rows)
+
+        # 放不下全部结果，去掉末尾的行直到统计信息也能放下
+        stats = [column_stats(column) for column in (zip(*rows) if rows else [() for _ in columns])]
+        average = sum(sizes) / len(sizes)
+        while True:
+            omitted = len(rows) - len(kept)
+            header = self._header(columns, value_types)
+            note = self._budget_note(columns, stats, max_bytes, len(kept), omitted, int(average * omitted))
+            # 另留出表头、说明之间的分隔符
+            if len(kept) <= min_rows or text_size(header) + used + text_size(note) + extra + 2 <= max_bytes:
+                break
+            used -= text_size(kept.pop()) + 1
+
+        text = self._join(header, kept)
+        text = text[:-1] + note + "}" if self.result_format == "json" else _append_line(text, note)
+        return self._with_truncated_note(text, truncated, len(rows)), len(kept)
+
+    def _with_truncated_note(self, text: str, truncated: bool, row_count: int) -> str:
+        if not truncated:
+            return text
+        if self.result_format == "json":
+            return text[:-1] + ',"truncated":true}'
+        if self.result_format == "jsonl":
+            # 说明作为最后一行的JSON对象，保证每行都能单独解析
+            return _append_line(text, '{"_truncated":{"rows":%d}}' % row_count)
+        return _append_line(text, f"-- 结果已截断(truncated after {row_count} rows)")
+
+    def _budget_note(self, columns: List[str], stats: List[Tuple[int, int, Any, Any]], max_bytes: int,
+                     kept: int, omitted: int, omitted_bytes: int) -> str:
+        """结果超出大小上限时附加的说明和列统计"""
+        if self.result_format in ("json", "jsonl"):
+            summary = {
+                "max_bytes": max_bytes,
+                "returned_rows": kept,
+                "omitted_rows": omitted,
+                "omitted_bytes": omitted_bytes,
+                "column_stats": [
+                    {"name": str(name), "count": count, "nulls": nulls, "min": _stat_text(low), "max": _stat_text(high)}
+                    for name, (count, nulls, low, high) in zip(columns, stats)
+                ],
+            }
+            text = json.dumps(summary, ensure_ascii=False, separators=(",", ":"))
+            return ',"budget":' + text if self.result_format == "json" else '{"_budget":' + text + "}"
+
+        lines = [f"-- 结果超出剩余的响应大小预算({max_bytes} bytes)，仅返回前 {kept} 行，"
+                 f"省略 {omitted} 行(约 {omitted_bytes} bytes)",
+                 "-- 列统计(行数 / 空值数 / 最小值 / 最大值):"]
+        for name, (count, nulls, low, high) in zip(columns, stats):
+            lines.append(f"-- {_stat_line_text(name)}: {count} / {nulls} / "
+                         f"{_stat_line_text(_stat_text(low))} / {_stat_line_text(_stat_text(high))}")
+        return "\n".join(lines)
+
+    def _encode_rows(self, columns: List[str],
+                     values: List[Sequence[Any]]) -> Tuple[List[str], List[Optional[type]]]:
+        """按列格式化后拼成每行的文本，返回 (各行文本, 各列类型)"""
+        if not values:
+            return [], [None] * len(columns)
+        formatters, null = (JSON_FORMATTERS, NULL_JSON) if self.result_format in ("jsonl", "json") \
+            else (TEXT_FORMATTERS, NULL_TEXT)
+        formatted = []
+        value_types = []
+        for column in values:
+            texts, value_type = format_column(column, formatters, null)
+            if self.result_format == "csv" and value_type not in PLAIN_TYPES:
+                texts = _csv_quote_column(texts)
+            elif self.result_format == "markdown" and value_type not in PLAIN_TYPES:
+                texts = _markdown_escape_column(texts)
+            formatted.append(texts)
+            value_types.append(value_type)
+        if self.result_format == "csv":
+            return list(map(",".join, zip(*formatted))), value_types
+        return list(map(self._row_template(columns).format, *formatted)), value_types
+
+    def _row_template(self, columns: List[str]) -> str:
+        """每行文本的模板"""
+        if self.result_format == "markdown":
+            return _format_template(["| "] + [" | "] * (len(columns) - 1) + [" |"])
+        if self.result_format == "jsonl":
+            keys = [encode_basestring(str(column)) for column in columns]
+            return _format_template(["{" + keys[0] + ":"] + ["," + key + ":" for key in keys[1:]] + ["}"])
+        return _format_template(["["] + [","] * (len(columns) - 1) + ["]"])
+
+    def _header(self, columns: List[str], value_types: List[Optional[type]]) -> str:
+        if self.result_format == "csv":
+            return ",".join(map(_csv_quote, map(str, columns)))
+        if self.result_format == "markdown":
+            return (self._row_template(columns).format(*map(_markdown_escape, map(str, columns)))
+                    + "\n|" + "---|" * len(columns))
+        if self.result_format == "json":
+            header = json.dumps([{"name": str(name), "type": TYPE_NAMES.get(value_type, "null" if value_type is None else "mixed")}
+                                 for name, value_type in zip(columns, value_types)],
+                                ensure_ascii=False, separators=(",", ":"))
+            return '{"columns":' + header + ',"rows":['
+        return ""
+
+    def _join(self, header: str, row_texts: List[str]) -> str:
+        """拼接表头和各行文本"""
+        if self.result_format == "json":
+            return header + ",".join(row_texts) + "]}"
+        if self.result_format == "jsonl":
+            return "\n".join(row_texts)
+        return "\n".join([header, *row_texts])
@@ -0,0 +1,447 @@
+"""
+查询结果句柄，支持大结果集的分页读取
+
+execute_sql 对大结果集只返回第一页和一个句柄，后续页通过 fetch_result_page 工具读取。
+能确定整数主键时使用主键续读(keyset)，后续页只扫描主键之后的一小段；否则在语句末尾的 ORDER BY
+能确定唯一顺序时(包含表的全部主键列)使用 LIMIT/OFFSET，各页不会重叠或遗漏；都不满足时不分页，
+直接返回受行数上限约束的结果。
+"""
+
+import json
+import logging
+import re
+import secrets
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from .execute_sql_util import ExecuteSqlUtil, SQLResult
+from .query_cache import referenced_tables
+from .sql_lexer import TRIVIA_TYPES, TokenType, tokenize
+from .response_budget import ResponseBudget
+from .sql_params import Params
+
+logger = logging.getLogger(__name__)
+
+# 可以使用主键续读的简单单表查询: SELECT ... FROM table [WHERE ...]
+SIMPLE_SELECT_PATTERN = re.compile(
+    r'^SELECT\s+(?P<columns>.+?)\s+FROM\s+(?P<table>`?\w+`?(?:\.`?\w+`?)?)(?:\s+(?:AS\s+)?\w+)?(?:\s+WHERE\s+.*)?$',
+    re.IGNORECASE | re.DOTALL
+)
+
+# 出现这些关键字时查询结果与主键顺序无关，不能使用主键续读
+NON_KEYSET_PATTERN = re.compile(
+    r'\b(JOIN|UNION|GROUP\s+BY|ORDER\s+BY|LIMIT|DISTINCT|HAVING|FOR\s+UPDATE|INTO)\b|\(\s*SELECT\b',
+    re.IGNORECASE
+)
+
+INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+
+# 查找主键列，未指定库名时使用当前库
+KEY_COLUMN_SQL = ("SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+                  "WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE()) AND TABLE_NAME = :table AND COLUMN_KEY = 'PRI'")
+
+# ORDER BY 之后出现这些关键字时，不能在语句末尾追加 LIMIT/OFFSET
+NON_OFFSET_KEYWORDS = {"LIMIT", "FOR", "LOCK", "INTO", "UNION", "EXCEPT", "INTERSECT", "PROCEDURE"}
+
+# 会话对象到会话标识的映射，会话结束后随之释放，不会像 id() 那样被新的会话复用
+_session_keys: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+_session_keys_lock = threading.Lock()
+
+
+def get_session_key() -> str:
+    """获取当前MCP会话的标识，不在请求上下文中时(如直接调用)返回默认值"""
+    try:
+        from mcp.server.lowlevel.server import request_ctx
+        session = request_ctx.get().session
+    except LookupError:
+        return "default"
+    with _session_keys_lock:
+        key = _session_keys.get(session)
+        if key is None:
+            key = _session_keys[session] = secrets.token_hex(8)
+        return key
+
+
+def strip_statement(statement: str) -> str:
+    """去掉语句末尾的分号、注释和空白，语句可以被包在子查询中或在末尾追加子句"""
+    tokens = list(tokenize(statement))
+    while tokens and (tokens[-1].type in TRIVIA_TYPES or tokens[-1].value == ";"):
+        tokens.pop()
+    return "".join(token.value for token in tokens).strip()
+
+
+def _order_by_columns(statement: str) -> Optional[Set[str]]:
+    """语句末尾的 ORDER BY 中的列名(小写，不含表名前缀)
+
+    ORDER BY 不在语句末尾(之后还有 LIMIT 等子句)或排序项不是简单的列时返回None
+    """
+    tokens = [token for token in tokenize(statement) if token.type not in TRIVIA_TYPES]
+    depth = 0
+    order_by = None
+    for index, token in enumerate(tokens):
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        elif depth == 0 and token.type == TokenType.WORD:
+            word = token.value.upper()
+            if word == "ORDER" and index + 1 < len(tokens) and tokens[index + 1].value.upper() == "BY":
+                order_by = index + 2
+            elif word in NON_OFFSET_KEYWORDS:
+                return None
+    if order_by is None:
+        return None
+
+    columns = set()
+    items: List[List[Any]] = [[]]
+    for token in tokens[order_by:]:
+        if token.value == ",":
+            items.append([])
+        else:
+            items[-1].append(token)
+    for item in items:
+        if item and item[-1].value.upper() in ("ASC", "DESC"):
+            item.pop()
+        # 排序项只能是 column 或 table.column
+        names = item[::2]
+        if len(item) not in (1, 3) or any(token.type not in (TokenType.WORD, TokenType.IDENTIFIER) for token in names) \
+                or (len(item) == 3 and item[1].value != "."):
+            return None
+        name = names[-1].value
+        columns.add((name[1:-1].replace("``", "`") if name.startswith("`") else name).lower())
+    return columns
+
+
+@dataclass
+class ResultHandle:
+    """分页读取中的查询结果句柄"""
+    handle_id: str
+    statement: str
+    page_size: int
+    # 语句的参数值
+    params: Optional[Dict[str, Any]] = None
+    # 打开句柄时访问的库，为None时为默认库
+    database: Optional[str] = None
+    key_column: Optional[str] = None
+    last_key: Any = None
+    offset: int = 0
+    # 本页开始前的续读位置，本页因响应大小预算未全部返回时从这里回退
+    page_start_key: Any = None
+    page_start_offset: int = 0
+    last_access: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        """句柄占用内存的估算值(字节)"""
+        return len(self.statement) + (len(repr(self.params)) if self.params else 0) + 256
+
+
+class ResultHandleStore:
+    """按会话保存结果句柄的LRU，限制总内存、每个会话的句柄数，并清理空闲过期的句柄"""
+
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024, max_handles_per_session: int = 32,
+                 idle_ttl: float = 600):
+        """
+        Args:
+            max_bytes: 所有句柄占用内存的上限(字节，估算值)
+            max_handles_per_session: 每个会话最多保留的句柄数
+            idle_ttl: 句柄空闲多久后过期(秒)
+        """
+        self.max_bytes = max_bytes
+        self.max_handles_per_session = max_handles_per_session
+        self.idle_ttl = idle_ttl
+        self._handles: "OrderedDict[Tuple[str, str], ResultHandle]" = OrderedDict()
+        self._session_counts: dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, session_key: str, handle: ResultHandle) -> None:
+        with self._lock:
+            self._evict_expired()
+            # 同一会话句柄过多时，淘汰该会话最久未使用的句柄
+            if self._session_counts.get(session_key, 0) >= self.max_handles_per_session:
+                oldest = next(key for key in self._handles if key[0] == session_key)
+                self._remove(oldest)
+            self._handles[(session_key, handle.handle_id)] = handle
+            self._session_counts[session_key] = self._session_counts.get(session_key, 0) + 1
+            self._bytes += handle.size
+            while self._bytes > self.max_bytes and len(self._handles) > 1:
+                self._remove(next(iter(self._handles)))
+
+    def get(self, session_key: str, handle_id: str) -> Optional[ResultHandle]:
+        with self._lock:
+            self._evict_expired()
+            handle = self._handles.get((session_key, handle_id))
+            if handle is not None:
+                handle.last_access = time.monotonic()
+                self._handles.move_to_end((session_key, handle_id))
+            return handle
+
+    def remove(self, session_key: str, handle_id: str) -> None:
+        with self._lock:
+            if (session_key, handle_id) in self._handles:
+                self._remove((session_key, handle_id))
+
+    def configure(self, max_bytes: int, max_handles_per_session: int, idle_ttl: float) -> None:
+        """按新配置更新上限，保留现有的句柄，淘汰过期的和超出新上限的句柄"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self.max_handles_per_session = max_handles_per_session
+            self.idle_ttl = idle_ttl
+            self._evict_expired()
+            for key in list(self._handles):
+                if self._session_counts[key[0]] > self.max_handles_per_session:
+                    self._remove(key)
+            while self._bytes > self.max_bytes and len(self._handles) > 1:
+                self._remove(next(iter(self._handles)))
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        handle = self._handles.pop(key)
+        self._bytes -= handle.size
+        count = self._session_counts[key[0]] - 1
+        if count:
+            self._session_counts[key[0]] = count
+        else:
+            del self._session_counts[key[0]]
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.idle_ttl
+        while self._handles:
+            key, handle = next(iter(self._handles.items()))
+            if handle.last_access > deadline:
+                break
+            self._remove(key)
+
+
+class ResultPager:
+    """分页执行SELECT语句，并通过句柄读取后续页"""
+
+    _store: Optional[ResultHandleStore] = None
+
+    def __init__(self, exe: ExecuteSqlUtil):
+        self.exe = exe
+        # 最近一次读取的句柄
+        self._handle: Optional[ResultHandle] = None
+
+    @classmethod
+    def get_store(cls) -> ResultHandleStore:
+        if cls._store is None:
+            from ..config import get_db_config
+            cls._store = ResultHandleStore(**cls._store_settings(get_db_config()))
+        return cls._store
+
+    @classmethod
+    def reload_store(cls, config: Mapping[str, Any]) -> None:
+        """配置重新加载后，按新配置更新已创建的句柄存储"""
+        if cls._store is not None:
+            cls._store.configure(**cls._store_settings(config))
+
+    @staticmethod
+    def _store_settings(config: Mapping[str, Any]) -> Dict[str, Any]:
+        return {
+            "max_bytes": config.get("result_handle_max_bytes", 4 * 1024 * 1024),
+            "max_handles_per_session": config.get("result_handle_max_per_session", 32),
+            "idle_ttl": config.get("result_handle_idle_ttl", 600),
+        }
+
+    def is_pageable(self, statement: str) -> bool:
+        """是否为可以分页读取的查询语句"""
+        upper_statement = self.exe.clean_sql(statement).upper()
+        return upper_statement.startswith("SELECT") or upper_statement.startswith("WITH")
+
+    async def open(self, statement: str, page_size: int,
+                   params: Optional[Params] = None) -> Tuple[SQLResult, Optional[str]]:
+        """执行查询并返回第一页
+
+        Args:
+            statement: SELECT语句
+            page_size: 每页行数
+            params: 语句的参数值
+
+        Returns:
+            (第一页结果, 句柄ID)，结果只有一页时句柄ID为None
+        """
+        statement = strip_statement(statement)
+        handle = ResultHandle(handle_id=secrets.token_hex(8), statement=statement,
+                              page_size=self._clamp_page_size(page_size), params=params or None,
+                              database=self.exe.database_override)
+        handle.key_column = await self._find_key_column(statement, params)
+
+        self._handle = handle
+        if handle.key_column is not None:
+            result = await self._fetch(handle)
+            if result.success and self._key_index(result, handle) is not None:
+                return self._first_page(result, handle)
+            # 包成子查询失败(如结果中有重名的列)时改用其他方式
+            logger.info(f"主键续读失败: {result.message or '结果中没有主键列'}")
+            handle.key_column = None
+
+        if await self._has_unique_order(statement):
+            result = await self._fetch(handle)
+            if result.success:
+                return self._first_page(result, handle)
+            logger.info(f"LIMIT/OFFSET分页失败: {result.message}")
+
+        # 无法保证各页不重叠、不遗漏时不分页，返回受行数上限约束的结果
+        self._handle = None
+        return await self.exe.execute_single_statement(statement, params), None
+
+    def _first_page(self, result: SQLResult, handle: ResultHandle) -> Tuple[SQLResult, Optional[str]]:
+        if self._has_more(result, handle):
+            self.get_store().put(get_session_key(), handle)
+            return result, handle.handle_id
+        return result, None
+
+    async def next_page(self, handle_id: str, page_size: Optional[int] = None) -> Tuple[SQLResult, Optional[str]]:
+        """读取句柄的下一页
+
+        Args:
+            handle_id: 句柄ID
+            page_size: 每页行数，默认沿用打开句柄时的值
+
+        Returns:
+            (本页结果, 句柄ID)，已读取到最后一页时句柄ID为None
+        """
+        session_key = get_session_key()
+        handle = self.get_store().get(session_key, handle_id)
+        if handle is None:
+            return SQLResult(success=False, message=f"结果句柄不存在或已过期: {handle_id}"), None
+        if page_size:
+            handle.page_size = self._clamp_page_size(page_size)
+        if handle.database != self.exe.database_override:
+            self.exe = self.exe.with_database(handle.database)
+        self._handle = handle
+
+        result = await self._fetch(handle)
+        if result.success and self._has_more(result, handle):
+            return result, handle_id
+        self.get_store().remove(session_key, handle_id)
+        return result, None
+
+    def format_page(self, result: SQLResult, handle_id: Optional[str],
+                    budget: Optional[ResponseBudget] = None) -> str:
+        """格式化一页结果，还有下一页时附上句柄
+
+        本页超出响应大小预算时，句柄回退到最后返回的一行之后，未返回的行在下一页中读取，
+        每页至少返回一行以保证分页读取能够结束
+        """
+        text = self.exe.format_result(result, budget, min_rows=1)
+        if result.omitted_rows and self._handle is not None:
+            self._rewind(self._handle, result)
+            if handle_id is None:
+                handle_id = self._handle.handle_id
+                self.get_store().put(get_session_key(), self._handle)
+        if handle_id and self.exe.result_format == "jsonl":
+            # jsonl 每行都是JSON对象，句柄同样作为最后一行的JSON对象
+            text += "\n" + json.dumps({"_next_handle": handle_id}, separators=(",", ":"))
+        elif handle_id:
+            text += f"\n-- 还有更多结果，请调用 fetch_result_page 读取下一页(handle: {handle_id})"
+        return text
+
+    def _clamp_page_size(self, page_size: int) -> int:
+        """每页行数不超过单条查询的行数上限(需留出多取的一行)"""
+        max_rows = self.exe.max_rows
+        return max(1, min(int(page_size), max_rows - 1))
+
+    async def _fetch(self, handle: ResultHandle) -> SQLResult:
+        """执行一页查询，多取一行用于判断是否还有下一页"""
+        return await self.exe.execute_single_statement(*self._build_page_query(handle, handle.page_size + 1))
+
+    def _has_more(self, result: SQLResult, handle: ResultHandle) -> bool:
+        """截掉多取的一行并推进句柄位置，返回是否还有下一页
+
+        本页因 MAX_RESULT_BYTES 被截断时(至少读取一行)，未读取的行在下一页中继续读取
+        """
+        rows = result.rows or []
+        has_more = len(rows) > handle.page_size or (result.truncated and bool(rows))
+        if has_more:
+            result.rows = rows[:handle.page_size]
+            # 多取的一行或截断已说明还有数据，由句柄继续读取，不再视为截断
+            result.truncated = False
+        handle.page_start_key, handle.page_start_offset = handle.last_key, handle.offset
+        if result.rows:
+            if handle.key_column is not None:
+                handle.last_key = result.rows[-1][self._key_index(result, handle)]
+            handle.offset += len(result.rows)
+        return has_more
+
+    @staticmethod
+    def _key_index(result: SQLResult, handle: ResultHandle) -> Optional[int]:
+        """主键列在结果中的位置(列名不区分大小写，如 SELECT ID 对应主键 id)"""
+        key = handle.key_column.lower()
+        return next((index for index, column in enumerate(result.columns or ()) if column.lower() == key), None)
+
+    @classmethod
+    def _rewind(cls, handle: ResultHandle, result: SQLResult) -> None:
+        """句柄回退到本页实际返回的最后一行之后"""
+        kept = len(result.rows) - result.omitted_rows
+        if handle.key_column is not None:
+            handle.last_key = (result.rows[kept - 1][cls._key_index(result, handle)]
+                               if kept else handle.page_start_key)
+        handle.offset = handle.page_start_offset + kept
+
+    @staticmethod
+    def _build_page_query(handle: ResultHandle, limit: int) -> Tuple[str, Dict[str, Any]]:
+        """构造一页的查询和参数，续读位置和行数也作为参数，各页的语句相同"""
+        # 追加的子句另起一行，语句末尾即使有注释也不会吞掉后面的内容
+        params = dict(handle.params or {}, _mcp_limit=int(limit))
+        if handle.key_column is None:
+            # 语句以确定唯一顺序的 ORDER BY 结尾，直接追加 LIMIT/OFFSET(子查询中的 ORDER BY 可能被忽略)
+            params["_mcp_offset"] = int(handle.offset)
+            return f"{handle.statement}\nLIMIT :_mcp_limit OFFSET :_mcp_offset", params
+
+        where = ""
+        if handle.last_key is not None:
+            where = f" WHERE `{handle.key_column}` > :_mcp_last_key"
+            params["_mcp_last_key"] = int(handle.last_key)
+        return (f"SELECT * FROM (\n{handle.statement}\n) AS _mcp_page{where} "
+                f"ORDER BY `{handle.key_column}` LIMIT :_mcp_limit", params)
+
+    async def _primary_key(self, schema: Optional[str], table: str) -> List[Tuple[str, str]]:
+        """表的主键列 [(列名, 类型)]，查询失败时返回空列表"""
+        result = await self.exe.execute_single_statement(KEY_COLUMN_SQL, {"schema": schema, "table": table})
+        if not result.success:
+            return []
+        return [(str(column), str(data_type).lower()) for column, data_type in result.rows or []]
+
+    async def _find_key_column(self, statement: str, params: Optional[Params] = None) -> Optional[str]:
+        """查找可用于主键续读的列：简单单表查询，表的主键为单个整数列，且该列原样出现在查询结果中
+
+        列的来源取自驱动返回的字段元数据(执行 LIMIT 0 的查询)，别名为主键列名的表达式(如 x AS id)不会被误用，
+        主键列的别名(如 id AS pk)可以使用；无法获取字段元数据时不使用主键续读
+
+        Returns:
+            主键列在查询结果中的列名
+        """
+        cleaned = self.exe.clean_sql(statement)
+        match = SIMPLE_SELECT_PATTERN.match(cleaned)
+        if not match or NON_KEYSET_PATTERN.search(cleaned):
+            return None
+
+        parts = match.group("table").replace("`", "").split(".")
+        key = await self._primary_key(parts[0] if len(parts) == 2 else None, parts[-1])
+        if len(key) != 1 or key[0][1] not in INTEGER_TYPES:
+            return None
+
+        probe = await self.exe.execute_single_statement(f"{statement}\nLIMIT 0", params)
+        if not probe.success or probe.column_origins is None:
+            return None
+        table, column = parts[-1].lower(), key[0][0].lower()
+        return next((name for name, (origin_table, origin_column) in zip(probe.columns, probe.column_origins)
+                     if origin_table.lower() == table and origin_column.lower() == column), None)
+
+    async def _has_unique_order(self, statement: str) -> bool:
+        """语句是否以确定唯一顺序的 ORDER BY 结尾：只查询一张表，且排序列包含该表的全部主键列"""
+        order_columns = _order_by_columns(statement)
+        if not order_columns:
+            return False
+        tables = referenced_tables(statement, self.exe.database)
+        if len(tables) != 1:
+            return False
+        schema, table = next(iter(tables))
+        key = await self._primary_key(schema, table)
+        return bool(key) and all(column.lower() in order_columns for column, _ in key)
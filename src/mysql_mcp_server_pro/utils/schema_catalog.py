@@ -0,0 +1,347 @@
+"""
+库结构目录快照
+
+一次批量读取 information_schema，得到库中所有表的注释、数据量、字段和索引，压缩保存到本地文件。
+服务重启(包括每次通过 uvx 启动 stdio 模式)后直接加载快照，再用 information_schema.TABLES 的
+CREATE_TIME/UPDATE_TIME 做一次轻量校验，只重新读取发生变化的表，表结构查询可以直接在内存中完成。
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, text
+
+from .execute_sql_util import ExecuteSqlUtil
+from .metadata_cache import get_metadata_cache
+
+logger = logging.getLogger(__name__)
+
+# 快照文件格式版本，格式变化时旧文件会被忽略并重新构建
+CATALOG_FORMAT_VERSION = 1
+
+TABLES_SQL = ("SELECT TABLE_NAME, TABLE_COMMENT, CREATE_TIME, UPDATE_TIME, "
+              "round(((DATA_LENGTH + INDEX_LENGTH) / 1024 / 1024), 2) "
+              "FROM information_schema.TABLES WHERE TABLE_SCHEMA = :schema{tables}")
+COLUMNS_SQL = ("SELECT TABLE_NAME, COLUMN_NAME, COLUMN_COMMENT "
+               "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = :schema{tables} "
+               "ORDER BY TABLE_NAME, ORDINAL_POSITION")
+INDEXES_SQL = ("SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, SEQ_IN_INDEX, NON_UNIQUE, INDEX_TYPE "
+               "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = :schema{tables} "
+               "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX")
+VERSIONS_SQL = ("SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME "
+                "FROM information_schema.TABLES WHERE TABLE_SCHEMA = :schema")
+
+
+@dataclass
+class CatalogTable:
+    """快照中的一张表"""
+    name: str
+    comment: str = ""
+    create_time: Optional[str] = None
+    update_time: Optional[str] = None
+    size_mb: Optional[str] = None
+    columns: List[Tuple[str, str]] = field(default_factory=list)
+    indexes: List[Tuple[str, str, int, int, str]] = field(default_factory=list)
+
+    def to_list(self) -> list:
+        return [self.name, self.comment, self.create_time, self.update_time, self.size_mb,
+                self.columns, self.indexes]
+
+    @classmethod
+    def from_list(cls, data: list) -> "CatalogTable":
+        name, comment, create_time, update_time, size_mb, columns, indexes = data
+        return cls(name, comment, create_time, update_time, size_mb,
+                   [tuple(column) for column in columns], [tuple(index) for index in indexes])
+
+
+def _to_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _tables_clause(query: str, tables: Optional[Sequence[str]]):
+    """为查询加上表名条件，tables为None时读取整个库"""
+    if tables is None:
+        return text(query.format(tables=""))
+    return text(query.format(tables=" AND TABLE_NAME IN :tables")).bindparams(
+        bindparam("tables", expanding=True))
+
+
+def fetch_catalog(conn, schema: str, tables: Optional[Sequence[str]] = None) -> Dict[str, CatalogTable]:
+    """读取库中(或指定的)表的结构信息，每类信息一次查询
+
+    Args:
+        conn: 数据库连接
+        schema: 库名
+        tables: 只读取这些表，为None时读取整个库
+
+    Returns:
+        小写表名 -> CatalogTable
+    """
+    params: Dict[str, Any] = {"schema": schema}
+    if tables is not None:
+        params["tables"] = list(tables)
+
+    catalog: Dict[str, CatalogTable] = {}
+    for name, comment, create_time, update_time, size_mb in conn.execute(_tables_clause(TABLES_SQL, tables), params):
+        catalog[name.lower()] = CatalogTable(name, comment or "", _to_str(create_time),
+                                             _to_str(update_time), _to_str(size_mb))
+
+    for name, column, comment in conn.execute(_tables_clause(COLUMNS_SQL, tables), params):
+        if name.lower() in catalog:
+            catalog[name.lower()].columns.append((column, comment or ""))
+
+    for name, index, column, seq, non_unique, index_type in conn.execute(_tables_clause(INDEXES_SQL, tables), params):
+        if name.lower() in catalog:
+            catalog[name.lower()].indexes.append((index, column, int(seq), int(non_unique), index_type))
+
+    return catalog
+
+
+def fetch_versions(conn, schema: str) -> Dict[str, Tuple[str, Optional[str], Optional[str]]]:
+    """读取库中所有表的 (表名, CREATE_TIME, UPDATE_TIME)，用于校验快照"""
+    return {
+        name.lower(): (name, _to_str(create_time), _to_str(update_time))
+        for name, create_time, update_time in conn.execute(text(VERSIONS_SQL), {"schema": schema})
+    }
+
+
+class SchemaCatalog:
+    """单个库的结构快照
+
+    首次使用时加载快照文件并做一次完整校验，之后由后台任务每 revalidate_interval 秒校验一次，
+    请求中只重新读取被DDL标记的表。
+    注意: MySQL 8 的 information_schema.TABLES 受 information_schema_stats_expiry 缓存影响，
+    UPDATE_TIME 可能滞后；通过 execute_sql 执行的DDL会直接标记对应表需要重新读取
+    """
+
+    def __init__(self, schema: str, path: str, revalidate_interval: float = 60):
+        """
+        Args:
+            schema: 库名
+            path: 快照文件路径
+            revalidate_interval: 后台校验的间隔(秒)，0表示只在首次使用时校验
+        """
+        self.schema = schema
+        self.path = path
+        self.revalidate_interval = revalidate_interval
+        self.tables: Optional[Dict[str, CatalogTable]] = None
+        self._validated_at = 0.0
+        self._stale: Set[str] = set()
+        self._needs_rebuild = False
+        self._refreshing: Optional[asyncio.Future] = None
+
+    def mark_stale(self, schema: Optional[str], table: Optional[str]) -> None:
+        """元数据缓存失效时同步标记快照中的表需要重新读取"""
+        if schema is None:
+            self._needs_rebuild = True
+        elif schema == self.schema.lower():
+            if table is None:
+                self._needs_rebuild = True
+            else:
+                self._stale.add(table)
+
+    @property
+    def is_fresh(self) -> bool:
+        return (self.tables is not None and self._validated_at > 0
+                and not self._stale and not self._needs_rebuild)
+
+    async def ensure_loaded(self) -> bool:
+        """确保快照已加载、已校验过且没有被DDL标记的表，失败时返回False(调用方改为直接查询)"""
+        if self.is_fresh:
+            return True
+        return await self._run_refresh(validate=False)
+
+    async def revalidate(self) -> bool:
+        """对比 information_schema.TABLES 校验整个快照(由后台任务定期调用)，失败时返回False"""
+        return await self._run_refresh(validate=True)
+
+    async def _run_refresh(self, validate: bool) -> bool:
+        # 同一时间只进行一次加载或校验，其余调用等待其结果
+        if self._refreshing is not None and not self._refreshing.done():
+            try:
+                await asyncio.shield(self._refreshing)
+            except Exception:
+                pass
+            if not validate and self.is_fresh:
+                return True
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh(validate))
+        try:
+            await asyncio.shield(self._refreshing)
+            return True
+        except Exception as e:
+            logger.warning(f"加载库结构快照失败: {e}")
+            return False
+
+    async def _refresh(self, validate: bool) -> None:
+        # 取出DDL标记，刷新失败时放回，避免旧的快照在下次校验后被当作最新
+        stale, self._stale = self._stale, set()
+        needs_rebuild, self._needs_rebuild = self._needs_rebuild, False
+        try:
+            await self._refresh_tables(stale, needs_rebuild, validate or self._validated_at == 0)
+        except BaseException:
+            self._stale |= stale
+            self._needs_rebuild = self._needs_rebuild or needs_rebuild
+            raise
+
+    async def _refresh_tables(self, stale: Set[str], needs_rebuild: bool, validate: bool) -> None:
+        pool = ExecuteSqlUtil.get_connection_pool()
+        if self.tables is None and not needs_rebuild:
+            self.tables = await asyncio.to_thread(self._load_file)
+
+        changed = False
+        if self.tables is None or needs_rebuild:
+            start = time.perf_counter()
+            tables = await pool.run_in_connection(fetch_catalog, self.schema)
+            logger.info(f"库结构快照已构建: {self.schema}, {len(tables)} 张表, "
+                        f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+            self.tables = tables
+            self._validated_at = time.monotonic()
+            changed = True
+        elif validate:
+            versions = await pool.run_in_connection(fetch_versions, self.schema)
+            refresh = [name for key, (name, create_time, update_time) in versions.items()
+                       if key in stale or key not in self.tables
+                       or (self.tables[key].create_time, self.tables[key].update_time) != (create_time, update_time)]
+            removed = [name for name in self.tables if name not in versions]
+            if refresh:
+                self.tables.update(await pool.run_in_connection(fetch_catalog, self.schema, refresh))
+            for name in removed:
+                del self.tables[name]
+            self._validated_at = time.monotonic()
+            changed = bool(refresh or removed)
+            if changed:
+                logger.info(f"库结构快照已更新: {self.schema}, 更新 {len(refresh)} 张表, 删除 {len(removed)} 张表")
+        elif stale:
+            # 只重新读取被DDL标记的表，读取不到的表已被删除
+            tables = await pool.run_in_connection(fetch_catalog, self.schema, sorted(stale))
+            for name in stale:
+                if name in tables:
+                    self.tables[name] = tables[name]
+                else:
+                    self.tables.pop(name, None)
+            changed = True
+            logger.info(f"库结构快照已更新: {self.schema}, 重新读取 {len(stale)} 张表")
+
+        if changed:
+            await asyncio.to_thread(self._save_file, dict(self.tables))
+
+    def lookup(self, kind: str, names: Sequence[str]) -> Dict[str, List[Tuple]]:
+        """按元数据类型返回各表的结果行，行格式与 TableMetadata 的查询结果一致"""
+        result = {}
+        for name in names:
+            table = self.tables.get(name.lower())
+            if table is None:
+                result[name.lower()] = []
+            elif kind == "columns":
+                result[name.lower()] = [(table.name, column, comment) for column, comment in table.columns]
+            elif kind == "indexes":
+                result[name.lower()] = [(table.name, *index) for index in table.indexes]
+            elif kind == "sizes":
+                result[name.lower()] = [(table.name, table.size_mb)]
+        return result
+
+    def search(self, keyword: str) -> List[Tuple]:
+        """按表注释搜索表(不区分大小写)"""
+        keyword = keyword.lower()
+        return [(self.schema, table.name, table.comment)
+                for table in self.tables.values() if keyword in table.comment.lower()]
+
+    def _load_file(self) -> Optional[Dict[str, CatalogTable]]:
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取库结构快照文件失败，将重新构建: {self.path}, {e}")
+            return None
+        if data.get("version") != CATALOG_FORMAT_VERSION or data.get("schema") != self.schema:
+            return None
+        tables = [CatalogTable.from_list(table) for table in data["tables"]]
+        logger.info(f"已加载库结构快照: {self.path}, {len(tables)} 张表")
+        return {table.name.lower(): table for table in tables}
+
+    def _save_file(self, tables: Dict[str, CatalogTable]) -> None:
+        data = {
+            "version": CATALOG_FORMAT_VERSION,
+            "schema": self.schema,
+            "built_at": time.time(),
+            "tables": [table.to_list() for table in tables.values()],
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存库结构快照文件失败: {self.path}, {e}")
+
+
+_catalog: Optional[SchemaCatalog] = None
+_catalog_key: Optional[Tuple] = None
+# 配置重新加载时唤醒后台任务，按新配置切换快照和校验间隔
+_config_reloaded = asyncio.Event()
+
+
+def get_schema_catalog() -> Optional[SchemaCatalog]:
+    """获取当前配置的库对应的结构快照，未开启时返回None"""
+    global _catalog, _catalog_key
+    from ..config import get_db_config
+    config = get_db_config()
+    if not config.get("schema_catalog_enabled", True) or not config.get("database"):
+        return None
+
+    key = (config["host"], config["port"], config["database"], config.get("schema_catalog_dir"))
+    if key != _catalog_key:
+        file_name = re.sub(r'[^\w.-]', '_', "-".join(str(part) for part in key[:3])) + ".json.gz"
+        path = os.path.join(os.path.expanduser(config.get("schema_catalog_dir")), file_name)
+        if _catalog is None:
+            get_metadata_cache().add_listener(_on_metadata_invalidated)
+        _catalog = SchemaCatalog(config["database"], path)
+        _catalog_key = key
+    _catalog.revalidate_interval = config.get("schema_catalog_revalidate_interval", 60)
+    return _catalog
+
+
+def reload_schema_catalog() -> None:
+    """配置重新加载后调用，后台任务按新配置重新获取结构快照"""
+    _config_reloaded.set()
+
+
+def _on_metadata_invalidated(schema: Optional[str], table: Optional[str]) -> None:
+    if _catalog is not None:
+        _catalog.mark_stale(schema, table)
+
+
+async def preload_schema_catalog() -> None:
+    """后台任务：启动时加载结构快照(不阻塞服务启动)，之后每 SCHEMA_CATALOG_REVALIDATE_INTERVAL 秒校验一次
+
+    配置重新加载后关闭快照、切换到其他库或修改校验间隔都会在下一轮生效
+    """
+    catalog = None
+    reloaded = False
+    while True:
+        current = get_schema_catalog()
+        if current is not catalog:
+            catalog = current
+            if catalog is not None:
+                await catalog.ensure_loaded()
+        elif catalog is not None and not reloaded:
+            await catalog.revalidate()
+
+        interval = catalog.revalidate_interval if catalog is not None else 0
+        try:
+            await asyncio.wait_for(_config_reloaded.wait(), interval if interval > 0 else None)
+            reloaded = True
+        except asyncio.TimeoutError:
+            reloaded = False
+        _config_reloaded.clear()
@@ -0,0 +1,126 @@
+"""
+数据库服务端能力探测
+
+每个连接池只探测一次：版本、分支(MySQL/MariaDB/Percona)、performance_schema 和 sys 库是否可用、当前用户的全局权限。
+处理器根据探测结果只执行服务端支持的查询，避免每次调用都执行一条注定失败的语句。
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import FrozenSet, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+FLAVOUR_MYSQL = "mysql"
+FLAVOUR_MARIADB = "mariadb"
+FLAVOUR_PERCONA = "percona"
+
+VERSION_PATTERN = re.compile(r'(\d+)\.(\d+)(?:\.(\d+))?')
+
+# SHOW GRANTS 中的全局权限: GRANT SELECT, PROCESS ON *.* TO ...
+GLOBAL_GRANT_PATTERN = re.compile(r'^GRANT\s+(?P<privileges>.+?)\s+ON\s+[`\'"]?\*[`\'"]?\.[`\'"]?\*[`\'"]?\s+TO\b',
+                                  re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class ServerCapabilities:
+    """数据库服务端能力"""
+    version: str
+    version_tuple: Tuple[int, int, int]
+    flavour: str
+    performance_schema: bool
+    sys_schema: bool
+    privileges: FrozenSet[str]
+
+    @property
+    def is_mariadb(self) -> bool:
+        return self.flavour == FLAVOUR_MARIADB
+
+    @property
+    def supports_data_locks(self) -> bool:
+        """是否通过 performance_schema.data_locks / data_lock_waits 查询行锁(MySQL 8.0+)"""
+        return not self.is_mariadb and self.version_tuple >= (8, 0, 0) and self.performance_schema
+
+    @property
+    def supports_innodb_locks(self) -> bool:
+        """是否通过 information_schema.INNODB_LOCKS / INNODB_LOCK_WAITS 查询行锁(MySQL 5.x、MariaDB)"""
+        return self.is_mariadb or self.version_tuple < (8, 0, 0)
+
+    @property
+    def supports_max_execution_time(self) -> bool:
+        """是否支持 /*+ MAX_EXECUTION_TIME(ms) */ 优化器提示(MySQL 5.7.8+，仅对SELECT生效)"""
+        return not self.is_mariadb and self.version_tuple >= (5, 7, 8)
+
+    @property
+    def supports_max_statement_time(self) -> bool:
+        """是否支持 SET STATEMENT max_statement_time=N FOR ...(MariaDB 10.1.2+)"""
+        return self.is_mariadb and self.version_tuple >= (10, 1, 2)
+
+    def has_privilege(self, privilege: str) -> bool:
+        """是否拥有指定的全局权限(ALL PRIVILEGES 视为拥有全部权限)"""
+        return "ALL PRIVILEGES" in self.privileges or privilege.upper() in self.privileges
+
+
+def parse_version(version: str) -> Tuple[int, int, int]:
+    """从版本字符串(如 8.0.36、10.11.6-MariaDB)中解析版本号"""
+    match = VERSION_PATTERN.search(version)
+    if not match:
+        return 0, 0, 0
+    return int(match.group(1)), int(match.group(2)), int(match.group(3) or 0)
+
+
+def parse_flavour(version: str, version_comment: str) -> str:
+    """根据 VERSION() 和 @@version_comment 判断数据库分支"""
+    if "mariadb" in version.lower() or "mariadb" in version_comment.lower():
+        return FLAVOUR_MARIADB
+    if "percona" in version_comment.lower():
+        return FLAVOUR_PERCONA
+    return FLAVOUR_MYSQL
+
+
+def parse_global_privileges(grants) -> FrozenSet[str]:
+    """从 SHOW GRANTS 的结果中提取全局权限"""
+    privileges = set()
+    for grant in grants:
+        match = GLOBAL_GRANT_PATTERN.match(grant.strip())
+        if match:
+            privileges.update(p.strip().upper() for p in match.group("privileges").split(","))
+    return frozenset(privileges)
+
+
+def probe_capabilities(conn: Connection) -> ServerCapabilities:
+    """在给定连接上探测服务端能力
+
+    Args:
+        conn: 数据库连接
+
+    Returns:
+        ServerCapabilities: 探测结果
+    """
+    version, version_comment, performance_schema = conn.execute(
+        text("SELECT VERSION(), @@version_comment, @@performance_schema")
+    ).one()
+    sys_schema = conn.execute(
+        text("SELECT COUNT(*) FROM information_schema.SCHEMATA WHERE SCHEMA_NAME = 'sys'")
+    ).scalar() > 0
+
+    try:
+        privileges = parse_global_privileges(row[0] for row in conn.execute(text("SHOW GRANTS")))
+    except Exception as e:
+        logger.warning(f"获取当前用户权限失败: {e}")
+        privileges = frozenset()
+
+    capabilities = ServerCapabilities(
+        version=str(version),
+        version_tuple=parse_version(str(version)),
+        flavour=parse_flavour(str(version), str(version_comment or "")),
+        performance_schema=bool(int(performance_schema or 0)),
+        sys_schema=sys_schema,
+        privileges=privileges,
+    )
+    logger.info(f"数据库服务端能力: {capabilities}")
+    return capabilities
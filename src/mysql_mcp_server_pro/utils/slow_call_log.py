@@ -0,0 +1,102 @@
+"""
+慢调用日志
+
+耗时超过 SLOW_CALL_THRESHOLD 的工具调用以 JSON 行的形式记录，包含各阶段(SQL解析、权限检查、借出连接、
+执行、读取结果、编码输出)的耗时，用于区分延迟来自 MySQL、连接池还是本服务的处理。
+配置 SLOW_CALL_LOG_FILE 时由后台线程追加写入该文件，不阻塞事件循环；否则输出到服务日志。
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import get_db_config
+
+logger = logging.getLogger(__name__)
+
+# 待写入的 (文件路径, 日志行)，None 表示停止写入线程
+_pending: "queue.SimpleQueue[Optional[Tuple[str, str]]]" = queue.SimpleQueue()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+# 进程退出时等待写入线程写完剩余日志的最长时间(秒)
+FLUSH_TIMEOUT = 5
+
+
+def log_slow_call(record: Dict[str, Any]) -> bool:
+    """调用耗时超过阈值时写入慢调用日志
+
+    Args:
+        record: 结构化的调用记录，见 metrics.ToolCall.record
+
+    Returns:
+        是否写入了日志
+    """
+    config = get_db_config()
+    threshold = config.get("slow_call_threshold", 1.0)
+    if threshold <= 0 or record["duration_ms"] < threshold * 1000:
+        return False
+
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    path = config.get("slow_call_log_file")
+    if not path:
+        logger.warning(f"慢调用: {line}")
+        return True
+
+    _start_writer()
+    _pending.put((os.path.expanduser(path), line))
+    return True
+
+
+def _start_writer() -> None:
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="slow-call-log", daemon=True)
+            _writer.start()
+            atexit.register(_stop_writer)
+
+
+def _write_loop() -> None:
+    """依次写入待写入的日志，同一文件的连续多行合并为一次写入"""
+    while True:
+        item = _pending.get()
+        if item is None:
+            return
+        batch = [item]
+        while True:
+            try:
+                item = _pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                _write_batch(batch)
+                return
+            batch.append(item)
+        _write_batch(batch)
+
+
+def _write_batch(batch: list) -> None:
+    lines_by_path: Dict[str, list] = {}
+    for path, line in batch:
+        lines_by_path.setdefault(path, []).append(line)
+    for path, lines in lines_by_path.items():
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            for line in lines:
+                logger.warning(f"写入慢调用日志失败: {e}，慢调用: {line}")
+
+
+def _stop_writer() -> None:
+    """进程退出时写完剩余的日志"""
+    if _writer is not None and _writer.is_alive():
+        _pending.put(None)
+        _writer.join(FLUSH_TIMEOUT)
@@ -0,0 +1,140 @@
+"""
+SQL语句分类工具
+
+一次扫描识别语句中出现的操作类型(SELECT、INSERT等)，跳过字符串、标识符和注释中的关键字。
+分类结果按语句指纹(字面量替换为 ? 后的语句)缓存，值不同但结构相同的语句只需分类一次。
+字符串中的反斜杠是否为转义符取决于服务端的 NO_BACKSLASH_ESCAPES，含反斜杠的语句按两种规则分类并合并结果。
+"""
+
+import re
+from enum import Enum
+from functools import lru_cache
+from typing import FrozenSet
+
+
+class SQLOperation(str, Enum):
+    """SQL 操作类型枚举"""
+    SELECT = 'SELECT'
+    INSERT = 'INSERT'
+    UPDATE = 'UPDATE'
+    DELETE = 'DELETE'
+    CREATE = 'CREATE'
+    ALTER = 'ALTER'
+    DROP = 'DROP'
+    TRUNCATE = 'TRUNCATE'
+    SHOW = 'SHOW'
+    DESCRIBE = 'DESCRIBE'
+    EXPLAIN = 'EXPLAIN'
+
+    @classmethod
+    def from_str(cls, value: str) -> 'SQLOperation':
+        """从字符串创建 SQLOperation 枚举值
+
+        Args:
+            value: SQL 操作字符串
+
+        Returns:
+            SQLOperation: 对应的枚举值
+
+        Raises:
+            ValueError: 当操作类型不支持时
+        """
+        try:
+            return cls(value.upper())
+        except ValueError:
+            raise ValueError(f"不支持的SQL操作类型: {value}")
+
+
+# 字符串、反引号标识符、注释、数字，指纹中统一替换为 ?
+# 可执行注释(/*! ... */、/*!80000 ... */、MariaDB 的 /*M! ... */)中的内容会被服务端执行，
+# 只替换其开头的标记，内容按SQL分类；普通注释和优化器提示(/*+ ... */)整体替换
+LITERAL_RULES = r'''
+    STRING_RULE
+  | `(?:[^`]++|``)*+`?
+  | (?:--(?=\s|$)|\#)[^\n]*+
+  | /\*M?!\d*
+  | /\*.*?(?:\*/|\Z)
+  | \b\d+(?:\.\d*)?(?:[eE][-+]?\d+)?\b
+'''
+
+# 字符串字面量: 默认规则下反斜杠为转义符；NO_BACKSLASH_ESCAPES 下反斜杠为普通字符
+STRING_RULE = r'''
+    '(?:[^'\\]++|\\.|'')*+'?
+  | "(?:[^"\\]++|\\.|"")*+"?
+'''
+NO_BACKSLASH_STRING_RULE = r'''
+    '(?:[^']++|'')*+'?
+  | "(?:[^"]++|"")*+"?
+'''
+
+LITERAL_PATTERN = re.compile(LITERAL_RULES.replace("STRING_RULE", STRING_RULE), re.VERBOSE | re.DOTALL)
+NO_BACKSLASH_LITERAL_PATTERN = re.compile(LITERAL_RULES.replace("STRING_RULE", NO_BACKSLASH_STRING_RULE),
+                                          re.VERBOSE | re.DOTALL)
+
+# 连续的值列表，如 VALUES (?, ?), (?, ?) 合并为一个
+VALUES_LIST_PATTERN = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+
+# 操作类型关键字
+OPERATION_PATTERN = re.compile(
+    r'\b(' + '|'.join(op.value for op in SQLOperation) + r')\b',
+    re.IGNORECASE
+)
+
+# 分类结果缓存的最大条目数
+CLASSIFY_CACHE_SIZE = 4096
+
+
+def fingerprint(sql: str, backslash_escapes: bool = True) -> str:
+    """计算语句指纹：字面量替换为 ?，合并空白和批量值列表
+
+    Args:
+        sql: SQL语句
+        backslash_escapes: 字符串中的反斜杠是否为转义符(服务端未开启 NO_BACKSLASH_ESCAPES)
+
+    Returns:
+        语句指纹
+    """
+    pattern = LITERAL_PATTERN if backslash_escapes else NO_BACKSLASH_LITERAL_PATTERN
+    sql = ' '.join(pattern.sub('?', sql).split())
+    return VALUES_LIST_PATTERN.sub('(?)', sql)
+
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
+def _classify_fingerprint(sql_fingerprint: str) -> FrozenSet[SQLOperation]:
+    return frozenset(SQLOperation(keyword.upper()) for keyword in OPERATION_PATTERN.findall(sql_fingerprint))
+
+
+def classify(sql: str) -> FrozenSet[SQLOperation]:
+    """提取SQL语句中的所有操作类型
+
+    含反斜杠的语句在两种转义规则下分类结果可能不同(如 'a\\'; DROP ... 开启 NO_BACKSLASH_ESCAPES 时含 DROP)，
+    返回两者的并集，权限检查与服务端的设置无关
+
+    Args:
+        sql: SQL语句
+
+    Returns:
+        操作类型集合
+    """
+    operations = _classify_fingerprint(fingerprint(sql))
+    if "\\" in sql:
+        operations |= _classify_fingerprint(fingerprint(sql, backslash_escapes=False))
+    return operations
+
+
+def classify_cache_info():
+    """分类结果缓存的命中统计"""
+    return _classify_fingerprint.cache_info()
+
+
+@lru_cache(maxsize=None)
+def allowed_operations(permissions: tuple) -> FrozenSet[SQLOperation]:
+    """将角色的权限列表转换为操作类型集合(按权限列表缓存)
+
+    Args:
+        permissions: 角色允许执行的SQL操作
+
+    Returns:
+        允许的操作集合
+    """
+    return frozenset(SQLOperation.from_str(op) for op in permissions)
@@ -0,0 +1,146 @@
+"""
+MySQL词法分析工具
+
+按MySQL的词法规则识别字符串、标识符、注释等，用于拆分多条SQL语句。
+字符串或注释中的分号不会被当作语句分隔符，并支持客户端的 DELIMITER 指令。
+字符串中的反斜杠默认为转义符，服务端开启 NO_BACKSLASH_ESCAPES 时则为普通字符，两种规则可分别使用。
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, List
+
+
+class TokenType:
+    """词法单元类型"""
+    WHITESPACE = "whitespace"
+    COMMENT = "comment"
+    STRING = "string"
+    IDENTIFIER = "identifier"
+    WORD = "word"
+    NUMBER = "number"
+    VARIABLE = "variable"
+    PUNCTUATION = "punctuation"
+
+
+@dataclass(frozen=True)
+class Token:
+    """词法单元"""
+    type: str
+    value: str
+
+
+# 字符串字面量: 默认规则下反斜杠为转义符；NO_BACKSLASH_ESCAPES 下反斜杠为普通字符，引号只能以重复引号转义
+STRING_RULE = r'''(?:[^'\\]|\\.|'')*(?:'|\Z)|"(?:[^"\\]|\\.|"")*(?:"|\Z)'''
+NO_BACKSLASH_STRING_RULE = r'''(?:[^']|'')*(?:'|\Z)|"(?:[^"]|"")*(?:"|\Z)'''
+
+# 各类词法单元的正则，按优先级排列
+TOKEN_RULES = r'''
+    (?P<whitespace>\s+)
+  | (?P<comment>(?:--(?=\s|$)|\#)[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'STRING_RULE)
+  | (?P<identifier>`(?:[^`]|``)*(?:`|\Z))
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?![\w$]))
+  | (?P<variable>@@?(?:[\w$.]+|`(?:[^`]|``)*`|'STRING_RULE))
+  | (?P<word>[\w$]+)
+  | (?P<punctuation>.)
+'''
+
+TOKEN_PATTERN = re.compile(TOKEN_RULES.replace("STRING_RULE", STRING_RULE), re.VERBOSE | re.DOTALL)
+NO_BACKSLASH_TOKEN_PATTERN = re.compile(TOKEN_RULES.replace("STRING_RULE", NO_BACKSLASH_STRING_RULE),
+                                        re.VERBOSE | re.DOTALL)
+
+# 客户端 DELIMITER 指令，只能出现在行首
+DELIMITER_PATTERN = re.compile(r'[ \t]*DELIMITER[ \t]+(\S+)[ \t]*(?:\r?\n|\Z)', re.IGNORECASE)
+
+# 不构成语句内容的词法单元
+TRIVIA_TYPES = (TokenType.WHITESPACE, TokenType.COMMENT)
+
+# 内容被引号或注释包围、其中不可能出现分隔符的词法单元
+QUOTED_TYPES = (TokenType.STRING, TokenType.IDENTIFIER, TokenType.COMMENT)
+
+
+def tokenize(sql: str, backslash_escapes: bool = True) -> Iterator[Token]:
+    """将SQL文本切分为词法单元
+
+    Args:
+        sql: SQL文本
+        backslash_escapes: 字符串中的反斜杠是否为转义符(服务端未开启 NO_BACKSLASH_ESCAPES)
+
+    Yields:
+        Token: 按出现顺序排列的词法单元
+    """
+    pattern = TOKEN_PATTERN if backslash_escapes else NO_BACKSLASH_TOKEN_PATTERN
+    for match in pattern.finditer(sql):
+        yield Token(match.lastgroup, match.group())
+
+
+def split_statements(sql: str, backslash_escapes: bool = True) -> List[str]:
+    """将包含多条语句的SQL脚本拆分为单条语句
+
+    - 字符串、反引号标识符、注释中的分号不作为分隔符
+    - 支持 DELIMITER 指令，可用于包含分号的存储过程、触发器定义
+    - 只包含注释或空白的片段会被忽略
+
+    Args:
+        sql: SQL脚本
+        backslash_escapes: 字符串中的反斜杠是否为转义符(服务端未开启 NO_BACKSLASH_ESCAPES)
+
+    Returns:
+        去掉分隔符和首尾空白后的语句列表
+    """
+    pattern = TOKEN_PATTERN if backslash_escapes else NO_BACKSLASH_TOKEN_PATTERN
+    statements = []
+    delimiter = ";"
+    start = 0
+    pos = 0
+    has_content = False
+    length = len(sql)
+
+    while pos < length:
+        # DELIMITER 指令需位于语句开头，且独占一行
+        if not has_content and sql[pos:pos + 9].upper() == "DELIMITER" \
+                and not sql[sql.rfind("\n", 0, pos) + 1:pos].strip():
+            match = DELIMITER_PATTERN.match(sql, pos)
+            if match:
+                delimiter = match.group(1)
+                pos = start = match.end()
+                continue
+
+        if sql.startswith(delimiter, pos):
+            if has_content:
+                statements.append(sql[start:pos].strip())
+            pos = start = pos + len(delimiter)
+            has_content = False
+            continue
+
+        match = pattern.match(sql, pos)
+        end = match.end()
+        if match.lastgroup not in QUOTED_TYPES:
+            # 自定义分隔符可能紧跟在单词后(如 END$$)，需在词法单元内部查找
+            index = sql.find(delimiter, pos + 1, end)
+            if index != -1:
+                end = index
+        if match.lastgroup not in TRIVIA_TYPES:
+            has_content = True
+        pos = end
+
+    if has_content:
+        statements.append(sql[start:].strip())
+    return statements
+
+
+def split_statements_strict(sql: str) -> List[str]:
+    """拆分SQL脚本，语句边界与服务端是否开启 NO_BACKSLASH_ESCAPES 无关
+
+    字符串中含反斜杠时，两种规则下拆分的结果可能不同(如 'a\\'; DROP ... 在开启时是两条语句)，
+    此时服务端实际执行的语句无法确定，拒绝拆分
+
+    Raises:
+        ValueError: 两种规则下拆分的语句不同
+    """
+    statements = split_statements(sql)
+    if "\\" in sql and split_statements(sql, backslash_escapes=False) != statements:
+        raise ValueError("字符串中的反斜杠使语句边界取决于服务端的 NO_BACKSLASH_ESCAPES 设置，"
+                         "请改用 '' 转义单引号后重试")
+    return statements
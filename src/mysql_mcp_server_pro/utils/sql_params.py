@@ -0,0 +1,96 @@
+"""
+参数化执行
+
+SQL中使用 :name 形式的命名参数，参数值由驱动转义后随语句发送，不再拼接到SQL字符串中。
+参数为对象数组时以 executemany 批量执行(pymysql 会把 INSERT ... VALUES 合并为一条多行插入)。
+
+解析后的语句对象按SQL文本缓存并复用，同一语句重复执行时 SQLAlchemy 直接命中已编译语句的缓存，
+不再重复解析参数和编译。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.sql.elements import TextClause
+
+Params = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+# 缓存的语句对象数量上限
+PREPARED_CACHE_SIZE = 512
+
+_prepared: "OrderedDict[Tuple[str, Tuple[str, ...]], TextClause]" = OrderedDict()
+_prepared_lock = threading.Lock()
+
+
+def validate_params(params: Any) -> Optional[Params]:
+    """校验参数：对象(单次执行)或非空的对象数组(批量执行)，参数名必须为字符串
+
+    Raises:
+        ValueError: 参数格式不正确
+    """
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        _check_names(params)
+        return params
+    if isinstance(params, (list, tuple)) and params and all(isinstance(item, dict) for item in params):
+        for item in params:
+            _check_names(item)
+        return list(params)
+    raise ValueError("params 必须是对象(如 {\"id\": 1})或非空的对象数组")
+
+
+def _check_names(params: Dict[str, Any]) -> None:
+    for name in params:
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"参数名必须为非空字符串: {name!r}")
+
+
+def is_executemany(params: Optional[Params]) -> bool:
+    return isinstance(params, list)
+
+
+def params_key(params: Optional[Params]) -> Tuple:
+    """参数的可哈希表示，用于查询结果缓存的键"""
+    if not params:
+        return ()
+    return tuple(sorted((name, _hashable(value)) for name, value in params.items()))
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def prepare(statement: str, params: Optional[Params] = None) -> TextClause:
+    """获取语句对象，值为列表的参数展开为 IN (...) 列表
+
+    Args:
+        statement: 使用 :name 参数的SQL语句
+        params: 参数，批量执行时不展开列表参数
+    """
+    expanding: Tuple[str, ...] = ()
+    if isinstance(params, dict):
+        expanding = tuple(sorted(name for name, value in params.items() if isinstance(value, (list, tuple))))
+    key = (statement, expanding)
+    with _prepared_lock:
+        clause = _prepared.get(key)
+        if clause is not None:
+            _prepared.move_to_end(key)
+            return clause
+
+    clause = text(statement)
+    if expanding:
+        clause = clause.bindparams(*(bindparam(name, expanding=True) for name in expanding))
+    with _prepared_lock:
+        _prepared[key] = clause
+        while len(_prepared) > PREPARED_CACHE_SIZE:
+            _prepared.popitem(last=False)
+    return clause
@@ -0,0 +1,343 @@
+"""
+表数据导出
+
+按整数主键把表拆分为多个区间，每个区间在连接池的一个连接上用服务端游标流式读取，
+边读边写入本地文件(CSV 或 Parquet)，多个区间并发导出。内存占用只与每批读取的行数有关，与表的大小无关。
+导出目录中的 manifest.json 记录列、文件、行数和字节数，工具只向客户端返回摘要。
+
+各区间在不同的连接上读取，导出结果不是同一时刻的一致性快照。
+"""
+
+import asyncio
+import csv
+import datetime
+import json
+import logging
+import math
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .bulk_loader import quote_identifier, quote_table
+from .execute_sql_util import ExecuteSqlUtil
+from .query_timeout import current_guard
+from .result_handle import INTEGER_TYPES
+from .sql_classifier import SQLOperation
+from .sql_params import prepare
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+# 表的列信息，未指定库名时使用当前库
+EXPORT_COLUMNS_SQL = ("SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, COLUMN_KEY, NUMERIC_PRECISION, NUMERIC_SCALE "
+                      "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE()) "
+                      "AND TABLE_NAME = :table ORDER BY ORDINAL_POSITION")
+TABLE_ROWS_SQL = ("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                  "WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE()) AND TABLE_NAME = :table")
+
+# Parquet 每个行组缓冲的行数
+PARQUET_ROW_GROUP_ROWS = 10000
+
+FILE_NAME_PATTERN = re.compile(r'[^\w.-]+')
+
+
+@dataclass
+class ExportColumn:
+    name: str
+    data_type: str
+    column_type: str
+    precision: Optional[int] = None
+    scale: Optional[int] = None
+
+
+@dataclass
+class ExportChunk:
+    """一个主键区间，边界为None时不限制"""
+    index: int
+    low: Optional[int] = None
+    high: Optional[int] = None
+    file: str = ""
+    rows: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class ExportResult:
+    """导出结果"""
+    table: str
+    directory: str
+    format: str
+    key_column: Optional[str]
+    columns: List[ExportColumn]
+    chunks: List[ExportChunk] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return sum(chunk.rows for chunk in self.chunks)
+
+    @property
+    def bytes(self) -> int:
+        return sum(chunk.bytes for chunk in self.chunks)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    def manifest(self) -> Dict[str, Any]:
+        return {
+            "table": self.table,
+            "format": self.format,
+            "key_column": self.key_column,
+            "consistent_snapshot": False,
+            "columns": [{"name": column.name, "type": column.column_type} for column in self.columns],
+            "files": [{"file": chunk.file, "rows": chunk.rows, "bytes": chunk.bytes,
+                       "key_range": [chunk.low, chunk.high]} for chunk in self.chunks],
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "duration_seconds": round(self.elapsed, 3),
+            "exported_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def summary(self) -> str:
+        rate = self.rows / self.elapsed if self.elapsed > 0 else 0.0
+        return (f"导出完成: 表 {self.table} 共 {self.rows} 行，{len(self.chunks)} 个{self.format}文件，"
+                f"{self.bytes} 字节，耗时 {self.elapsed:.2f} 秒，约 {rate:.0f} 行/秒\n"
+                f"目录: {self.directory}\n清单: {self.manifest_path}")
+
+
+class TableExporter:
+    """按主键区间并发导出表数据到本地文件"""
+
+    def __init__(self, exe: Optional[ExecuteSqlUtil] = None, parallelism: Optional[int] = None,
+                 chunk_rows: Optional[int] = None):
+        """
+        Args:
+            exe: SQL执行工具，用于权限检查、超时控制和连接借用
+            parallelism: 并发导出的连接数，默认取配置 EXPORT_PARALLELISM，不超过连接池大小
+            chunk_rows: 每个文件的大致行数(按表行数估算值拆分)，默认取配置 EXPORT_CHUNK_ROWS
+        """
+        from ..config import get_db_config
+        config = get_db_config()
+        self.exe = exe or ExecuteSqlUtil()
+        # 访问其他库时使用该库的连接池，大小为 TENANT_POOL_SIZE + TENANT_POOL_MAX_OVERFLOW
+        pool_size = (config.get("pool_size", 10) if self.exe.is_default_database()
+                     else config.get("tenant_pool_size", 2) + config.get("tenant_pool_max_overflow", 3))
+        self.parallelism = max(1, min(int(parallelism or config.get("export_parallelism", 4)), pool_size))
+        self.chunk_rows = max(1, int(chunk_rows or config.get("export_chunk_rows", 100000)))
+        self.directory = os.path.expanduser(config.get("export_dir", "~/.cache/mysql_mcp_server_pro/exports"))
+
+    async def export(self, table: str, export_format: str = "csv") -> ExportResult:
+        """导出表数据
+
+        Raises:
+            SQLPermissionError: 当前角色没有 SELECT 权限
+            ValueError: 表不存在、表名或格式不合法
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}，可选: {', '.join(EXPORT_FORMATS)}")
+        if export_format == "parquet":
+            _import_pyarrow()
+        self.exe.check_permissions({SQLOperation.SELECT})
+
+        parts = table.replace("`", "").split(".")
+        table_sql = quote_table(table)
+        params = {"schema": parts[0].strip() if len(parts) == 2 else None, "table": parts[-1].strip()}
+        columns, key_column = await self._load_columns(params)
+        chunks = await self._split(table_sql, params, key_column)
+
+        directory = os.path.join(
+            self.directory,
+            FILE_NAME_PATTERN.sub("_", table.replace("`", "")) + datetime.datetime.now().strftime("-%Y%m%d-%H%M%S")
+        )
+        os.makedirs(directory, exist_ok=True)
+        result = ExportResult(table=table, directory=directory, format=export_format,
+                              key_column=key_column, columns=columns, chunks=chunks)
+
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.parallelism)
+
+        async def export_chunk(chunk: ExportChunk) -> None:
+            chunk.file = f"part-{chunk.index:05d}.{export_format}"
+            sql, chunk_params = self._chunk_query(table_sql, key_column, chunk)
+            async with semaphore:
+                await self.exe.run_guarded(self._write_chunk, sql, chunk_params,
+                                           os.path.join(directory, chunk.file), columns, export_format, chunk)
+
+        # 任一区间失败时取消其余区间(被取消的语句由看门狗终止)，只抛出第一个错误
+        try:
+            async with asyncio.TaskGroup() as group:
+                for chunk in chunks:
+                    group.create_task(export_chunk(chunk))
+        except ExceptionGroup as group:
+            raise group.exceptions[0]
+        result.elapsed = time.perf_counter() - start
+
+        with open(result.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(result.manifest(), f, ensure_ascii=False, indent=2)
+        logger.info(f"导出 {table}: {result.rows} 行，{len(chunks)} 个文件，{result.elapsed:.2f} 秒")
+        return result
+
+    async def _load_columns(self, params: Dict[str, Any]) -> Tuple[List[ExportColumn], Optional[str]]:
+        """读取列信息，表的主键为单个整数列时返回该列用于拆分区间"""
+        result = await self.exe.execute_single_statement(EXPORT_COLUMNS_SQL, params)
+        if not result.success:
+            raise ValueError(result.message)
+        if not result.rows:
+            raise ValueError(f"表不存在: {params['table']}")
+
+        columns = [ExportColumn(name=row[0], data_type=str(row[1]).lower(), column_type=str(row[2]),
+                                precision=row[4], scale=row[5]) for row in result.rows]
+        keys = [column for column, row in zip(columns, result.rows) if row[3] == "PRI"]
+        key_column = keys[0].name if len(keys) == 1 and keys[0].data_type in INTEGER_TYPES else None
+        return columns, key_column
+
+    async def _split(self, table_sql: str, params: Dict[str, Any], key_column: Optional[str]) -> List[ExportChunk]:
+        """按主键的最小值、最大值和表行数估算值拆分区间，首尾区间不设边界，不会遗漏新写入的行"""
+        if key_column is None:
+            return [ExportChunk(index=1)]
+
+        key_sql = quote_identifier(key_column)
+        bounds = await self.exe.execute_single_statement(f"SELECT MIN({key_sql}), MAX({key_sql}) FROM {table_sql}")
+        if not bounds.success:
+            raise ValueError(bounds.message)
+        low, high = bounds.rows[0] if bounds.rows else (None, None)
+        if low is None:
+            return [ExportChunk(index=1)]
+
+        estimate = await self.exe.execute_single_statement(TABLE_ROWS_SQL, params)
+        table_rows = int(estimate.rows[0][0] or 0) if estimate.success and estimate.rows else 0
+        count = max(self.parallelism, math.ceil(table_rows / self.chunk_rows))
+        count = max(1, min(count, int(high) - int(low) + 1))
+
+        step = (int(high) - int(low) + 1) / count
+        edges = [int(low) + round(step * n) for n in range(1, count)]
+        chunks = []
+        for index in range(count):
+            chunks.append(ExportChunk(index=index + 1,
+                                      low=edges[index - 1] if index else None,
+                                      high=edges[index] - 1 if index < count - 1 else None))
+        return chunks
+
+    @staticmethod
+    def _chunk_query(table_sql: str, key_column: Optional[str], chunk: ExportChunk) -> Tuple[str, Dict[str, Any]]:
+        if key_column is None:
+            return f"SELECT * FROM {table_sql}", {}
+        key_sql = quote_identifier(key_column)
+        conditions, params = [], {}
+        if chunk.low is not None:
+            conditions.append(f"{key_sql} >= :low")
+            params["low"] = chunk.low
+        if chunk.high is not None:
+            conditions.append(f"{key_sql} <= :high")
+            params["high"] = chunk.high
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"SELECT * FROM {table_sql}{where} ORDER BY {key_sql}", params
+
+    def _write_chunk(self, conn, sql: str, params: Dict[str, Any], path: str,
+                     columns: List[ExportColumn], export_format: str, chunk: ExportChunk) -> None:
+        """在连接上流式读取一个区间并写入文件"""
+        guard = current_guard.get()
+        if guard is not None:
+            sql = guard.apply(sql)
+        writer = (ParquetChunkWriter if export_format == "parquet" else CsvChunkWriter)(path, columns)
+        try:
+            result = conn.execute(prepare(sql, params), params,
+                                  execution_options={"stream_results": True,
+                                                     "max_row_buffer": self.exe.STREAM_BATCH_SIZE})
+            try:
+                for partition in result.partitions(self.exe.STREAM_BATCH_SIZE):
+                    writer.write(partition)
+                    chunk.rows += len(partition)
+            finally:
+                result.close()
+        finally:
+            writer.close()
+        chunk.bytes = os.path.getsize(path)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("导出 parquet 格式需要安装 pyarrow: pip install mysql_mcp_server_pro[parquet]")
+    return pyarrow
+
+
+class CsvChunkWriter:
+    """CSV 文件，首行为列名，NULL 输出为 NULL(与 csv 输出格式、bulk_insert 一致)，二进制值输出为十六进制"""
+
+    def __init__(self, path: str, columns: List[ExportColumn]):
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._writer.writerow([column.name for column in columns])
+
+    def write(self, rows) -> None:
+        self._writer.writerows(
+            ["NULL" if value is None else value.hex() if isinstance(value, (bytes, bytearray)) else value
+             for value in row]
+            for row in rows
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetChunkWriter:
+    """Parquet 文件，列类型按 MySQL 列类型确定，每 PARQUET_ROW_GROUP_ROWS 行写入一个行组"""
+
+    def __init__(self, path: str, columns: List[ExportColumn]):
+        pa = _import_pyarrow()
+        self._pa = pa
+        self._schema = pa.schema([(column.name, _arrow_type(pa, column)) for column in columns])
+        self._writer = pa.parquet.ParquetWriter(path, self._schema)
+        self._rows: List[Tuple] = []
+
+    def write(self, rows) -> None:
+        self._rows.extend(rows)
+        if len(self._rows) >= PARQUET_ROW_GROUP_ROWS:
+            self._flush()
+
+    def close(self) -> None:
+        try:
+            self._flush()
+        finally:
+            self._writer.close()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        arrays = []
+        for index, arrow_field in enumerate(self._schema):
+            values = [row[index] for row in self._rows]
+            if self._pa.types.is_string(arrow_field.type):
+                values = [value if value is None or isinstance(value, str) else str(value) for value in values]
+            arrays.append(self._pa.array(values, type=arrow_field.type))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+        self._rows = []
+
+
+def _arrow_type(pa, column: ExportColumn):
+    """MySQL 列类型对应的 Arrow 类型，无法对应的类型保存为字符串"""
+    data_type = column.data_type
+    if data_type in INTEGER_TYPES or data_type == "year":
+        if data_type == "bigint" and "unsigned" in column.column_type.lower():
+            return pa.uint64()
+        return pa.int64()
+    if data_type in ("float", "double", "real"):
+        return pa.float64()
+    if data_type == "decimal" and column.precision and column.precision <= 38:
+        return pa.decimal128(int(column.precision), int(column.scale or 0))
+    if data_type == "date":
+        return pa.date32()
+    if data_type in ("datetime", "timestamp"):
+        return pa.timestamp("us")
+    if data_type == "time":
+        return pa.duration("us")
+    if data_type in ("binary", "varbinary", "tinyblob", "blob", "mediumblob", "longblob", "bit", "geometry"):
+        return pa.binary()
+    return pa.string()
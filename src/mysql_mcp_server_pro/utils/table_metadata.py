@@ -0,0 +1,129 @@
+"""
+表元数据查询，依次读取元数据缓存、库结构快照，最后才查询 information_schema
+
+一次调用涉及多张表时，只为缓存中没有的表查询 information_schema，查询结果按表拆分后写入缓存。
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .execute_sql_util import ExecuteSqlUtil, SQLResult
+from .metadata_cache import get_metadata_cache
+from .schema_catalog import get_schema_catalog
+
+# 各类元数据的结果列，首列均为表名
+COLUMN_COLUMNS = ["TABLE_NAME", "COLUMN_NAME", "COLUMN_COMMENT"]
+INDEX_COLUMNS = ["TABLE_NAME", "INDEX_NAME", "COLUMN_NAME", "SEQ_IN_INDEX", "NON_UNIQUE", "INDEX_TYPE"]
+SIZE_COLUMNS = ["Table", "Size (MB)"]
+TABLE_SEARCH_COLUMNS = ["TABLE_SCHEMA", "TABLE_NAME", "TABLE_COMMENT"]
+
+# 各类元数据的查询，:tables 展开为缺失的表名列表
+COLUMNS_SQL = ("SELECT TABLE_NAME, COLUMN_NAME, COLUMN_COMMENT FROM information_schema.COLUMNS "
+               "WHERE TABLE_SCHEMA = :schema AND TABLE_NAME IN :tables "
+               "ORDER BY TABLE_NAME, ORDINAL_POSITION")
+INDEXES_SQL = ("SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, SEQ_IN_INDEX, NON_UNIQUE, INDEX_TYPE "
+               "FROM information_schema.STATISTICS "
+               "WHERE TABLE_SCHEMA = :schema AND TABLE_NAME IN :tables "
+               "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX")
+SIZES_SQL = ("SELECT table_name AS `Table`, round(((data_length + index_length) / 1024 / 1024), 2) AS `Size (MB)` "
+             "FROM information_schema.tables WHERE table_schema = :schema AND table_name IN :tables")
+TABLE_SEARCH_SQL = ("SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_COMMENT FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = :schema AND TABLE_COMMENT LIKE :pattern")
+
+
+def escape_like(value: str) -> str:
+    """转义 LIKE 模式中的通配符"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class TableMetadata:
+    """按表查询字段、索引、数据量等元数据"""
+
+    def __init__(self, exe: Optional[ExecuteSqlUtil] = None):
+        self.exe = exe or ExecuteSqlUtil()
+
+    async def get_columns(self, schema: str, tables: Sequence[str]) -> SQLResult:
+        """表的字段名和字段注释，按表名和字段顺序排序"""
+        return await self._load("columns", schema, tables, COLUMNS_SQL, COLUMN_COLUMNS)
+
+    async def get_indexes(self, schema: str, tables: Sequence[str]) -> SQLResult:
+        """表的索引信息，按表名、索引名和索引顺序排序"""
+        return await self._load("indexes", schema, tables, INDEXES_SQL, INDEX_COLUMNS)
+
+    async def get_sizes(self, schema: str, tables: Sequence[str]) -> SQLResult:
+        """表的数据量(MB)，按数据量从大到小排序"""
+        result = await self._load("sizes", schema, tables, SIZES_SQL, SIZE_COLUMNS)
+        if result.success and result.rows:
+            result.rows.sort(key=lambda row: float(row[1] or 0), reverse=True)
+        return result
+
+    async def search_tables(self, schema: str, keyword: str) -> SQLResult:
+        """按表注释搜索表"""
+        cache = get_metadata_cache()
+        cache_key = f"comment:{keyword}"
+        rows = cache.get("table_search", schema, cache_key)
+        if rows is not None:
+            return self._query_result(TABLE_SEARCH_COLUMNS, list(rows))
+
+        catalog = await self._get_catalog(schema)
+        if catalog is not None:
+            return self._query_result(TABLE_SEARCH_COLUMNS, catalog.search(keyword))
+
+        result = await self.exe.execute_single_statement(
+            TABLE_SEARCH_SQL, {"schema": schema, "pattern": "%" + escape_like(keyword) + "%"})
+        if result.success and not result.truncated:
+            cache.put("table_search", schema, cache_key, [tuple(row) for row in result.rows or []])
+        return result
+
+    async def _load(self, kind: str, schema: str, tables: Sequence[str],
+                    sql: str, columns: List[str]) -> SQLResult:
+        """读取多张表的元数据，缓存中没有的表从库结构快照读取，快照不可用时合并为一次查询
+
+        结果被截断时不写入缓存，避免缓存不完整的元数据
+        """
+        cache = get_metadata_cache()
+        names = sorted({name.strip() for name in tables if name and name.strip()}, key=str.lower)
+
+        per_table: Dict[str, List[Tuple]] = {}
+        missing = []
+        for name in names:
+            rows = cache.get(kind, schema, name)
+            if rows is None:
+                missing.append(name)
+            else:
+                per_table[name.lower()] = rows
+
+        truncated = False
+        catalog = await self._get_catalog(schema) if missing else None
+        if catalog is not None:
+            per_table.update(catalog.lookup(kind, missing))
+        elif missing:
+            result = await self.exe.execute_single_statement(sql, {"schema": schema, "tables": missing})
+            if not result.success:
+                return result
+            truncated = result.truncated
+
+            # 不存在的表也缓存为空，表被创建时由DDL失效
+            fetched: Dict[str, List[Tuple]] = {name.lower(): [] for name in missing}
+            for row in result.rows or []:
+                fetched.setdefault(str(row[0]).lower(), []).append(tuple(row))
+            if not truncated:
+                for name in missing:
+                    cache.put(kind, schema, name, fetched[name.lower()])
+            per_table.update(fetched)
+
+        rows = [row for name in names for row in per_table.get(name.lower(), [])]
+        result = self._query_result(columns, rows)
+        result.truncated = truncated
+        return result
+
+    @staticmethod
+    async def _get_catalog(schema: str):
+        """库结构快照可用且属于该库时返回快照"""
+        catalog = get_schema_catalog()
+        if catalog is None or catalog.schema.lower() != schema.lower():
+            return None
+        return catalog if await catalog.ensure_loaded() else None
+
+    @staticmethod
+    def _query_result(columns: List[str], rows: List[Tuple]) -> SQLResult:
+        return SQLResult(success=True, message="查询执行成功", columns=list(columns), rows=rows)